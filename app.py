@@ -4,5 +4,5 @@ app = create_app()
 
 if __name__ == '__main__':
     with app.app_context():
-        db.create_all()
+        db.create_all(bind_key=None)
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
@@ -3,11 +3,14 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_bcrypt import Bcrypt
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
+from flask_migrate import Migrate
 from app.config import Config
+from app.database import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 bcrypt = Bcrypt()
 jwt = JWTManager()
+migrate = Migrate()
 
 def create_app(config_class=Config):
     app = Flask(__name__)
@@ -16,16 +19,31 @@ def create_app(config_class=Config):
     # Enable CORS for all routes
     CORS(app)
 
+    from app import database
+    database.configure(app)
     db.init_app(app)
+    database.init_app(app)
     bcrypt.init_app(app)
     jwt.init_app(app)
-
-    from app import routes
+    migrate.init_app(app, db)
+
+    from app import routes, catalog, statistics, hashing, images, words, submissions, metrics, budgets, seed
+    from app.auth import reset_current_user
+    catalog.init_app(app)
+    hashing.init_app(app)
+    statistics.init_app(app)
+    images.init_app(app)
+    words.init_app(app)
+    submissions.init_app(app)
+    metrics.init_app(app)
+    budgets.init_app(app)
+    seed.init_app(app)
     app.register_blueprint(routes.bp)
+    app.before_request(reset_current_user)
 
-    # Initialize the database
+    # Initialize the database (the primary only; a read replica is never written)
     with app.app_context():
-        db.create_all()
+        db.create_all(bind_key=None)
 
     return app
 
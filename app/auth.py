@@ -1,16 +1,41 @@
 from functools import wraps
-from flask import jsonify, request
-from flask_jwt_extended import jwt_required, get_jwt_identity, create_access_token
+from flask import jsonify, request, g, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt, create_access_token
 from app.models import User
-from app import bcrypt
+from app.hashing import check_password
+
+# The authenticated user is loaded at most once per request and shared by the
+# decorators and the views through g. The cache is dropped at the start of each
+# request, since g outlives the request when an app context is already pushed.
+
+
+def reset_current_user():
+    g.pop('_current_user', None)
+
+
+def get_current_user():
+    if '_current_user' not in g:
+        g._current_user = User.query.get(int(get_jwt_identity()))
+    return g._current_user
+
+# With JWT_ROLE_CLAIM enabled the role is read from the signed token, so
+# role-only checks never touch the database. Role changes then apply once the
+# user's token is reissued.
+
+
+def get_current_role():
+    if current_app.config['JWT_ROLE_CLAIM']:
+        role = get_jwt().get('role')
+        if role:
+            return role
+    user = get_current_user()
+    return user.role if user else None
 
 def admin_required(f):
     @wraps(f)
     @jwt_required()
     def decorated_function(*args, **kwargs):
-        current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
-        if not user or user.role != 'admin':
+        if get_current_role() != 'admin':
             return jsonify({'message': 'Admin access required'}), 403
         return f(*args, **kwargs)
     return decorated_function
@@ -19,19 +44,16 @@ def client_required(f):
     @wraps(f)
     @jwt_required()
     def decorated_function(*args, **kwargs):
-        current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
-        if not user:
+        if not get_current_role():
             return jsonify({'message': 'Authentication required'}), 401
         return f(*args, **kwargs)
     return decorated_function
 
 def authenticate_user(email, password):
     user = User.query.filter_by(email=email).first()
-    if user and bcrypt.check_password_hash(user.password, password):
+    if user and check_password(user.password, password):
         return user
     return None
 
 def create_user_token(user):
-    return create_access_token(identity=str(user.id))
-
+    return create_access_token(identity=str(user.id), additional_claims={'role': user.role})
@@ -0,0 +1,60 @@
+from functools import wraps
+from flask import current_app
+from app.metrics import request_statements
+
+# Per-endpoint query budgets. A view decorated with query_budget(n) may run
+# at most n SQL statements per request, counting its authentication and a
+# body streamed with stream_with_context; the budget must not depend on how
+# much data there is, which is what catches per-row queries. QUERY_BUDGET_MODE decides
+# what happens when a request goes over: 'raise' fails it with
+# QueryBudgetExceeded, 'log' logs a warning listing the statements, and an
+# empty value turns checking off. It defaults to 'raise' under TESTING, 'log'
+# in debug mode and off otherwise.
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def _check(app, endpoint, limit, statements, mode):
+    if len(statements) <= limit:
+        return
+    message = f'{endpoint} ran {len(statements)} SQL statements, budget is {limit}'
+    if mode == 'raise':
+        raise QueryBudgetExceeded(message + ':\n' + '\n'.join(statements))
+    app.logger.warning(message + ':\n%s', '\n'.join(statements))
+
+
+def _checked_stream(chunks, check):
+    yield from chunks
+    check()
+
+
+def query_budget(limit):
+    # Place directly below the route decorator so authentication counts too.
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            mode = current_app.config['QUERY_BUDGET_MODE']
+            if not mode:
+                return f(*args, **kwargs)
+
+            app = current_app._get_current_object()
+            statements, start = request_statements(), len(request_statements())
+
+            def check():
+                _check(app, f.__name__, limit, statements[start:], mode)
+
+            response = app.make_response(f(*args, **kwargs))
+            if response.is_streamed:
+                response.response = _checked_stream(response.response, check)
+            else:
+                check()
+            return response
+        return decorated_function
+    return decorator
+
+
+def init_app(app):
+    if app.config['QUERY_BUDGET_MODE'] is None:
+        app.config['QUERY_BUDGET_MODE'] = 'raise' if app.testing else 'log' if app.debug else ''
@@ -0,0 +1,96 @@
+import json
+import threading
+from collections import OrderedDict
+from flask import current_app
+from sqlalchemy.orm import selectinload
+from app.models import Level
+from app.versions import get_version, bump_version, CATALOG_VERSION
+from app.images import image_variants
+
+# In-process cache of the level/video catalog. Snapshots are keyed by the
+# 'catalog' content version, which every catalog write bumps, so a stale
+# snapshot is never served once the write has committed. Per-user progress is
+# overlaid by the views and never stored here.
+
+
+class CatalogSnapshot:
+    def __init__(self, version, levels):
+        self.version = version
+        self.levels = levels
+        self.by_id = {level['id']: level for level in levels}
+
+
+class CatalogCache:
+    def __init__(self, size):
+        self.size = size
+        self._snapshots = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, version):
+        with self._lock:
+            snapshot = self._snapshots.get(version)
+            if snapshot is not None:
+                self._snapshots.move_to_end(version)
+            return snapshot
+
+    def put(self, snapshot):
+        with self._lock:
+            self._snapshots[snapshot.version] = snapshot
+            self._snapshots.move_to_end(snapshot.version)
+            while len(self._snapshots) > self.size:
+                self._snapshots.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._snapshots.clear()
+
+
+def init_app(app):
+    app.extensions['catalog_cache'] = CatalogCache(app.config['CATALOG_CACHE_SIZE'])
+
+
+def invalidate_catalog():
+    bump_version(CATALOG_VERSION)
+
+
+def _build_snapshot(version):
+    levels = Level.query.options(selectinload(Level.videos)).order_by(
+        Level.level_number, Level.id).all()
+    return CatalogSnapshot(version, [{
+        'id': level.id,
+        'name': level.name,
+        'description': level.description,
+        'level_number': level.level_number,
+        'welcome_video_url': level.welcome_video_url,
+        'image_path': level.image_path,
+        'image_variants': image_variants(level.image_path),
+        'price': level.price,
+        'initial_exam_question': level.initial_exam_question,
+        'final_exam_question': level.final_exam_question,
+        'videos_count': len(level.videos),
+        'videos': [{
+            'id': v.id,
+            'youtube_link': v.youtube_link,
+            'questions': json.loads(v.questions) if v.questions else []
+        } for v in level.videos]
+    } for level in levels])
+
+
+def get_catalog(version=None):
+    cache = current_app.extensions['catalog_cache']
+    if version is None:
+        version = get_version(CATALOG_VERSION)
+    snapshot = cache.get(version)
+    if snapshot is None:
+        snapshot = _build_snapshot(version)
+        cache.put(snapshot)
+    return snapshot
+
+
+def filter_levels(levels, min_price=None, max_price=None, level_number=None, name=None):
+    name = name.lower() if name else None
+    return [level for level in levels
+            if (min_price is None or level['price'] >= min_price)
+            and (max_price is None or level['price'] <= max_price)
+            and (level_number is None or level['level_number'] == level_number)
+            and (not name or name in level['name'].lower())]
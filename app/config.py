@@ -7,4 +7,39 @@ class Config:
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=24)
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///site.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    UPLOAD_FOLDER = os.path.join(os.getcwd(), 'Uploads', 'levels')
\ No newline at end of file
+    DATABASE_POOL_SIZE = int(os.environ.get('DATABASE_POOL_SIZE', 10))
+    DATABASE_MAX_OVERFLOW = int(os.environ.get('DATABASE_MAX_OVERFLOW', 20))
+    DATABASE_POOL_TIMEOUT = int(os.environ.get('DATABASE_POOL_TIMEOUT', 30))
+    DATABASE_POOL_RECYCLE = int(os.environ.get('DATABASE_POOL_RECYCLE', 1800))
+    DATABASE_POOL_PRE_PING = os.environ.get('DATABASE_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+    DATABASE_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL') or None
+    REPLICA_STALE_TOLERANCE = float(os.environ.get('REPLICA_STALE_TOLERANCE', 10))
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN') or None
+    QUERY_BUDGET_MODE = os.environ.get('QUERY_BUDGET_MODE')
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'cache_size': -64000,
+        'mmap_size': 268435456,
+    }
+    UPLOAD_FOLDER = os.path.join(os.getcwd(), 'Uploads', 'levels')
+    PAGE_SIZE_DEFAULT = int(os.environ.get('PAGE_SIZE_DEFAULT', 50))
+    PAGE_SIZE_MAX = int(os.environ.get('PAGE_SIZE_MAX', 500))
+    JWT_ROLE_CLAIM = os.environ.get('JWT_ROLE_CLAIM', 'false').lower() in ('1', 'true', 'yes')
+    CATALOG_CACHE_SIZE = int(os.environ.get('CATALOG_CACHE_SIZE', 4))
+    REPORT_BATCH_SIZE = int(os.environ.get('REPORT_BATCH_SIZE', 500))
+    BULK_ENROLLMENT_MAX_PAIRS = int(os.environ.get('BULK_ENROLLMENT_MAX_PAIRS', 50000))
+    BCRYPT_LOG_ROUNDS = int(os.environ.get('BCRYPT_LOG_ROUNDS', 12))
+    BCRYPT_POOL_SIZE = int(os.environ.get('BCRYPT_POOL_SIZE', os.cpu_count() or 2))
+    BCRYPT_QUEUE_SIZE = int(os.environ.get('BCRYPT_QUEUE_SIZE', 32))
+    IMAGE_GC_GRACE_SECONDS = int(os.environ.get('IMAGE_GC_GRACE_SECONDS', 300))
+    UPLOAD_SENDFILE = os.environ.get('UPLOAD_SENDFILE') or None
+    UPLOAD_ACCEL_PREFIX = os.environ.get('UPLOAD_ACCEL_PREFIX', '/protected/uploads/levels/')
+    IMAGE_VARIANT_SIZES = {'thumb': 160, 'medium': 640}
+    IMAGE_VARIANT_WORKERS = int(os.environ.get('IMAGE_VARIANT_WORKERS', 2))
+    SUBMISSION_WRITE_BEHIND = os.environ.get('SUBMISSION_WRITE_BEHIND', 'false').lower() in ('1', 'true', 'yes')
+    SUBMISSION_JOURNAL = os.environ.get('SUBMISSION_JOURNAL') or os.path.join(os.getcwd(), 'submissions.journal')
+    SUBMISSION_BATCH_SIZE = int(os.environ.get('SUBMISSION_BATCH_SIZE', 200))
+    SUBMISSION_FLUSH_INTERVAL = float(os.environ.get('SUBMISSION_FLUSH_INTERVAL', 0.05))
+    SUBMISSION_READ_TIMEOUT = float(os.environ.get('SUBMISSION_READ_TIMEOUT', 5))
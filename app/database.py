@@ -0,0 +1,139 @@
+from functools import wraps
+from flask import current_app, g, has_app_context
+from flask_jwt_extended import get_jwt_identity
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, select, table, column
+from sqlalchemy.engine import make_url
+
+REPLICA_BIND = 'replica'
+
+# Engine profile. Server databases get a tuned connection pool: DATABASE_POOL_*
+# settings become SQLALCHEMY_ENGINE_OPTIONS, which still win when set
+# explicitly. SQLite connections run SQLITE_PRAGMAS when they are opened; the
+# defaults switch to WAL so readers no longer block behind a writer, fsync
+# only at checkpoints (synchronous=NORMAL, still safe in WAL mode), wait for
+# locks instead of failing with "database is locked", and enlarge the page
+# cache and memory map.
+
+
+def _is_sqlite(url):
+    return url.get_backend_name() == 'sqlite'
+
+
+def _is_memory(url):
+    return _is_sqlite(url) and (url.database in (None, '', ':memory:')
+                                or url.query.get('mode') == 'memory')
+
+
+def engine_options(config, uri):
+    url = make_url(uri)
+    if _is_memory(url):
+        # A single shared connection; there is no pool to tune
+        return {}
+    options = {
+        'pool_size': config['DATABASE_POOL_SIZE'],
+        'max_overflow': config['DATABASE_MAX_OVERFLOW'],
+        'pool_timeout': config['DATABASE_POOL_TIMEOUT'],
+        'pool_recycle': config['DATABASE_POOL_RECYCLE'],
+    }
+    if not _is_sqlite(url):
+        options['pool_pre_ping'] = config['DATABASE_POOL_PRE_PING']
+    return options
+
+
+def configure(app):
+    # Call before db.init_app(app).
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = dict(
+        engine_options(app.config, app.config['SQLALCHEMY_DATABASE_URI']),
+        **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    replica_url = app.config['DATABASE_REPLICA_URL']
+    if replica_url:
+        app.config['SQLALCHEMY_BINDS'] = dict(app.config.get('SQLALCHEMY_BINDS') or {}, **{
+            REPLICA_BIND: dict(engine_options(app.config, replica_url), url=replica_url)})
+
+
+def _pragma_listener(pragmas):
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name} = {value}')
+        finally:
+            cursor.close()
+    return set_pragmas
+
+
+def sqlite_pragmas(engine):
+    # {name: value} as reported by the connection, for checks and benchmarks
+    with engine.connect() as connection:
+        return {name: connection.exec_driver_sql(f'PRAGMA {name}').scalar()
+                for name in ('journal_mode', 'synchronous', 'busy_timeout', 'cache_size', 'mmap_size')}
+
+# Read replica. With DATABASE_REPLICA_URL set, views decorated with
+# replica_reads(staleness) send their SELECTs to the replica bind when the
+# staleness they accept, in seconds, covers REPLICA_STALE_TOLERANCE; raising
+# the setting moves the stricter views back to the primary. Writes and flushes
+# always go to the primary. A user's own reads stay consistent: the replica is
+# only used once it has caught up with the user's progress_version, which
+# every write to the user's enrollments, progress and exams bumps. Catalog and
+# admin data may lag by the accepted staleness.
+
+_users = table('user', column('id'), column('progress_version'))
+
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and has_app_context() and g.get('_read_replica')
+                and not getattr(clause, 'is_dml', False)):
+            return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _progress_version(engine, user_id):
+    with engine.connect() as connection:
+        return connection.execute(select(_users.c.progress_version).where(
+            _users.c.id == user_id)).scalar()
+
+
+def _replica_caught_up(engines, user_id):
+    replica_version = _progress_version(engines[REPLICA_BIND], user_id)
+    return replica_version is not None and replica_version >= (
+        _progress_version(engines[None], user_id) or 0)
+
+
+def use_primary():
+    g.pop('_read_replica', None)
+
+
+def reading_replica():
+    return has_app_context() and bool(g.get('_read_replica'))
+
+
+def replica_reads(staleness):
+    # Place below the authentication decorator.
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            engines = current_app.extensions['sqlalchemy'].engines
+            if (REPLICA_BIND in engines
+                    and staleness >= current_app.config['REPLICA_STALE_TOLERANCE']
+                    and _replica_caught_up(engines, int(get_jwt_identity()))):
+                g._read_replica = True
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+
+def init_app(app):
+    # Call after db.init_app(app).
+    pragmas = app.config['SQLITE_PRAGMAS']
+    with app.app_context():
+        for bind_key, engine in app.extensions['sqlalchemy'].engines.items():
+            if not _is_sqlite(engine.url):
+                continue
+            bind_pragmas = dict(pragmas, query_only='ON') if bind_key == REPLICA_BIND else pragmas
+            if bind_pragmas:
+                event.listen(engine, 'connect', _pragma_listener(bind_pragmas))
+    # Streamed responses keep reading after the view returns, so the routing
+    # flag lives until the next request starts.
+    app.before_request(use_primary)
@@ -0,0 +1,26 @@
+import hashlib
+from flask import request, make_response
+
+# Strong ETags derived from version counters rather than from the response
+# body, so a matching If-None-Match is answered before any serialization.
+
+
+def make_etag(*parts):
+    raw = '\x1f'.join(str(part) for part in parts)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def etag_matches(etag):
+    return request.if_none_match.contains_weak(etag)
+
+
+def not_modified(etag, private=True, weak=False):
+    response = make_response('', 304)
+    return with_etag(response, etag, private, weak)
+
+
+def with_etag(response, etag, private=True, weak=False):
+    # weak=True for bodies that differ in detail between equivalent responses
+    response.set_etag(etag, weak=weak)
+    response.headers['Cache-Control'] = 'private, no-cache' if private else 'no-cache'
+    return response
@@ -0,0 +1,48 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from app import bcrypt
+
+# bcrypt hashing and verification run on a dedicated pool of
+# BCRYPT_POOL_SIZE threads, so a burst of logins occupies at most that many
+# cores while request threads serving cheap endpoints keep running. At most
+# BCRYPT_QUEUE_SIZE further jobs may wait for a free thread; beyond that the
+# caller gets HashingBusy straight away and the view answers 503.
+
+
+class HashingBusy(Exception):
+    pass
+
+
+class PasswordHasher:
+    def __init__(self, pool_size, queue_size):
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='bcrypt')
+        self._slots = threading.BoundedSemaphore(pool_size + queue_size)
+
+    def run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy()
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+
+def init_app(app):
+    app.extensions['password_hasher'] = PasswordHasher(
+        app.config['BCRYPT_POOL_SIZE'], app.config['BCRYPT_QUEUE_SIZE'])
+
+
+def _hasher():
+    return current_app.extensions['password_hasher']
+
+
+def hash_password(password):
+    return _hasher().run(bcrypt.generate_password_hash, password).decode('utf-8')
+
+
+def check_password(hashed_password, password):
+    return _hasher().run(bcrypt.check_password_hash, hashed_password, password)
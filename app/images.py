@@ -0,0 +1,322 @@
+import hashlib
+import mimetypes
+import os
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+import click
+from flask import current_app, abort, send_from_directory
+from werkzeug.utils import secure_filename, safe_join
+from app import db
+from app.models import Level
+from app.versions import bump_version, CATALOG_VERSION
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; without it only originals are served
+    Image = None
+
+# Level images are stored content-addressed: an upload is streamed to a
+# temporary file while it is hashed and then renamed to <sha256><ext>, so
+# identical bytes are kept once however often they are uploaded. A file's
+# reference count is the number of levels whose image_path points at it.
+# Files that drop to zero references are removed once they are older than
+# IMAGE_GC_GRACE_SECONDS, which protects an upload that matched an existing
+# file but has not committed its reference yet.
+
+IMAGE_URL_PREFIX = '/Uploads/levels/'
+CHUNK_SIZE = 65536
+CONTENT_NAME = re.compile(r'^[0-9a-f]{64}(\.[a-z0-9]+)?$')
+VARIANT_NAME = re.compile(r'^([0-9a-f]{64})_[a-z]+\.[a-z0-9]+$')
+SENDFILE_MODES = ('x-sendfile', 'x-accel-redirect')
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def _folder():
+    return current_app.config['UPLOAD_FOLDER']
+
+
+def _extension(filename):
+    return os.path.splitext(secure_filename(filename or ''))[1].lower()
+
+
+def _filename(image_path):
+    if image_path and image_path.startswith(IMAGE_URL_PREFIX):
+        return image_path[len(IMAGE_URL_PREFIX):]
+    return None
+
+
+def _store_stream(stream, extension):
+    folder = _folder()
+    os.makedirs(folder, exist_ok=True)
+    digest = hashlib.sha256()
+    fd, temp_path = tempfile.mkstemp(dir=folder, prefix='.upload-')
+    try:
+        with os.fdopen(fd, 'wb') as output:
+            for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+                output.write(chunk)
+        filename = digest.hexdigest() + extension
+        path = os.path.join(folder, filename)
+        if os.path.exists(path):
+            # Already stored; restart its grace period before referencing it
+            os.utime(path)
+            os.remove(temp_path)
+        else:
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return IMAGE_URL_PREFIX + filename
+
+
+def store_image(file):
+    return _store_stream(file.stream, _extension(file.filename))
+
+
+def image_references(image_path):
+    return Level.query.filter_by(image_path=image_path).count()
+
+
+def _remove_stale(filename, grace):
+    path = os.path.join(_folder(), filename)
+    try:
+        if time.time() - os.path.getmtime(path) >= grace:
+            os.remove(path)
+            return True
+    except FileNotFoundError:
+        pass
+    return False
+
+
+def release_images(*image_paths):
+    # Call after the commit that dropped the references.
+    grace = current_app.config['IMAGE_GC_GRACE_SECONDS']
+    for image_path in set(image_paths):
+        filename = _filename(image_path)
+        if filename and not image_references(image_path) and _remove_stale(filename, grace):
+            for names in variant_filenames(filename).values():
+                for name in names.values():
+                    _remove_stale(name, 0)
+
+
+def collect_images(grace=None):
+    # Moves images saved under their upload names to content names, then
+    # removes every file no level references. Returns (renamed, removed).
+    grace = current_app.config['IMAGE_GC_GRACE_SECONDS'] if grace is None else grace
+    folder = _folder()
+    if not os.path.isdir(folder):
+        return 0, 0
+
+    renamed = 0
+    for level in Level.query.filter(Level.image_path.startswith(IMAGE_URL_PREFIX)):
+        filename = _filename(level.image_path)
+        path = os.path.join(folder, filename)
+        if CONTENT_NAME.match(filename) or not os.path.isfile(path):
+            continue
+        with open(path, 'rb') as stream:
+            level.image_path = _store_stream(stream, _extension(filename))
+        renamed += 1
+    if renamed:
+        bump_version(CATALOG_VERSION)
+    db.session.commit()
+
+    referenced = {_filename(image_path) for image_path, in db.session.query(Level.image_path)}
+    # Variants live as long as an image with the same digest is referenced
+    digests = {filename[:64] for filename in referenced if filename and CONTENT_NAME.match(filename)}
+
+    def unreferenced(filename):
+        variant = VARIANT_NAME.match(filename)
+        if variant:
+            return variant.group(1) not in digests
+        return filename not in referenced
+
+    removed = sum(_remove_stale(filename, grace) for filename in os.listdir(folder)
+                  if unreferenced(filename) and os.path.isfile(os.path.join(folder, filename)))
+    return renamed, removed
+
+
+# Serving: a content-named file never changes, so it is cached for a year
+# without revalidation. Other files are revalidated through Last-Modified and
+# ETag. Flask answers Range and conditional requests itself; with
+# UPLOAD_SENDFILE set the response only names the file and the fronting web
+# server (Apache/lighttpd X-Sendfile or nginx X-Accel-Redirect) streams it.
+
+
+def image_response(filename):
+    mode = current_app.config['UPLOAD_SENDFILE']
+    if mode:
+        path = safe_join(_folder(), filename)
+        if path is None or not os.path.isfile(path):
+            abort(404)
+        response = current_app.response_class(
+            mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+        if mode == 'x-accel-redirect':
+            response.headers['X-Accel-Redirect'] = current_app.config['UPLOAD_ACCEL_PREFIX'] + filename
+        else:
+            response.headers['X-Sendfile'] = os.path.abspath(path)
+    else:
+        response = send_from_directory(_folder(), filename)
+
+    if CONTENT_NAME.match(filename) or VARIANT_NAME.match(filename):
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    else:
+        response.headers['Cache-Control'] = 'public, no-cache'
+    return response
+
+
+# Resized variants: after an upload, a background pool renders every size in
+# IMAGE_VARIANT_SIZES (longest side in pixels) as WebP plus a JPEG or PNG
+# fallback, named <sha256>_<size>.<ext>. The upload request does not wait;
+# once a level's variants are written the catalog version is bumped so the
+# level JSON starts listing them. Without Pillow no variants are produced.
+
+
+def _fallback_format(extension):
+    return ('jpeg', '.jpg') if extension in ('.jpg', '.jpeg') else ('png', '.png')
+
+
+def variant_filenames(filename):
+    digest, extension = os.path.splitext(filename)
+    fallback, fallback_extension = _fallback_format(extension)
+    return {size: {'webp': f'{digest}_{size}.webp', fallback: f'{digest}_{size}{fallback_extension}'}
+            for size in current_app.config['IMAGE_VARIANT_SIZES']}
+
+
+def image_variants(image_path):
+    # {size: {format: url}} for the variants already written
+    filename = _filename(image_path)
+    if not filename or not CONTENT_NAME.match(filename):
+        return {}
+    folder = _folder()
+    return {size: {image_format: IMAGE_URL_PREFIX + name for image_format, name in names.items()}
+            for size, names in variant_filenames(filename).items()
+            if all(os.path.exists(os.path.join(folder, name)) for name in names.values())}
+
+
+def sized_image_path(level, size):
+    # The WebP variant of a catalog level's image, or the original until the
+    # variant exists.
+    variant = level['image_variants'].get(size)
+    return variant['webp'] if variant else level['image_path']
+
+
+def _save_variant(image, image_format, path):
+    if image_format == 'jpeg' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    options = {} if image_format == 'png' else {'quality': 80}
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.variant-')
+    try:
+        with os.fdopen(fd, 'wb') as output:
+            image.save(output, format=image_format.upper(), **options)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def generate_variants(filename):
+    # Returns the number of files written.
+    folder, sizes = _folder(), current_app.config['IMAGE_VARIANT_SIZES']
+    missing = {size: {image_format: name for image_format, name in names.items()
+                      if not os.path.exists(os.path.join(folder, name))}
+               for size, names in variant_filenames(filename).items()}
+    if Image is None or not any(missing.values()):
+        return 0
+
+    written = 0
+    with Image.open(os.path.join(folder, filename)) as original:
+        if original.mode not in ('RGB', 'RGBA'):
+            original = original.convert('RGBA' if 'transparency' in original.info or 'A' in original.mode else 'RGB')
+        for size, names in missing.items():
+            if not names:
+                continue
+            variant = original.copy()
+            variant.thumbnail((sizes[size], sizes[size]))
+            for image_format, name in names.items():
+                _save_variant(variant, image_format, os.path.join(folder, name))
+                written += 1
+    return written
+
+
+def _generate_in_background(app, filename):
+    with app.app_context():
+        try:
+            if generate_variants(filename):
+                bump_version(CATALOG_VERSION)
+                db.session.commit()
+        except Exception:
+            app.logger.exception(f'Could not generate variants of {filename}')
+
+
+class VariantWorkers:
+    def __init__(self, workers):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='image-variants')
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args):
+        future = self._executor.submit(fn, *args)
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future):
+        with self._lock:
+            self._pending.discard(future)
+
+    def wait(self):
+        with self._lock:
+            pending = list(self._pending)
+        wait(pending)
+
+
+def schedule_variants(image_path):
+    # Call after the commit that stored image_path.
+    filename = _filename(image_path)
+    if Image is None or not filename or not CONTENT_NAME.match(filename):
+        return None
+    app = current_app._get_current_object()
+    return app.extensions['image_variants'].submit(_generate_in_background, app, filename)
+
+
+@click.command('generate-image-variants')
+def generate_variants_command():
+    """Render missing resized variants of every level image."""
+    if Image is None:
+        raise click.ClickException('Pillow is not installed.')
+    filenames = {_filename(image_path) for image_path, in db.session.query(Level.image_path)}
+    written = sum(generate_variants(filename) for filename in filenames
+                  if filename and CONTENT_NAME.match(filename)
+                  and os.path.isfile(os.path.join(_folder(), filename)))
+    if written:
+        bump_version(CATALOG_VERSION)
+        db.session.commit()
+    click.echo(f'Image variants generated: {written} files written.')
+
+
+@click.command('gc-images')
+@click.option('--grace', type=int, default=None,
+              help='Only remove files older than this many seconds.')
+def collect_images_command(grace):
+    """Rename level images to content names and remove unreferenced files."""
+    renamed, removed = collect_images(grace)
+    click.echo(f'Images collected: {renamed} renamed, {removed} removed.')
+
+
+def init_app(app):
+    if app.config['UPLOAD_SENDFILE'] not in (None, *SENDFILE_MODES):
+        raise ValueError(f"UPLOAD_SENDFILE must be one of {', '.join(SENDFILE_MODES)}")
+    if app.config['IMAGE_VARIANT_SIZES'] and Image is None:
+        app.logger.warning('Pillow is not installed: level image variants are disabled and only '
+                           'original images are served. Install it with "pip install Pillow".')
+    app.extensions['image_variants'] = VariantWorkers(app.config['IMAGE_VARIANT_WORKERS'])
+    app.cli.add_command(collect_images_command)
+    app.cli.add_command(generate_variants_command)
@@ -0,0 +1,160 @@
+import threading
+import time
+from bisect import bisect_left
+from flask import current_app, g, request, has_request_context, Response, abort
+from sqlalchemy import event
+
+# Request metrics in the Prometheus text format. Every request routed to a
+# blueprint view records its latency, status, response size and the number and time of
+# the SQL statements it ran into in-process histograms keyed by endpoint and
+# method; recording is a few dictionary updates, and the text is only built
+# when /metrics is scraped. Each worker process keeps its own figures.
+# Latency is measured until the view returns, so streamed bodies are not
+# included.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+STATEMENT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+SQL_TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _labels(names, values):
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for value in values)
+    return ','.join(f'{name}="{value}"' for name, value in zip(names, escaped))
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, description, label_names):
+        self.name, self.description, self.label_names = name, description, label_names
+        self.series = {}
+
+    def inc(self, labels, amount=1):
+        self.series[labels] = self.series.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in sorted(self.series.items()):
+            yield f'{self.name}{{{_labels(self.label_names, labels)}}} {value}'
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, description, label_names, buckets):
+        self.name, self.description, self.label_names = name, description, label_names
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, labels, value):
+        # [count per bucket..., +Inf count, sum]
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def samples(self):
+        for labels, series in sorted(self.series.items()):
+            label_text = _labels(self.label_names, labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series):
+                cumulative += count
+                yield f'{self.name}_bucket{{{label_text},le="{bound}"}} {cumulative}'
+            yield f'{self.name}_sum{{{label_text}}} {series[-1]}'
+            yield f'{self.name}_count{{{label_text}}} {cumulative}'
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        route = ('endpoint', 'method')
+        self.requests = Counter('http_requests_total', 'Requests by endpoint, method and status.',
+                                route + ('status',))
+        self.latency = Histogram('http_request_duration_seconds', 'Time until the view returned.',
+                                 route, LATENCY_BUCKETS)
+        self.size = Histogram('http_response_size_bytes', 'Response body size, when known.',
+                              route, SIZE_BUCKETS)
+        self.statements = Histogram('db_statements_per_request', 'SQL statements run by one request.',
+                                    route, STATEMENT_BUCKETS)
+        self.sql_time = Histogram('db_time_per_request_seconds', 'Time spent in SQL by one request.',
+                                  route, SQL_TIME_BUCKETS)
+        self._families = (self.requests, self.latency, self.size, self.statements, self.sql_time)
+
+    def record(self, endpoint, method, status, duration, size, statements, sql_time):
+        route = (endpoint, method)
+        with self._lock:
+            self.requests.inc(route + (str(status),))
+            self.latency.observe(route, duration)
+            if size is not None:
+                self.size.observe(route, size)
+            self.statements.observe(route, statements)
+            self.sql_time.observe(route, sql_time)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for family in self._families:
+                lines.append(f'# HELP {family.name} {family.description}')
+                lines.append(f'# TYPE {family.name} {family.kind}')
+                lines.extend(family.samples())
+        return '\n'.join(lines) + '\n'
+
+
+# Per-request SQL tracking, shared with the query budgets
+
+
+def _tracking():
+    return has_request_context() and '_request_started' in g
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _tracking():
+        conn.info.setdefault('_statement_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get('_statement_started')
+    if started and _tracking():
+        g._sql_time += time.perf_counter() - started.pop()
+        g._sql_statements.append(statement)
+
+
+def request_statements():
+    # Statements the current request has run so far
+    return g.get('_sql_statements', [])
+
+
+def _start_request():
+    g._request_started = time.perf_counter()
+    g._sql_statements = []
+    g._sql_time = 0.0
+
+
+def _record_request(response):
+    if request.blueprint and '_request_started' in g:
+        current_app.extensions['metrics'].record(
+            request.endpoint, request.method, response.status_code,
+            time.perf_counter() - g._request_started, response.content_length,
+            len(g._sql_statements), g._sql_time)
+    return response
+
+
+def init_app(app):
+    metrics = app.extensions['metrics'] = Metrics()
+    token = app.config['METRICS_TOKEN']
+
+    def metrics_view():
+        if token and request.headers.get('Authorization') != f'Bearer {token}':
+            abort(401)
+        return Response(metrics.render(), content_type=CONTENT_TYPE)
+
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
+    app.before_request(_start_request)
+    app.after_request(_record_request)
+    with app.app_context():
+        for engine in app.extensions['sqlalchemy'].engines.values():
+            event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
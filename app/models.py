@@ -15,6 +15,7 @@ class User(db.Model):
     password = db.Column(db.String(60), nullable=False)
     role = db.Column(db.String(20), default='client') # 'admin' or 'client'
     picture = db.Column(db.String(200), nullable=True)
+    progress_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     levels = db.relationship('UserLevel', backref='user', lazy=True)
 
     def __repr__(self):
@@ -30,15 +31,20 @@ class Level(db.Model):
     price = db.Column(db.Float, nullable=False)
     initial_exam_question = db.Column(db.Text, nullable=True)
     final_exam_question = db.Column(db.Text, nullable=True)
-    videos = db.relationship('Video', backref='level', lazy=True)
+    videos = db.relationship('Video', backref='level', lazy=True, order_by='Video.position')
     user_levels = db.relationship('UserLevel', backref='level', lazy=True)
 
     def __repr__(self):
         return f'Level(\'{self.name}\', {self.price})'
 
 class Video(db.Model):
+    __table_args__ = (
+        db.Index('ix_video_level_id_position', 'level_id', 'position'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     level_id = db.Column(db.Integer, db.ForeignKey('level.id'), nullable=False)
+    position = db.Column(db.Integer, nullable=False, default=0, server_default='0') # 0-based order within the level
     youtube_link = db.Column(db.String(200), nullable=False)
     questions = db.Column(db.Text, nullable=True)
 
@@ -46,6 +52,11 @@ class Video(db.Model):
         return f'Video(\'{self.youtube_link}\')'
 
 class UserLevel(db.Model):
+    __table_args__ = (
+        db.Index('ix_user_level_user_id_level_id', 'user_id', 'level_id', unique=True),
+        db.Index('ix_user_level_level_id', 'level_id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     level_id = db.Column(db.Integer, db.ForeignKey('level.id'), nullable=False)
@@ -54,17 +65,24 @@ class UserLevel(db.Model):
     initial_exam_score = db.Column(db.Float, nullable=True)
     final_exam_score = db.Column(db.Float, nullable=True)
     score_difference = db.Column(db.Float, nullable=True)
+    completed_videos_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Bitmaps keyed by video position, see app/progress.py
+    opened_videos = db.Column(db.LargeBinary, nullable=True)
+    completed_videos = db.Column(db.LargeBinary, nullable=True)
     videos_progress = db.relationship('UserVideoProgress', backref='user_level', lazy=True)
 
     def __repr__(self):
         return f'UserLevel(User: {self.user_id}, Level: {self.level_id})'
 
 class UserVideoProgress(db.Model):
+    __table_args__ = (
+        db.Index('ix_user_video_progress_user_level_id_video_id', 'user_level_id', 'video_id', unique=True),
+        db.Index('ix_user_video_progress_video_id', 'video_id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_level_id = db.Column(db.Integer, db.ForeignKey('user_level.id'), nullable=False)
     video_id = db.Column(db.Integer, db.ForeignKey('video.id'), nullable=False)
-    is_opened = db.Column(db.Boolean, default=False)
-    is_completed = db.Column(db.Boolean, default=False)
     correct_words = db.Column(db.Integer, nullable=True)
     wrong_words = db.Column(db.Integer, nullable=True)
     percentage = db.Column(db.Float, nullable=True)
@@ -72,9 +90,14 @@ class UserVideoProgress(db.Model):
     wrong_words_list = db.Column(db.Text, nullable=True)
 
     def __repr__(self):
-        return f'UserVideoProgress(UserLevel: {self.user_level_id}, Video: {self.video_id}, Opened: {self.is_opened}, Completed: {self.is_completed})'
+        return f'UserVideoProgress(UserLevel: {self.user_level_id}, Video: {self.video_id}, Percentage: {self.percentage})'
 
 class ExamResult(db.Model):
+    __table_args__ = (
+        db.Index('ix_exam_result_user_id_level_id', 'user_id', 'level_id'),
+        db.Index('ix_exam_result_level_id', 'level_id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     level_id = db.Column(db.Integer, db.ForeignKey('level.id'), nullable=False)
@@ -87,4 +110,54 @@ class ExamResult(db.Model):
     wrong_words_list = db.Column(db.Text, nullable=True)
 
     def __repr__(self):
-        return f'ExamResult(User: {self.user_id}, Level: {self.level_id}, Type: {self.type}, Score: {self.percentage})'
\ No newline at end of file
+        return f'ExamResult(User: {self.user_id}, Level: {self.level_id}, Type: {self.type}, Score: {self.percentage})'
+
+class ContentVersion(db.Model):
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'ContentVersion(\'{self.name}\', {self.version})'
+
+
+class StatisticsRollup(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    total_clients = db.Column(db.Integer, nullable=False, default=0)
+    total_levels = db.Column(db.Integer, nullable=False, default=0)
+    total_purchases = db.Column(db.Integer, nullable=False, default=0)
+    completed_levels = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'StatisticsRollup(Clients: {self.total_clients}, Levels: {self.total_levels}, Purchases: {self.total_purchases})'
+
+
+class LevelStatistics(db.Model):
+    level_id = db.Column(db.Integer, db.ForeignKey('level.id'), primary_key=True)
+    purchases = db.Column(db.Integer, nullable=False, default=0, index=True)
+
+    def __repr__(self):
+        return f'LevelStatistics(Level: {self.level_id}, Purchases: {self.purchases})'
+
+
+# Per-word answer outcomes, aggregated from exam and video answer lists.
+# Level rows count every answer given in the level, video rows only the
+# answers to that video's questions.
+
+class LevelWordStatistics(db.Model):
+    level_id = db.Column(db.Integer, db.ForeignKey('level.id'), primary_key=True)
+    word = db.Column(db.String(100), primary_key=True)
+    correct_count = db.Column(db.Integer, nullable=False, default=0)
+    wrong_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'LevelWordStatistics(Level: {self.level_id}, Word: {self.word}, Wrong: {self.wrong_count})'
+
+
+class VideoWordStatistics(db.Model):
+    video_id = db.Column(db.Integer, db.ForeignKey('video.id'), primary_key=True)
+    word = db.Column(db.String(100), primary_key=True)
+    correct_count = db.Column(db.Integer, nullable=False, default=0)
+    wrong_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'VideoWordStatistics(Video: {self.video_id}, Word: {self.word}, Wrong: {self.wrong_count})'
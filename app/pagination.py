@@ -0,0 +1,94 @@
+import base64
+import json
+from flask import request, current_app
+from app import db
+
+# Keyset (cursor) pagination for listing endpoints. Rows are ordered by a
+# unique column tuple and each page resumes strictly after the last key of
+# the previous one, so a page costs the same no matter how deep it is.
+
+
+def encode_cursor(values):
+    raw = json.dumps(list(values), separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def _matches(value, expected):
+    # bool is an int to Python but never a key value; ints are valid floats
+    if isinstance(value, bool):
+        return False
+    return isinstance(value, (int, float) if expected is float else expected)
+
+
+def decode_cursor(cursor, types):
+    # `types` holds the Python type of every key value, in order
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, UnicodeError):
+        raise ValueError('Invalid cursor')
+    if (not isinstance(values, list) or len(values) != len(types)
+            or not all(_matches(value, expected) for value, expected in zip(values, types))):
+        raise ValueError('Invalid cursor')
+    return values
+
+
+def get_page_limit():
+    limit = request.args.get('limit', type=int)
+    if limit is None:
+        return current_app.config['PAGE_SIZE_DEFAULT']
+    if limit < 1:
+        raise ValueError('Limit must be positive')
+    return min(limit, current_app.config['PAGE_SIZE_MAX'])
+
+
+def _after(columns, values):
+    # (a, b) > (x, y)  ==  a > x OR (a = x AND b > y)
+    column, value = columns[0], values[0]
+    if len(columns) == 1:
+        return column > value
+    return db.or_(column > value,
+                  db.and_(column == value, _after(columns[1:], values[1:])))
+
+
+# Returns (rows, next_cursor) for the page selected by the request's `limit`
+# and `cursor` arguments. `key` maps a row to its key values when rows are not
+# plain model instances.
+
+
+def paginate(query, *columns, key=None):
+    limit = get_page_limit()
+    cursor = request.args.get('cursor')
+    if cursor:
+        values = decode_cursor(cursor, [column.type.python_type for column in columns])
+        query = query.filter(_after(columns, values))
+
+    rows = query.order_by(*columns).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        values = key(last) if key else [
+            getattr(last, column.key) for column in columns]
+        next_cursor = encode_cursor(values)
+
+    return rows, next_cursor
+
+# Same contract as paginate() for an in-memory sequence already sorted by
+# `key`, whose values have the given `types`.
+
+
+def paginate_sequence(rows, key, types):
+    limit = get_page_limit()
+    cursor = request.args.get('cursor')
+    if cursor:
+        after = decode_cursor(cursor, types)
+        rows = [row for row in rows if list(key(row)) > after]
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(key(rows[-1]))
+
+    return rows, next_cursor
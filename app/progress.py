@@ -0,0 +1,65 @@
+from app.models import UserLevel
+
+# Opened/completed flags of an enrollment are stored as two bitmaps on
+# UserLevel, where bit i stands for the level's video at position i. Columns
+# hold the bitmap as little-endian bytes (NULL for no bits set); code works on
+# plain ints. UserVideoProgress rows are only created once a video has
+# answers and no longer carry the flags.
+
+
+def unpack(value):
+    return int.from_bytes(value, 'little') if value else 0
+
+
+def pack(bits):
+    return bits.to_bytes((bits.bit_length() + 7) // 8, 'little') if bits else None
+
+
+def has(bits, position):
+    return bool(bits >> position & 1)
+
+
+def count(bits, limit=None):
+    if limit is not None:
+        bits &= (1 << limit) - 1
+    return bits.bit_count()
+
+
+def remove(bits, position):
+    # Drops the bit at `position` and shifts the higher ones down by one.
+    low = bits & ((1 << position) - 1)
+    return low | (bits >> (position + 1) << position)
+
+
+def reorder(bits, old_positions):
+    # old_positions[new_position] is the position a video had before.
+    result = 0
+    for new_position, old_position in enumerate(old_positions):
+        if has(bits, old_position):
+            result |= 1 << new_position
+    return result
+
+
+def opened_videos(user_level):
+    return unpack(user_level.opened_videos)
+
+
+def completed_videos(user_level):
+    return unpack(user_level.completed_videos)
+
+
+def set_progress(user_level, opened=None, completed=None):
+    if opened is not None:
+        user_level.opened_videos = pack(opened)
+    if completed is not None:
+        user_level.completed_videos = pack(completed)
+        user_level.completed_videos_count = count(completed)
+
+
+def remap_level_progress(level_id, remap):
+    # Applies `remap(bits)` to both bitmaps of every enrollment in a level,
+    # after its videos were deleted or reordered.
+    for user_level in UserLevel.query.filter_by(level_id=level_id):
+        set_progress(user_level,
+                     opened=remap(opened_videos(user_level)),
+                     completed=remap(completed_videos(user_level)))
@@ -0,0 +1,327 @@
+import csv
+import io
+import json
+from datetime import datetime
+from flask import current_app
+from app import db
+from app.models import User, Level, Video, UserLevel, UserVideoProgress, ExamResult
+from app.progress import has, opened_videos, completed_videos
+
+# Progress reports are produced as generators of text chunks. Enrollments,
+# video progress and exam results are read by three queries ordered by
+# enrollment and merged in step, with the two unbounded ones streamed in
+# REPORT_BATCH_SIZE batches, so memory stays flat however long a user's
+# history is.
+
+
+class _GroupedRows:
+    # Consumes rows sorted by `key` and hands out the run for one key at a
+    # time. Keys must be requested in the same ascending order.
+
+    def __init__(self, rows, key):
+        self._rows = iter(rows)
+        self._key = key
+        self._next = next(self._rows, None)
+
+    def take(self, value):
+        while self._next is not None and self._key(self._next) < value:
+            self._next = next(self._rows, None)
+        while self._next is not None and self._key(self._next) == value:
+            yield self._next
+            self._next = next(self._rows, None)
+
+
+def _words(value):
+    return json.loads(value) if value else []
+
+
+def _video_entry(row, opened, completed):
+    return {
+        'video_id': row.video_id,
+        'youtube_link': row.youtube_link,
+        'is_opened': has(opened, row.position),
+        'is_completed': has(completed, row.position),
+        'correct_words': row.correct_words,
+        'wrong_words': row.wrong_words,
+        'percentage': row.percentage,
+        'correct_words_list': _words(row.correct_words_list),
+        'wrong_words_list': _words(row.wrong_words_list)
+    }
+
+
+def _exam_entry(row):
+    return {
+        'type': row.type,
+        'correct_words': row.correct_words,
+        'wrong_words': row.wrong_words,
+        'percentage': row.percentage,
+        'correct_words_list': _words(row.correct_words_list),
+        'wrong_words_list': _words(row.wrong_words_list),
+        'timestamp': row.timestamp.isoformat()
+    }
+
+
+def _level_entry(user_level, level):
+    return {
+        'level_id': level.id,
+        'level_name': level.name,
+        'level_description': level.description or 'No description',
+        'level_number': level.level_number,
+        'is_completed': user_level.is_completed,
+        'can_take_final_exam': user_level.can_take_final_exam,
+        'initial_exam_score': user_level.initial_exam_score,
+        'final_exam_score': user_level.final_exam_score,
+        'score_difference': user_level.score_difference
+    }
+
+
+def user_entry(user):
+    return {
+        'id': user.id,
+        'name': user.name,
+        'email': user.email,
+        'role': user.role,
+        'picture': user.picture or 'Not set'
+    }
+
+
+def iter_report_levels(user_ids=None):
+    # Yields (user_id, level_entry, videos, exams) for every enrollment of the
+    # selected users ordered by user, where videos and exams are lazy
+    # iterators that must be consumed before advancing to the next level.
+    batch_size = current_app.config['REPORT_BATCH_SIZE']
+
+    def scoped(query):
+        if user_ids is not None:
+            query = query.filter(UserLevel.user_id.in_(user_ids))
+        return query
+
+    enrollments = scoped(db.session.query(UserLevel, Level).join(
+        Level, Level.id == UserLevel.level_id)).order_by(
+        UserLevel.user_id, UserLevel.id).yield_per(batch_size)
+
+    # Every video of an enrolled level, with score details where answers
+    # were submitted; flags come from the enrollment's bitmaps.
+    progress = _GroupedRows(scoped(db.session.query(
+        UserLevel.user_id,
+        UserLevel.id.label('user_level_id'),
+        Video.id.label('video_id'),
+        Video.position,
+        Video.youtube_link,
+        UserVideoProgress.correct_words,
+        UserVideoProgress.wrong_words,
+        UserVideoProgress.percentage,
+        UserVideoProgress.correct_words_list,
+        UserVideoProgress.wrong_words_list
+    ).join(Video, Video.level_id == UserLevel.level_id).outerjoin(
+        UserVideoProgress, db.and_(UserVideoProgress.user_level_id == UserLevel.id,
+                                   UserVideoProgress.video_id == Video.id))).order_by(
+        UserLevel.user_id, UserLevel.id, Video.position
+    ).yield_per(batch_size), key=lambda row: (row.user_id, row.user_level_id))
+
+    exams = _GroupedRows(scoped(db.session.query(
+        UserLevel.user_id,
+        UserLevel.id.label('user_level_id'),
+        ExamResult.type,
+        ExamResult.correct_words,
+        ExamResult.wrong_words,
+        ExamResult.percentage,
+        ExamResult.correct_words_list,
+        ExamResult.wrong_words_list,
+        ExamResult.timestamp
+    ).join(UserLevel, db.and_(UserLevel.user_id == ExamResult.user_id,
+                              UserLevel.level_id == ExamResult.level_id))).order_by(
+        UserLevel.user_id, UserLevel.id, ExamResult.id
+    ).yield_per(batch_size), key=lambda row: (row.user_id, row.user_level_id))
+
+    for user_level, level in enrollments:
+        key = (user_level.user_id, user_level.id)
+        opened, completed = opened_videos(user_level), completed_videos(user_level)
+        yield (user_level.user_id, _level_entry(user_level, level),
+               (_video_entry(row, opened, completed) for row in progress.take(key)),
+               (_exam_entry(row) for row in exams.take(key)))
+
+
+def _dumps(value):
+    return json.dumps(value, sort_keys=True, separators=(',', ':'))
+
+
+def _json_items(items):
+    first = True
+    for item in items:
+        yield ('' if first else ',') + _dumps(item)
+        first = False
+
+
+def json_report_level(level, videos, exams):
+    yield _dumps(level)[:-1] + ',"videos":['
+    yield from _json_items(videos)
+    yield '],"exams":['
+    yield from _json_items(exams)
+    yield ']}'
+
+
+def json_report(user, levels):
+    yield '{"user":' + _dumps(user_entry(user)) + ',"levels":['
+    first = True
+    for _, level, videos, exams in levels:
+        if not first:
+            yield ','
+        first = False
+        yield from json_report_level(level, videos, exams)
+    yield ']}\n'
+
+
+def markdown_report(user, levels):
+    user_data = user_entry(user)
+    levels = iter(levels)
+    first_level = next(levels, None)
+
+    yield f"""
+# User Progress Report
+
+Generated on {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')}
+
+## User Information
+
+- **Name**: {user_data['name']}
+- **Email**: {user_data['email']}
+- **User ID**: {user_data['id']}
+- **Role**: {user_data['role'].capitalize()}
+- **Picture**: {user_data['picture']}
+
+## Levels Progress
+
+{'**No levels enrolled.**' if first_level is None else ''}
+
+"""
+    if first_level is None:
+        return
+
+    for _, level, videos, exams in _prepend(first_level, levels):
+        yield f"""
+### Level: {level['level_name']} (ID: {level['level_id']})
+
+- **Description**: {level['level_description']}
+- **Level Number**: {level['level_number']}
+- **Status**: {'Completed' if level['is_completed'] else 'In Progress'}
+- **Can Take Final Exam**: {'Yes' if level['can_take_final_exam'] else 'No'}
+- **Initial Exam Score**: {round(level['initial_exam_score'], 2) if level['initial_exam_score'] is not None else 'Not taken'}
+- **Final Exam Score**: {round(level['final_exam_score'], 2) if level['final_exam_score'] is not None else 'Not taken'}
+- **Score Difference**: {round(level['score_difference'], 2) if level['score_difference'] is not None else 'N/A'}
+
+#### Videos
+
+| Video ID | Opened | Completed | Correct Words | Wrong Words | Percentage | Correct Words List | Wrong Words List |
+|----------|--------|-----------|---------------|-------------|------------|--------------------|------------------|
+"""
+        for video in videos:
+            yield f"""
+| {video['video_id']} | {'Yes' if video['is_opened'] else 'No'} | {'Yes' if video['is_completed'] else 'No'} | {video['correct_words'] if video['correct_words'] is not None else 'N/A'} | {video['wrong_words'] if video['wrong_words'] is not None else 'N/A'} | {round(video['percentage'], 2) if video['percentage'] is not None else 'N/A'} | {', '.join(video['correct_words_list']) if video['correct_words_list'] else 'None'} | {', '.join(video['wrong_words_list']) if video['wrong_words_list'] else 'None'} |
+"""
+        yield """
+#### Exams
+
+| Type | Timestamp | Correct Words | Wrong Words | Percentage | Correct Words List | Wrong Words List |
+|------|-----------|---------------|-------------|------------|--------------------|------------------|
+"""
+        for exam in exams:
+            yield f"""
+| {exam['type'].capitalize()} | {exam['timestamp']} | {exam['correct_words']} | {exam['wrong_words']} | {round(exam['percentage'], 2)} | {', '.join(exam['correct_words_list']) if exam['correct_words_list'] else 'None'} | {', '.join(exam['wrong_words_list']) if exam['wrong_words_list'] else 'None'} |
+"""
+
+
+def _prepend(item, rest):
+    yield item
+    yield from rest
+
+
+# Bulk export: users are streamed in id order and merged with the enrollment
+# stream above, so exporting every user costs the same five queries as a
+# single report and holds at most one user's level in memory.
+
+
+def iter_user_reports(criteria=()):
+    batch_size = current_app.config['REPORT_BATCH_SIZE']
+    users = User.query.filter(*criteria).order_by(User.id).yield_per(batch_size)
+    user_ids = db.select(User.id).where(*criteria) if criteria else None
+    levels = _GroupedRows(iter_report_levels(user_ids=user_ids),
+                          key=lambda item: item[0])
+    for user in users:
+        yield user, levels.take(user.id)
+
+
+def _buffered(chunks, size=65536):
+    buffer, length = [], 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield ''.join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def ndjson_export(user_reports):
+    def lines():
+        for user, levels in user_reports:
+            yield from json_report(user, levels)
+    return _buffered(lines())
+
+
+CSV_COLUMNS = [
+    'user_id', 'user_name', 'email', 'role',
+    'level_id', 'level_name', 'level_number', 'is_completed', 'can_take_final_exam',
+    'initial_exam_score', 'final_exam_score', 'score_difference',
+    'videos_total', 'videos_opened', 'videos_completed',
+    'exams_taken', 'average_exam_percentage', 'last_exam_at'
+]
+
+
+def _csv_level_row(level, videos, exams):
+    videos_total = videos_opened = videos_completed = 0
+    for video in videos:
+        videos_total += 1
+        videos_opened += bool(video['is_opened'])
+        videos_completed += bool(video['is_completed'])
+
+    exams_taken, percentage_sum, last_exam_at = 0, 0.0, ''
+    for exam in exams:
+        exams_taken += 1
+        percentage_sum += exam['percentage']
+        last_exam_at = max(last_exam_at, exam['timestamp'])
+
+    return [
+        level['level_id'], level['level_name'], level['level_number'],
+        level['is_completed'], level['can_take_final_exam'],
+        level['initial_exam_score'], level['final_exam_score'], level['score_difference'],
+        videos_total, videos_opened, videos_completed,
+        exams_taken, round(percentage_sum / exams_taken, 2) if exams_taken else '', last_exam_at
+    ]
+
+
+def csv_export(user_reports):
+    # One row per enrollment; users without enrollments get a single row with
+    # the level columns left empty.
+    def rows():
+        output = io.StringIO()
+        writer = csv.writer(output)
+
+        def flush(row):
+            writer.writerow(row)
+            value = output.getvalue()
+            output.seek(0)
+            output.truncate()
+            return value
+
+        yield flush(CSV_COLUMNS)
+        for user, levels in user_reports:
+            user_columns = [user.id, user.name, user.email, user.role]
+            enrolled = False
+            for _, level, videos, exams in levels:
+                enrolled = True
+                yield flush(user_columns + _csv_level_row(level, videos, exams))
+            if not enrolled:
+                yield flush(user_columns + [''] * (len(CSV_COLUMNS) - len(user_columns)))
+    return _buffered(rows())
@@ -1,13 +1,24 @@
 import json
-import os
-import uuid
-from werkzeug.utils import secure_filename
-from datetime import datetime
-from flask import Blueprint, request, jsonify, send_from_directory, current_app, make_response
+from collections import Counter
+from flask import Blueprint, request, jsonify, current_app, abort, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app import db, bcrypt
-from app.models import User, Level, Video, UserLevel, UserVideoProgress, ExamResult, WelcomeVideo
-from app.auth import admin_required, client_required, authenticate_user, create_user_token
+from sqlalchemy.orm import joinedload
+from app import db
+from app.models import User, Level, Video, UserLevel, UserVideoProgress, ExamResult, WelcomeVideo, LevelWordStatistics, VideoWordStatistics
+from app.hashing import hash_password, HashingBusy
+from app.database import replica_reads
+from app.budgets import query_budget
+from app.auth import admin_required, client_required, authenticate_user, create_user_token, get_current_user, get_current_role
+from app.pagination import paginate, paginate_sequence
+from app.catalog import get_catalog, filter_levels, invalidate_catalog, CATALOG_VERSION
+from app.versions import get_version, bump_version, bump_user_progress, WELCOME_VIDEO_VERSION, ENROLLMENTS_VERSION
+from app.etag import make_etag, etag_matches, not_modified, with_etag
+from app.statistics import get_statistics, popular_levels, user_statistics, record_user_created, record_role_change, record_user_deleted, record_level_created, record_level_deleted, record_purchases
+from app.reports import iter_report_levels, iter_user_reports, json_report, markdown_report, ndjson_export, csv_export
+from app.images import store_image, release_images, image_response, image_variants, schedule_variants, sized_image_path
+from app.words import discard_user_answers, discard_video_answers, discard_level_answers, hardest_words
+from app.submissions import submit, await_submissions, score_percentage, SubmissionsPending
+from app.progress import pack, has, count, reorder, remove, opened_videos, completed_videos, set_progress, remap_level_progress
 
 
 bp = Blueprint('main', __name__)
@@ -16,8 +27,27 @@ bp = Blueprint('main', __name__)
 
 
 @bp.route('/Uploads/levels/<filename>')
+@query_budget(1)
 def serve_uploaded_file(filename):
-    return send_from_directory(current_app.config['UPLOAD_FOLDER'], filename)
+    return image_response(filename)
+
+# Password hashing pool saturated: fail fast and let the client retry
+
+
+@bp.errorhandler(HashingBusy)
+def hashing_busy(e):
+    response = jsonify({'message': 'Server busy, please retry'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+# Write-behind submissions not applied in time for a read
+
+
+@bp.errorhandler(SubmissionsPending)
+def submissions_pending(e):
+    response = jsonify({'message': 'Submissions are still being saved, please retry'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
 
 # Custom decorator to allow both admin and client roles
 
@@ -25,18 +55,33 @@ def serve_uploaded_file(filename):
 def admin_or_client_required(f):
     @jwt_required()
     def wrapper(*args, **kwargs):
-        current_user_id = int(get_jwt_identity())
-        user = User.query.get(current_user_id)
-        if user.role not in ['admin', 'client']:
+        if get_current_role() not in ['admin', 'client']:
             return jsonify({'message': 'Access denied'}), 403
         return f(*args, **kwargs)
     wrapper.__name__ = f.__name__
     return wrapper
 
+# Load a user's enrollments keyed by level id. Opened/completed flags come
+# from the enrollment's bitmaps, indexed by the position of the video in the
+# catalog's level, so no per-video rows are read.
+
+
+def load_user_levels(user_id, level_id=None):
+    query = UserLevel.query.filter_by(user_id=user_id)
+    if level_id is not None:
+        query = query.filter_by(level_id=level_id)
+    return {user_level.level_id: user_level for user_level in query.all()}
+
+
+def current_progress_version():
+    user = get_current_user()
+    return user.progress_version if user else 0
+
 # Welcome Video Management Routes
 
 
 @bp.route('/welcome_video', methods=['POST'])
+@query_budget(5)
 @admin_required
 def set_welcome_video():
     data = request.get_json()
@@ -48,6 +93,7 @@ def set_welcome_video():
     WelcomeVideo.query.delete()
     welcome_video = WelcomeVideo(video_url=video_url)
     db.session.add(welcome_video)
+    bump_version(WELCOME_VIDEO_VERSION)
     db.session.commit()
 
     return jsonify({
@@ -57,28 +103,33 @@ def set_welcome_video():
 
 
 @bp.route('/welcome_video', methods=['GET'])
+@query_budget(3)
 def get_welcome_video():
+    etag = make_etag('welcome_video', get_version(WELCOME_VIDEO_VERSION))
+    if etag_matches(etag):
+        return not_modified(etag, private=False)
+
     welcome_video = WelcomeVideo.query.first()
 
     if not welcome_video:
         return jsonify({'message': 'No welcome video set'}), 404
 
-    return jsonify({
+    return with_etag(jsonify({
         'video_url': welcome_video.video_url
-    }), 200
+    }), etag, private=False), 200
 
 # Authentication Routes
 
 
 @bp.route('/register', methods=['POST'])
+@query_budget(5)
 def register():
     data = request.get_json()
 
     if User.query.filter_by(email=data['email']).first():
         return jsonify({'message': 'User already exists'}), 400
 
-    hashed_password = bcrypt.generate_password_hash(
-        data['password']).decode('utf-8')
+    hashed_password = hash_password(data['password'])
 
     user = User(
         name=data['name'],
@@ -89,6 +140,7 @@ def register():
     )
 
     db.session.add(user)
+    record_user_created(user.role)
     db.session.commit()
 
     token = create_user_token(user)
@@ -104,6 +156,7 @@ def register():
 
 
 @bp.route('/login', methods=['POST'])
+@query_budget(2)
 def login():
     data = request.get_json()
 
@@ -126,12 +179,14 @@ def login():
 
 
 @bp.route('/users/<int:user_id>', methods=['GET'])
+@query_budget(5)
 @client_required
+@replica_reads(10)
 def get_user(user_id):
     current_user_id = int(get_jwt_identity())
 
-    user = User.query.get(current_user_id)
-    if user.role != 'admin' and current_user_id != user_id:
+    role = get_current_role()
+    if role != 'admin' and current_user_id != user_id:
         return jsonify({'message': 'Access denied'}), 403
 
     target_user = User.query.get_or_404(user_id)
@@ -146,12 +201,13 @@ def get_user(user_id):
 
 
 @bp.route('/users/<int:user_id>', methods=['PUT'])
+@query_budget(8)
 @client_required
 def update_user(user_id):
     current_user_id = int(get_jwt_identity())
 
-    user = User.query.get(current_user_id)
-    if user.role != 'admin' and current_user_id != user_id:
+    role = get_current_role()
+    if role != 'admin' and current_user_id != user_id:
         return jsonify({'message': 'Access denied'}), 403
 
     target_user = User.query.get_or_404(user_id)
@@ -160,9 +216,12 @@ def update_user(user_id):
     target_user.name = data.get('name', target_user.name)
     target_user.picture = data.get('picture', target_user.picture)
 
-    if user.role == 'admin':
-        target_user.role = data.get('role', target_user.role)
+    if role == 'admin':
+        new_role = data.get('role', target_user.role)
+        record_role_change(target_user.role, new_role)
+        target_user.role = new_role
 
+    bump_user_progress(user_id)
     db.session.commit()
 
     return jsonify({
@@ -175,35 +234,53 @@ def update_user(user_id):
 
 
 @bp.route('/admin/users', methods=['GET'])
+@query_budget(5)
 @admin_required
+@replica_reads(30)
 def get_all_users():
-    users = User.query.all()
+    try:
+        users, next_cursor = paginate(User.query, User.id)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    level_counts = dict(db.session.query(
+        UserLevel.user_id,
+        db.func.count(UserLevel.id)
+    ).filter(UserLevel.user_id.in_([user.id for user in users])).group_by(UserLevel.user_id).all()) if users else {}
+
     result = [{
         'id': user.id,
         'name': user.name,
         'email': user.email,
         'role': user.role,
         'picture': user.picture,
-        'level_count': len(user.levels)
+        'level_count': level_counts.get(user.id, 0)
     } for user in users]
-    return jsonify(result), 200
+    return jsonify({'items': result, 'next_cursor': next_cursor}), 200
 
 
 @bp.route('/admin/users/<int:user_id>', methods=['DELETE'])
+@query_budget(20)
 @admin_required
 def delete_user(user_id):
     user = User.query.get_or_404(user_id)
 
+    record_user_deleted(user)
+    discard_user_answers(user_id)
+    UserVideoProgress.query.filter(UserVideoProgress.user_level_id.in_(
+        db.select(UserLevel.id).where(UserLevel.user_id == user_id))).delete(synchronize_session=False)
     UserLevel.query.filter_by(user_id=user_id).delete()
     ExamResult.query.filter_by(user_id=user_id).delete()
 
     db.session.delete(user)
+    bump_version(ENROLLMENTS_VERSION)
     db.session.commit()
 
     return jsonify({'message': 'User deleted successfully'}), 200
 
 
 @bp.route('/admin/users/<int:user_id>/reset_password', methods=['POST'])
+@query_budget(6)
 @admin_required
 def reset_user_password(user_id):
     user = User.query.get_or_404(user_id)
@@ -213,13 +290,14 @@ def reset_user_password(user_id):
     if not new_password:
         return jsonify({'message': 'New password required'}), 400
 
-    user.password = bcrypt.generate_password_hash(new_password).decode('utf-8')
+    user.password = hash_password(new_password)
     db.session.commit()
 
     return jsonify({'message': 'Password reset successfully'}), 200
 
 
 @bp.route('/admin/users/<int:user_id>/assign_level/<int:level_id>', methods=['POST'])
+@query_budget(12)
 @admin_required
 def assign_level_to_user(user_id, level_id):
     user = User.query.get_or_404(user_id)
@@ -237,29 +315,76 @@ def assign_level_to_user(user_id, level_id):
         can_take_final_exam=False
     )
 
+    set_progress(user_level, opened=1, completed=0)
     db.session.add(user_level)
-    db.session.flush()
 
-    level_videos = Video.query.filter_by(
-        level_id=level_id).order_by(Video.id).all()
+    record_purchases({level_id: 1})
+    bump_user_progress(user_id)
+    bump_version(ENROLLMENTS_VERSION)
+    db.session.commit()
+
+    return jsonify({'message': 'Level assigned successfully'}), 201
 
-    for i, video in enumerate(level_videos):
-        video_progress = UserVideoProgress(
-            user_level_id=user_level.id,
-            video_id=video.id,
-            is_opened=(i == 0),
-            is_completed=False
-        )
-        db.session.add(video_progress)
 
+@bp.route('/admin/enrollments', methods=['POST'])
+@query_budget(20)
+@admin_required
+def bulk_enroll():
+    # Enrolls every user in user_ids into every level in level_ids with one
+    # set-based insert, skipping pairs that are already enrolled.
+    data = request.get_json(silent=True) or {}
+    user_ids, level_ids = data.get('user_ids'), data.get('level_ids')
+    if not all(isinstance(ids, list) and ids and all(type(i) is int for i in ids)
+               for ids in (user_ids, level_ids)):
+        return jsonify({'message': 'user_ids and level_ids must be non-empty lists of ids'}), 400
+    user_ids, level_ids = list(dict.fromkeys(user_ids)), list(dict.fromkeys(level_ids))
+    if len(user_ids) * len(level_ids) > current_app.config['BULK_ENROLLMENT_MAX_PAIRS']:
+        return jsonify({'message': 'Too many user and level pairs'}), 400
+
+    known_users = {user_id for user_id, in db.session.query(User.id).filter(User.id.in_(user_ids))}
+    known_levels = {level_id for level_id, in db.session.query(Level.id).filter(Level.id.in_(level_ids))}
+    enrolled = set(db.session.query(UserLevel.user_id, UserLevel.level_id).filter(
+        UserLevel.user_id.in_(known_users), UserLevel.level_id.in_(known_levels))) \
+        if known_users and known_levels else set()
+
+    results, new_rows = [], []
+    for user_id in user_ids:
+        for level_id in level_ids:
+            if user_id not in known_users:
+                status = 'user_not_found'
+            elif level_id not in known_levels:
+                status = 'level_not_found'
+            elif (user_id, level_id) in enrolled:
+                status = 'already_enrolled'
+            else:
+                status = 'enrolled'
+                new_rows.append({'user_id': user_id, 'level_id': level_id})
+            results.append({'user_id': user_id, 'level_id': level_id, 'status': status})
+
+    if new_rows:
+        # Same initial progress as a purchase: only the first video is open
+        for row in new_rows:
+            row.update(is_completed=False, can_take_final_exam=False,
+                       opened_videos=pack(1), completed_videos=None,
+                       completed_videos_count=0)
+        db.session.execute(db.insert(UserLevel), new_rows)
+
+        record_purchases(Counter(row['level_id'] for row in new_rows))
+        bump_user_progress(*{row['user_id'] for row in new_rows})
+        bump_version(ENROLLMENTS_VERSION)
     db.session.commit()
 
-    return jsonify({'message': 'Level assigned successfully'}), 201
+    return jsonify({
+        'enrolled': len(new_rows),
+        'skipped': len(results) - len(new_rows),
+        'results': results
+    }), 200
 
 # Level Management Routes
 
 
 @bp.route('/levels', methods=['POST'])
+@query_budget(8)
 @admin_required
 def create_level():
     data = request.form
@@ -286,16 +411,13 @@ def create_level():
     )
 
     if file:
-        filename = secure_filename(file.filename)
-        unique_filename = f"{uuid.uuid4()}_{filename}"
-        upload_path = os.path.join(
-            current_app.config['UPLOAD_FOLDER'], unique_filename)
-        os.makedirs(os.path.dirname(upload_path), exist_ok=True)
-        file.save(upload_path)
-        level.image_path = f"/Uploads/levels/{unique_filename}"
+        level.image_path = store_image(file)
 
     db.session.add(level)
+    record_level_created()
+    invalidate_catalog()
     db.session.commit()
+    schedule_variants(level.image_path)
 
     return jsonify({
         'id': level.id,
@@ -304,6 +426,7 @@ def create_level():
         'level_number': level.level_number,
         'welcome_video_url': level.welcome_video_url,
         'image_path': level.image_path,
+        'image_variants': image_variants(level.image_path),
         'price': level.price,
         'initial_exam_question': level.initial_exam_question,
         'final_exam_question': level.final_exam_question,
@@ -313,6 +436,7 @@ def create_level():
 
 
 @bp.route('/levels/<int:level_id>', methods=['PUT'])
+@query_budget(10)
 @admin_required
 def update_level(level_id):
     level = Level.query.get_or_404(level_id)
@@ -329,17 +453,15 @@ def update_level(level_id):
     level.final_exam_question = data.get(
         'final_exam_question', level.final_exam_question)
 
+    old_image_path = level.image_path
     if 'file' in request.files and request.files['file'].filename:
-        file = request.files['file']
-        filename = secure_filename(file.filename)
-        unique_filename = f"{uuid.uuid4()}_{filename}"
-        upload_path = os.path.join(
-            current_app.config['UPLOAD_FOLDER'], unique_filename)
-        os.makedirs(os.path.dirname(upload_path), exist_ok=True)
-        file.save(upload_path)
-        level.image_path = f"/Uploads/levels/{unique_filename}"
+        level.image_path = store_image(request.files['file'])
 
+    invalidate_catalog()
     db.session.commit()
+    if old_image_path != level.image_path:
+        release_images(old_image_path)
+        schedule_variants(level.image_path)
 
     return jsonify({
         'id': level.id,
@@ -348,6 +470,7 @@ def update_level(level_id):
         'level_number': level.level_number,
         'welcome_video_url': level.welcome_video_url,
         'image_path': level.image_path,
+        'image_variants': image_variants(level.image_path),
         'price': level.price,
         'initial_exam_question': level.initial_exam_question,
         'final_exam_question': level.final_exam_question,
@@ -357,187 +480,179 @@ def update_level(level_id):
 
 
 @bp.route('/levels/<int:level_id>', methods=['DELETE'])
+@query_budget(15)
 @admin_required
 def delete_level(level_id):
     level = Level.query.get_or_404(level_id)
-
-    for video in level.videos:
-        db.session.delete(video)
-
-    for user_level in level.user_levels:
-        db.session.delete(user_level)
-
-    db.session.delete(level)
+    record_level_deleted(level_id)
+    discard_level_answers(level_id)
+
+    # Answers and exams first, they reference the enrollments and videos
+    UserVideoProgress.query.filter(UserVideoProgress.video_id.in_(
+        db.select(Video.id).where(Video.level_id == level_id))).delete(synchronize_session=False)
+    ExamResult.query.filter_by(level_id=level_id).delete(synchronize_session=False)
+    UserLevel.query.filter_by(level_id=level_id).delete(synchronize_session=False)
+    Video.query.filter_by(level_id=level_id).delete(synchronize_session=False)
+
+    image_path = level.image_path
+    Level.query.filter_by(id=level_id).delete(synchronize_session=False)
+    invalidate_catalog()
     db.session.commit()
+    release_images(image_path)
 
     return jsonify({'message': 'Level deleted successfully'}), 200
 
 
 @bp.route('/levels', methods=['GET'])
+@query_budget(10)
 @admin_or_client_required
+@replica_reads(10)
 def get_levels():
     current_user_id = int(get_jwt_identity())
-    user = -User.query.get(current_user_id)
-
-    min_price = request.args.get('min_price', type=float)
-    max_price = request.args.get('max_price', type=float)
-    level_number = request.args.get('level_number', type=int)
-    name = request.args.get('name')
-
-    query = Level.query
+    role = get_current_role()
+    image_size = request.args.get('image_size')
+    if image_size and image_size not in current_app.config['IMAGE_VARIANT_SIZES']:
+        return jsonify({'message': 'Unknown image_size'}), 400
+    await_submissions(current_user_id)
+
+    catalog_version = get_version(CATALOG_VERSION)
+    etag = make_etag('levels', catalog_version, current_user_id, role,
+                     current_progress_version(),
+                     get_version(ENROLLMENTS_VERSION) if role == 'admin' else '',
+                     request.query_string.decode())
+    if etag_matches(etag):
+        return not_modified(etag)
+
+    levels = filter_levels(
+        get_catalog(catalog_version).levels,
+        min_price=request.args.get('min_price', type=float),
+        max_price=request.args.get('max_price', type=float),
+        level_number=request.args.get('level_number', type=int),
+        name=request.args.get('name'))
+    user_levels = load_user_levels(current_user_id)
+
+    user_counts = {}
+    if role == 'admin':
+        user_counts = dict(db.session.query(
+            UserLevel.level_id,
+            db.func.count(UserLevel.id)
+        ).group_by(UserLevel.level_id).all())
 
-    if min_price is not None:
-        query = query.filter(Level.price >= min_price)
-    if max_price is not None:
-        query = query.filter(Level.price <= max_price)
-    if level_number is not None:
-        query = query.filter(Level.level_number == level_number)
-    if name:
-        query = query.filter(Level.name.ilike(f'%{name}%'))
-
-    levels = query.order_by(Level.level_number).all()
     result = []
 
     for level in levels:
-        level_data = {
-            'id': level.id,
-            'name': level.name,
-            'description': level.description,
-            'level_number': level.level_number,
-            'welcome_video_url': level.welcome_video_url,
-            'image_path': level.image_path,
-            'price': level.price,
-            'initial_exam_question': level.initial_exam_question,
-            'final_exam_question': level.final_exam_question,
-            'videos_count': len(level.videos),
-            'videos': [],
-            'is_completed': False,
-            'can_take_final_exam': False
-        }
+        level_data = dict(level, videos=[], is_completed=False,
+                          can_take_final_exam=False)
+        if image_size:
+            level_data['image_path'] = sized_image_path(level, image_size)
 
-        user_level = UserLevel.query.filter_by(
-            user_id=current_user_id, level_id=level.id).first()
+        user_level = user_levels.get(level['id'])
         if user_level:
             level_data['is_completed'] = user_level.is_completed
             level_data['can_take_final_exam'] = user_level.can_take_final_exam
+            opened = opened_videos(user_level)
 
-            for video in level.videos:
-                video_progress = UserVideoProgress.query.filter_by(
-                    user_level_id=user_level.id,
-                    video_id=video.id
-                ).first()
+            for position, video in enumerate(level['videos']):
+                is_opened = has(opened, position)
 
                 video_data = {
-                    'id': video.id,
-                    'youtube_link': video.youtube_link if user.role == 'admin' else (video.youtube_link if video_progress and video_progress.is_opened else ''),
-                    'questions': json.loads(video.questions) if video.questions and (user.role == 'admin' or (video_progress and video_progress.is_opened)) else [],
-                    'is_opened': video_progress.is_opened if video_progress else False
+                    'id': video['id'],
+                    'youtube_link': video['youtube_link'] if role == 'admin' or is_opened else '',
+                    'questions': video['questions'] if role == 'admin' or is_opened else [],
+                    'is_opened': is_opened
                 }
                 level_data['videos'].append(video_data)
         else:
-            level_data['videos'] = [{'id': v.id, 'youtube_link': '', 'questions': [
-            ], 'is_opened': False} for v in level.videos]
+            level_data['videos'] = [{'id': v['id'], 'youtube_link': '', 'questions': [
+            ], 'is_opened': False} for v in level['videos']]
 
-        if user.role == 'admin':
-            level_data['user_count'] = len(level.user_levels)
+        if role == 'admin':
+            level_data['user_count'] = user_counts.get(level['id'], 0)
 
         result.append(level_data)
 
-    return jsonify(result), 200
+    return with_etag(jsonify(result), etag), 200
 
 
 @bp.route('/admin/levels', methods=['GET'])
+@query_budget(10)
 @admin_required
+@replica_reads(30)
 def admin_get_all_levels():
-    min_price = request.args.get('min_price', type=float)
-    max_price = request.args.get('max_price', type=float)
-    level_number = request.args.get('level_number', type=int)
-    name = request.args.get('name')
-
-    query = Level.query
-
-    if min_price is not None:
-        query = query.filter(Level.price >= min_price)
-    if max_price is not None:
-        query = query.filter(Level.price <= max_price)
-    if level_number is not None:
-        query = query.filter(Level.level_number == level_number)
-    if name:
-        query = query.filter(Level.name.ilike(f'%{name}%'))
-
-    levels = query.order_by(Level.level_number).all()
-    result = [{
-        'id': level.id,
-        'name': level.name,
-        'description': level.description,
-        'level_number': level.level_number,
-        'welcome_video_url': level.welcome_video_url,
-        'image_path': level.image_path,
-        'price': level.price,
-        'initial_exam_question': level.initial_exam_question,
-        'final_exam_question': level.final_exam_question,
-        'videos_count': len(level.videos),
-        'videos': [{
-            'id': v.id,
-            'youtube_link': v.youtube_link,
-            'questions': json.loads(v.questions) if v.questions else []
-        } for v in level.videos],
-        'user_count': len(level.user_levels)
-    } for level in levels]
-    return jsonify(result), 200
+    levels = filter_levels(
+        get_catalog().levels,
+        min_price=request.args.get('min_price', type=float),
+        max_price=request.args.get('max_price', type=float),
+        level_number=request.args.get('level_number', type=int),
+        name=request.args.get('name'))
+
+    try:
+        levels, next_cursor = paginate_sequence(
+            levels, lambda level: [level['level_number'], level['id']], (int, int))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    user_counts = dict(db.session.query(
+        UserLevel.level_id,
+        db.func.count(UserLevel.id)
+    ).filter(UserLevel.level_id.in_([level['id'] for level in levels])).group_by(UserLevel.level_id).all()) if levels else {}
+
+    result = [dict(level, user_count=user_counts.get(level['id'], 0))
+              for level in levels]
+    return jsonify({'items': result, 'next_cursor': next_cursor}), 200
 
 
 @bp.route('/levels/<int:level_id>', methods=['GET'])
+@query_budget(8)
 @client_required
+@replica_reads(10)
 def get_level(level_id):
     current_user_id = int(get_jwt_identity())
-    level = Level.query.get_or_404(level_id)
-
-    level_data = {
-        'id': level.id,
-        'name': level.name,
-        'description': level.description,
-        'level_number': level.level_number,
-        'welcome_video_url': level.welcome_video_url,
-        'image_path': level.image_path,
-        'price': level.price,
-        'initial_exam_question': level.initial_exam_question,
-        'final_exam_question': level.final_exam_question,
-        'videos_count': len(level.videos),
-        'videos': [],
-        'is_completed': False,
-        'can_take_final_exam': False
-    }
-
-    user_level = UserLevel.query.filter_by(
-        user_id=current_user_id, level_id=level.id).first()
+    image_size = request.args.get('image_size')
+    if image_size and image_size not in current_app.config['IMAGE_VARIANT_SIZES']:
+        return jsonify({'message': 'Unknown image_size'}), 400
+    await_submissions(current_user_id)
+
+    catalog_version = get_version(CATALOG_VERSION)
+    etag = make_etag('level', level_id, catalog_version, current_user_id,
+                     current_progress_version(), image_size or '')
+    if etag_matches(etag):
+        return not_modified(etag)
+
+    level = get_catalog(catalog_version).by_id.get(level_id)
+    if level is None:
+        abort(404)
+
+    level_data = dict(level, videos=[], is_completed=False,
+                      can_take_final_exam=False)
+    if image_size:
+        level_data['image_path'] = sized_image_path(level, image_size)
+
+    user_level = load_user_levels(current_user_id, level_id=level_id).get(level_id)
     if user_level:
         level_data['is_completed'] = user_level.is_completed
         level_data['can_take_final_exam'] = user_level.can_take_final_exam
+        opened = opened_videos(user_level)
 
-        for video in level.videos:
-            video_progress = UserVideoProgress.query.filter_by(
-                user_level_id=user_level.id,
-                video_id=video.id
-            ).first()
-
+        for position, video in enumerate(level['videos']):
             video_data = {
-                'id': video.id,
-                'youtube_link': video.youtube_link,
-                'questions': json.loads(video.questions) if video.questions else [],
-                'is_opened': video_progress.is_opened if video_progress else False
+                'id': video['id'],
+                'youtube_link': video['youtube_link'],
+                'questions': video['questions'],
+                'is_opened': has(opened, position)
             }
             level_data['videos'].append(video_data)
     else:
-        level_data['videos'] = [{'id': v.id, 'youtube_link': '', 'questions': [
-        ], 'is_opened': False} for v in level.videos]
+        level_data['videos'] = [{'id': v['id'], 'youtube_link': '', 'questions': [
+        ], 'is_opened': False} for v in level['videos']]
 
-    return jsonify(level_data), 200
+    return with_etag(jsonify(level_data), etag), 200
 
 # Video Management Routes
 
 
 @bp.route('/levels/<int:level_id>/videos', methods=['POST'])
+@query_budget(10)
 @admin_required
 def add_video_to_level(level_id):
     level = Level.query.get_or_404(level_id)
@@ -545,11 +660,14 @@ def add_video_to_level(level_id):
 
     video = Video(
         level_id=level_id,
+        position=db.session.query(db.func.coalesce(db.func.max(Video.position) + 1, 0)).filter(
+            Video.level_id == level_id).scalar(),
         youtube_link=data['youtube_link'],
         questions=json.dumps(data.get('questions', []))
     )
 
     db.session.add(video)
+    invalidate_catalog()
     db.session.commit()
 
     return jsonify({
@@ -561,6 +679,7 @@ def add_video_to_level(level_id):
 
 
 @bp.route('/videos/<int:video_id>', methods=['PUT'])
+@query_budget(6)
 @admin_required
 def update_video(video_id):
     video = Video.query.get_or_404(video_id)
@@ -570,6 +689,7 @@ def update_video(video_id):
     video.questions = json.dumps(
         data.get('questions', json.loads(video.questions) if video.questions else []))
 
+    invalidate_catalog()
     db.session.commit()
 
     return jsonify({
@@ -580,90 +700,112 @@ def update_video(video_id):
 
 
 @bp.route('/videos/<int:video_id>', methods=['DELETE'])
+@query_budget(15)
 @admin_required
 def delete_video(video_id):
     video = Video.query.get_or_404(video_id)
 
-    user_progresses = UserVideoProgress.query.filter_by(
-        video_id=video_id).all()
-    for progress in user_progresses:
-        db.session.delete(progress)
+    position = video.position
+    remap_level_progress(video.level_id, lambda bits: remove(bits, position))
+    discard_video_answers(video)
+    UserVideoProgress.query.filter_by(video_id=video_id).delete(
+        synchronize_session=False)
+
+    Video.query.filter(Video.level_id == video.level_id, Video.position > video.position).update(
+        {Video.position: Video.position - 1}, synchronize_session=False)
 
     db.session.delete(video)
+    invalidate_catalog()
     db.session.commit()
 
     return jsonify({'message': 'Video deleted successfully'}), 200
 
 
+@bp.route('/levels/<int:level_id>/videos/order', methods=['PUT'])
+@query_budget(10)
+@admin_required
+def reorder_videos(level_id):
+    Level.query.get_or_404(level_id)
+    data = request.get_json()
+    video_ids = data.get('video_ids') if data else None
+
+    videos = {video.id: video for video in Video.query.filter_by(level_id=level_id)}
+    if (not isinstance(video_ids, list) or not all(type(i) is int for i in video_ids)
+            or sorted(video_ids) != sorted(videos)):
+        return jsonify({'message': 'video_ids must list every video of the level exactly once'}), 400
+
+    old_positions = [videos[video_id].position for video_id in video_ids]
+    for position, video_id in enumerate(video_ids):
+        videos[video_id].position = position
+    remap_level_progress(level_id, lambda bits: reorder(bits, old_positions))
+
+    invalidate_catalog()
+    db.session.commit()
+
+    return jsonify({'level_id': level_id, 'video_ids': video_ids}), 200
+
+
 @bp.route('/admin/videos', methods=['GET'])
+@query_budget(5)
 @admin_required
+@replica_reads(30)
 def get_all_videos():
-    videos = Video.query.all()
+    try:
+        videos, next_cursor = paginate(
+            Video.query.options(joinedload(Video.level)), Video.id)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    # Every enrollment in a video's level tracks progress for it
+    progress_counts = dict(db.session.query(
+        UserLevel.level_id,
+        db.func.count(UserLevel.id)
+    ).filter(UserLevel.level_id.in_({video.level_id for video in videos})).group_by(UserLevel.level_id).all()) if videos else {}
+
     result = [{
         'id': video.id,
         'level_id': video.level_id,
         'level_name': video.level.name if video.level else '',
         'youtube_link': video.youtube_link,
         'questions': json.loads(video.questions) if video.questions else [],
-        'user_progress_count': UserVideoProgress.query.filter_by(video_id=video.id).count()
+        'user_progress_count': progress_counts.get(video.level_id, 0)
     } for video in videos]
-    return jsonify(result), 200
+    return jsonify({'items': result, 'next_cursor': next_cursor}), 200
 
 
 @bp.route('/users/<int:user_id>/levels/<int:level_id>/videos/<int:video_id>/complete', methods=['PATCH'])
+@query_budget(8)
 @client_required
 def complete_video(user_id, level_id, video_id):
     current_user_id = int(get_jwt_identity())
 
-    user = User.query.get(current_user_id)
-    if user.role != 'admin' and current_user_id != user_id:
+    role = get_current_role()
+    if role != 'admin' and current_user_id != user_id:
         return jsonify({'message': 'Access denied'}), 403
 
+    # The bitmaps are read, modified and written back, so the enrollment row
+    # is locked against concurrent completions on databases that support it
     user_level = UserLevel.query.filter_by(
-        user_id=user_id, level_id=level_id).first()
+        user_id=user_id, level_id=level_id).with_for_update().first()
     if not user_level:
         return jsonify({'message': 'Level not purchased'}), 400
 
-    video_progress = UserVideoProgress.query.filter_by(
-        user_level_id=user_level.id,
-        video_id=video_id
-    ).first()
-
-    if not video_progress:
+    position = db.session.query(Video.position).filter_by(
+        id=video_id, level_id=level_id).scalar()
+    if position is None:
         return jsonify({'message': 'Video not accessible'}), 400
 
-    video_progress.is_completed = True
-
-    level_videos = Video.query.filter_by(
-        level_id=level_id).order_by(Video.id).all()
-
-    current_video_index = None
-    for i, video in enumerate(level_videos):
-        if video.id == video_id:
-            current_video_index = i
-            break
-
-    if current_video_index is not None and (current_video_index + 1) < len(level_videos):
-        next_video = level_videos[current_video_index + 1]
-        next_video_progress = UserVideoProgress.query.filter_by(
-            user_level_id=user_level.id,
-            video_id=next_video.id
-        ).first()
-
-        if next_video_progress:
-            next_video_progress.is_opened = True
-
-    all_videos_completed = all(
-        UserVideoProgress.query.filter_by(
-            user_level_id=user_level.id,
-            video_id=video.id
-        ).first().is_completed
-        for video in level_videos
-    )
+    total_videos = Video.query.filter_by(level_id=level_id).count()
+    opened = opened_videos(user_level)
+    if position + 1 < total_videos:
+        opened |= 1 << (position + 1)
+    set_progress(user_level, opened=opened,
+                 completed=completed_videos(user_level) | 1 << position)
 
-    if all_videos_completed:
+    if user_level.completed_videos_count >= total_videos:
         user_level.can_take_final_exam = True
 
+    bump_user_progress(user_id)
     db.session.commit()
 
     return jsonify({'message': 'Video completed successfully'}), 200
@@ -672,6 +814,7 @@ def complete_video(user_id, level_id, video_id):
 
 
 @bp.route('/exams/<int:level_id>/initial', methods=['POST'])
+@query_budget(8)
 @client_required
 def submit_initial_exam(level_id):
     current_user_id = int(get_jwt_identity())
@@ -682,25 +825,11 @@ def submit_initial_exam(level_id):
     if not user_level:
         return jsonify({'message': 'Level not purchased'}), 400
 
-    total_words = data['correct_words'] + data['wrong_words']
-    percentage = (data['correct_words'] / total_words *
-                  100) if total_words > 0 else 0
-
-    exam_result = ExamResult(
-        user_id=current_user_id,
-        level_id=level_id,
-        correct_words=data['correct_words'],
-        wrong_words=data['wrong_words'],
-        percentage=percentage,
-        type='initial',
-        correct_words_list=json.dumps(data.get('correct_words_list', [])),
-        wrong_words_list=json.dumps(data.get('wrong_words_list', []))
-    )
-
-    user_level.initial_exam_score = percentage
-
-    db.session.add(exam_result)
-    db.session.commit()
+    percentage = score_percentage(data['correct_words'], data['wrong_words'])
+    submit('exam', current_user_id, level_id=level_id, type='initial',
+           correct_words=data['correct_words'], wrong_words=data['wrong_words'],
+           correct_words_list=data.get('correct_words_list', []),
+           wrong_words_list=data.get('wrong_words_list', []))
 
     return jsonify({
         'user_id': current_user_id,
@@ -713,6 +842,7 @@ def submit_initial_exam(level_id):
 
 
 @bp.route('/exams/<int:level_id>/final', methods=['POST'])
+@query_budget(10)
 @client_required
 def submit_final_exam(level_id):
     current_user_id = int(get_jwt_identity())
@@ -726,29 +856,11 @@ def submit_final_exam(level_id):
     if not user_level.can_take_final_exam:
         return jsonify({'message': 'Final exam not available yet. Complete all videos first.'}), 400
 
-    total_words = data['correct_words'] + data['wrong_words']
-    percentage = (data['correct_words'] / total_words *
-                  100) if total_words > 0 else 0
-
-    exam_result = ExamResult(
-        user_id=current_user_id,
-        level_id=level_id,
-        correct_words=data['correct_words'],
-        wrong_words=data['wrong_words'],
-        percentage=percentage,
-        type='final',
-        correct_words_list=json.dumps(data.get('correct_words_list', [])),
-        wrong_words_list=json.dumps(data.get('wrong_words_list', []))
-    )
-
-    user_level.final_exam_score = percentage
-    if user_level.initial_exam_score is not None:
-        user_level.score_difference = percentage - user_level.initial_exam_score
-
-    user_level.is_completed = True
-
-    db.session.add(exam_result)
-    db.session.commit()
+    percentage = score_percentage(data['correct_words'], data['wrong_words'])
+    submit('exam', current_user_id, level_id=level_id, type='final',
+           correct_words=data['correct_words'], wrong_words=data['wrong_words'],
+           correct_words_list=data.get('correct_words_list', []),
+           wrong_words_list=data.get('wrong_words_list', []))
 
     return jsonify({
         'user_id': current_user_id,
@@ -761,13 +873,16 @@ def submit_final_exam(level_id):
 
 
 @bp.route('/exams/<int:level_id>/user/<int:user_id>', methods=['GET'])
+@query_budget(5)
 @client_required
+@replica_reads(10)
 def get_user_exam_results(level_id, user_id):
     current_user_id = int(get_jwt_identity())
 
-    user = User.query.get(current_user_id)
-    if user.role != 'admin' and current_user_id != user_id:
+    role = get_current_role()
+    if role != 'admin' and current_user_id != user_id:
         return jsonify({'message': 'Access denied'}), 403
+    await_submissions(user_id)
 
     exam_results = ExamResult.query.filter_by(
         user_id=user_id, level_id=level_id).all()
@@ -786,32 +901,44 @@ def get_user_exam_results(level_id, user_id):
 
 
 @bp.route('/admin/exams', methods=['GET'])
+@query_budget(4)
 @admin_required
+@replica_reads(30)
 def get_all_exam_results():
-    exam_results = ExamResult.query.all()
+    query = db.session.query(ExamResult, User.name, Level.name).outerjoin(
+        User, User.id == ExamResult.user_id).outerjoin(
+        Level, Level.id == ExamResult.level_id)
+
+    try:
+        rows, next_cursor = paginate(
+            query, ExamResult.id, key=lambda row: [row[0].id])
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
     result = [{
         'id': exam.id,
         'user_id': exam.user_id,
-        'user_name': exam.user.name if exam.user else '',
+        'user_name': user_name or '',
         'level_id': exam.level_id,
-        'level_name': exam.level.name if exam.level else '',
+        'level_name': level_name or '',
         'correct_words': exam.correct_words,
         'wrong_words': exam.wrong_words,
         'percentage': exam.percentage,
         'type': exam.type,
         'timestamp': exam.timestamp.isoformat()
-    } for exam in exam_results]
-    return jsonify(result), 200
+    } for exam, user_name, level_name in rows]
+    return jsonify({'items': result, 'next_cursor': next_cursor}), 200
 
 # Video Questions Submission Route
 
 
 @bp.route('/users/<int:user_id>/levels/<int:level_id>/videos/<int:video_id>/submit_questions', methods=['POST'])
+@query_budget(12)
 @client_required
 def submit_video_questions(user_id, level_id, video_id):
     current_user_id = int(get_jwt_identity())
-    user = User.query.get(current_user_id)
-    if user.role != 'admin' and current_user_id != user_id:
+    role = get_current_role()
+    if role != 'admin' and current_user_id != user_id:
         return jsonify({'message': 'Access denied'}), 403
 
     user_level = UserLevel.query.filter_by(
@@ -819,26 +946,17 @@ def submit_video_questions(user_id, level_id, video_id):
     if not user_level:
         return jsonify({'message': 'Level not purchased'}), 400
 
-    video_progress = UserVideoProgress.query.filter_by(
-        user_level_id=user_level.id, video_id=video_id).first()
-    if not video_progress:
+    if not Video.query.filter_by(id=video_id, level_id=level_id).count():
         return jsonify({'message': 'Video not accessible'}), 400
 
     data = request.get_json()
     correct_words = data.get('correct_words', 0)
     wrong_words = data.get('wrong_words', 0)
-    total_words = correct_words + wrong_words
-    percentage = (correct_words / total_words * 100) if total_words > 0 else 0
-
-    video_progress.correct_words = correct_words
-    video_progress.wrong_words = wrong_words
-    video_progress.percentage = percentage
-    video_progress.correct_words_list = json.dumps(
-        data.get('correct_words_list', []))
-    video_progress.wrong_words_list = json.dumps(
-        data.get('wrong_words_list', []))
-
-    db.session.commit()
+    percentage = score_percentage(correct_words, wrong_words)
+    submit('video_answers', user_id, level_id=level_id, video_id=video_id,
+           correct_words=correct_words, wrong_words=wrong_words,
+           correct_words_list=data.get('correct_words_list', []),
+           wrong_words_list=data.get('wrong_words_list', []))
 
     return jsonify({
         'message': 'Video questions submitted successfully',
@@ -851,181 +969,98 @@ def submit_video_questions(user_id, level_id, video_id):
 
 
 @bp.route('/report', methods=['GET'])
+@query_budget(10)
 @client_required
+@replica_reads(10)
 def get_user_report():
     current_user_id = int(get_jwt_identity())
-    user = User.query.get(current_user_id)
+    await_submissions(current_user_id)
+    user = get_current_user()
     if not user:
         return jsonify({'message': 'User not found'}), 404
 
     output_format = request.args.get('format', 'markdown').lower()
+    # The markdown report states when it was generated, so equal versions
+    # only give equivalent bodies
+    weak = output_format != 'json'
 
-    # Gather user data
-    user_data = {
-        'id': user.id,
-        'name': user.name,
-        'email': user.email,
-        'role': user.role,
-        'picture': user.picture or 'Not set'
-    }
-
-    user_levels = UserLevel.query.filter_by(user_id=current_user_id).all()
-    levels_data = []
+    etag = make_etag('report', user.id, user.progress_version,
+                     get_version(CATALOG_VERSION), output_format)
+    if etag_matches(etag):
+        return not_modified(etag, weak=weak)
 
-    for user_level in user_levels:
-        level = user_level.level
-        videos_progress = UserVideoProgress.query.filter_by(
-            user_level_id=user_level.id).all()
-        videos_data = []
-
-        for progress in videos_progress:
-            video = Video.query.get(progress.video_id)
-            videos_data.append({
-                'video_id': video.id,
-                'youtube_link': video.youtube_link,
-                'is_opened': progress.is_opened,
-                'is_completed': progress.is_completed,
-                'correct_words': progress.correct_words,
-                'wrong_words': progress.wrong_words,
-                'percentage': progress.percentage,
-                'correct_words_list': json.loads(progress.correct_words_list) if progress.correct_words_list else [],
-                'wrong_words_list': json.loads(progress.wrong_words_list) if progress.wrong_words_list else []
-            })
-
-        exams = ExamResult.query.filter_by(
-            user_id=current_user_id, level_id=level.id).all()
-        exams_data = []
-
-        for exam in exams:
-            exams_data.append({
-                'type': exam.type,
-                'correct_words': exam.correct_words,
-                'wrong_words': exam.wrong_words,
-                'percentage': exam.percentage,
-                'correct_words_list': json.loads(exam.correct_words_list) if exam.correct_words_list else [],
-                'wrong_words_list': json.loads(exam.wrong_words_list) if exam.wrong_words_list else [],
-                'timestamp': exam.timestamp.isoformat()
-            })
-
-        level_data = {
-            'level_id': level.id,
-            'level_name': level.name,
-            'level_description': level.description or 'No description',
-            'level_number': level.level_number,
-            'is_completed': user_level.is_completed,
-            'can_take_final_exam': user_level.can_take_final_exam,
-            'initial_exam_score': user_level.initial_exam_score,
-            'final_exam_score': user_level.final_exam_score,
-            'score_difference': user_level.score_difference,
-            'videos': videos_data,
-            'exams': exams_data
-        }
-
-        levels_data.append(level_data)
+    levels = iter_report_levels(user_ids=[current_user_id])
 
     if output_format == 'json':
-        # Return JSON response (same as original)
-        report = {
-            'user': user_data,
-            'levels': levels_data
-        }
-        return jsonify(report), 200
+        response = Response(stream_with_context(
+            json_report(user, levels)), mimetype='application/json')
     else:
-        # Generate Markdown content
-        markdown_content = f"""
-# User Progress Report
-
-Generated on {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')}
-
-## User Information
-
-- **Name**: {user_data['name']}
-- **Email**: {user_data['email']}
-- **User ID**: {user_data['id']}
-- **Role**: {user_data['role'].capitalize()}
-- **Picture**: {user_data['picture']}
-
-## Levels Progress
-
-{'**No levels enrolled.**' if not levels_data else ''}
-
-"""
-        for level in levels_data:
-            markdown_content += f"""
-### Level: {level['level_name']} (ID: {level['level_id']})
-
-- **Description**: {level['level_description']}
-- **Level Number**: {level['level_number']}
-- **Status**: {'Completed' if level['is_completed'] else 'In Progress'}
-- **Can Take Final Exam**: {'Yes' if level['can_take_final_exam'] else 'No'}
-- **Initial Exam Score**: {round(level['initial_exam_score'], 2) if level['initial_exam_score'] is not None else 'Not taken'}
-- **Final Exam Score**: {round(level['final_exam_score'], 2) if level['final_exam_score'] is not None else 'Not taken'}
-- **Score Difference**: {round(level['score_difference'], 2) if level['score_difference'] is not None else 'N/A'}
-
-#### Videos
-
-| Video ID | Opened | Completed | Correct Words | Wrong Words | Percentage | Correct Words List | Wrong Words List |
-|----------|--------|-----------|---------------|-------------|------------|--------------------|------------------|
-"""
-            for video in level['videos']:
-                markdown_content += f"""
-| {video['video_id']} | {'Yes' if video['is_opened'] else 'No'} | {'Yes' if video['is_completed'] else 'No'} | {video['correct_words'] if video['correct_words'] is not None else 'N/A'} | {video['wrong_words'] if video['wrong_words'] is not None else 'N/A'} | {round(video['percentage'], 2) if video['percentage'] is not None else 'N/A'} | {', '.join(video['correct_words_list']) if video['correct_words_list'] else 'None'} | {', '.join(video['wrong_words_list']) if video['wrong_words_list'] else 'None'} |
-"""
-            markdown_content += f"""
-#### Exams
-
-| Type | Timestamp | Correct Words | Wrong Words | Percentage | Correct Words List | Wrong Words List |
-|------|-----------|---------------|-------------|------------|--------------------|------------------|
-"""
-            for exam in level['exams']:
-                markdown_content += f"""
-| {exam['type'].capitalize()} | {exam['timestamp']} | {exam['correct_words']} | {exam['wrong_words']} | {round(exam['percentage'], 2)} | {', '.join(exam['correct_words_list']) if exam['correct_words_list'] else 'None'} | {', '.join(exam['wrong_words_list']) if exam['wrong_words_list'] else 'None'} |
-"""
-        # Prepare Markdown response
-        response = make_response(markdown_content)
-        response.headers['Content-Type'] = 'text/markdown'
+        response = Response(stream_with_context(
+            markdown_report(user, levels)), mimetype='text/markdown')
         response.headers['Content-Disposition'] = f'inline; filename=user_report_{user.id}.md'
-        return response  # User Progress Routes
+    return with_etag(response, etag, weak=weak), 200
+
+@bp.route('/admin/reports/export', methods=['GET'])
+@query_budget(8)
+@admin_required
+@replica_reads(300)
+def export_user_reports():
+    output_format = request.args.get('format', 'ndjson').lower()
+    if output_format not in ('ndjson', 'csv'):
+        return jsonify({'message': 'Format must be ndjson or csv'}), 400
+
+    criteria = []
+    user_ids = request.args.get('user_ids')
+    if user_ids:
+        try:
+            criteria.append(User.id.in_(
+                [int(user_id) for user_id in user_ids.split(',')]))
+        except ValueError:
+            return jsonify({'message': 'user_ids must be a comma-separated list of ids'}), 400
+    role = request.args.get('role')
+    if role:
+        criteria.append(User.role == role)
+
+    user_reports = iter_user_reports(criteria)
+
+    if output_format == 'csv':
+        response = Response(stream_with_context(
+            csv_export(user_reports)), mimetype='text/csv')
+    else:
+        response = Response(stream_with_context(
+            ndjson_export(user_reports)), mimetype='application/x-ndjson')
+    response.headers['Content-Disposition'] = f'attachment; filename=user_reports.{output_format}'
+    return response
+
+# User Progress Routes
 
 
 @bp.route('/users/<int:user_id>/levels', methods=['GET'])
+@query_budget(8)
 @client_required
+@replica_reads(10)
 def get_user_levels(user_id):
     current_user_id = int(get_jwt_identity())
 
-    user = User.query.get(current_user_id)
-    if user.role != 'admin' and current_user_id != user_id:
+    role = get_current_role()
+    if role != 'admin' and current_user_id != user_id:
         return jsonify({'message': 'Access denied'}), 403
+    await_submissions(user_id)
 
-    user_levels = UserLevel.query.filter_by(user_id=user_id).all()
+    user_levels = UserLevel.query.filter_by(user_id=user_id).options(
+        joinedload(UserLevel.level).selectinload(Level.videos)).all()
 
     result = []
     for user_level in user_levels:
         level = user_level.level
+        opened, completed = opened_videos(user_level), completed_videos(user_level)
 
-        videos_progress = []
-        completed_videos_count = 0
-
-        for video in level.videos:
-            video_progress = UserVideoProgress.query.filter_by(
-                user_level_id=user_level.id,
-                video_id=video.id
-            ).first()
-
-            if video_progress:
-                videos_progress.append({
-                    'video_id': video.id,
-                    'is_opened': video_progress.is_opened,
-                    'is_completed': video_progress.is_completed
-                })
-                if video_progress.is_completed:
-                    completed_videos_count += 1
-            else:
-                videos_progress.append({
-                    'video_id': video.id,
-                    'is_opened': False,
-                    'is_completed': False
-                })
+        videos_progress = [{
+            'video_id': video.id,
+            'is_opened': has(opened, video.position),
+            'is_completed': has(completed, video.position)
+        } for video in level.videos]
+        completed_videos_count = count(completed, len(level.videos))
 
         level_data = {
             'user_id': user_id,
@@ -1048,12 +1083,13 @@ def get_user_levels(user_id):
 
 
 @bp.route('/users/<int:user_id>/levels/<int:level_id>/purchase', methods=['POST'])
+@query_budget(12)
 @client_required
 def purchase_level(user_id, level_id):
     current_user_id = int(get_jwt_identity())
 
-    user = User.query.get(current_user_id)
-    if user.role != 'admin' and current_user_id != user_id:
+    role = get_current_role()
+    if role != 'admin' and current_user_id != user_id:
         return jsonify({'message': 'Access denied'}), 403
 
     level = Level.query.get_or_404(level_id)
@@ -1070,33 +1106,25 @@ def purchase_level(user_id, level_id):
         can_take_final_exam=False
     )
 
+    set_progress(user_level, opened=1, completed=0)
     db.session.add(user_level)
-    db.session.flush()
-
-    level_videos = Video.query.filter_by(
-        level_id=level_id).order_by(Video.id).all()
-
-    for i, video in enumerate(level_videos):
-        video_progress = UserVideoProgress(
-            user_level_id=user_level.id,
-            video_id=video.id,
-            is_opened=(i == 0),
-            is_completed=False
-        )
-        db.session.add(video_progress)
 
+    record_purchases({level_id: 1})
+    bump_user_progress(user_id)
+    bump_version(ENROLLMENTS_VERSION)
     db.session.commit()
 
     return jsonify({'message': 'Level purchased successfully'}), 201
 
 
 @bp.route('/users/<int:user_id>/levels/<int:level_id>/update_progress', methods=['PATCH'])
+@query_budget(8)
 @client_required
 def update_level_progress(user_id, level_id):
     current_user_id = int(get_jwt_identity())
 
-    user = User.query.get(current_user_id)
-    if user.role != 'admin' and current_user_id != user_id:
+    role = get_current_role()
+    if role != 'admin' and current_user_id != user_id:
         return jsonify({'message': 'Access denied'}), 403
 
     user_level = UserLevel.query.filter_by(
@@ -1104,20 +1132,18 @@ def update_level_progress(user_id, level_id):
     if not user_level:
         return jsonify({'message': 'Level not purchased'}), 400
 
-    completed_videos = UserVideoProgress.query.filter_by(
-        user_level_id=user_level.id,
-        is_completed=True
-    ).count()
-
     total_videos = Video.query.filter_by(level_id=level_id).count()
+    completed_count = count(completed_videos(user_level), total_videos)
 
-    if completed_videos == total_videos:
+    user_level.completed_videos_count = completed_count
+    if completed_count == total_videos:
         user_level.can_take_final_exam = True
 
+    bump_user_progress(user_id)
     db.session.commit()
 
     return jsonify({
-        'completed_videos_count': completed_videos,
+        'completed_videos_count': completed_count,
         'total_videos_count': total_videos,
         'can_take_final_exam': user_level.can_take_final_exam
     }), 200
@@ -1126,62 +1152,88 @@ def update_level_progress(user_id, level_id):
 
 
 @bp.route('/admin/statistics', methods=['GET'])
+@query_budget(12)
 @admin_required
+@replica_reads(60)
 def get_admin_statistics():
-    total_users = User.query.filter_by(role='client').count()
-    total_levels = Level.query.count()
-    total_purchases = UserLevel.query.count()
-    completed_levels = UserLevel.query.filter_by(is_completed=True).count()
+    statistics = get_statistics()
+    total_purchases = statistics.total_purchases
+    completed_levels = statistics.completed_levels
 
     completion_rate = (completed_levels / total_purchases *
                        100) if total_purchases > 0 else 0
 
-    popular_levels = db.session.query(
-        Level.name,
-        db.func.count(UserLevel.id).label('purchases')
-    ).join(UserLevel).group_by(Level.id).order_by(db.desc('purchases')).limit(5).all()
-
     return jsonify({
-        'total_users': total_users,
-        'total_levels': total_levels,
+        'total_users': statistics.total_clients,
+        'total_levels': statistics.total_levels,
         'total_purchases': total_purchases,
         'completed_levels': completed_levels,
         'completion_rate': round(completion_rate, 2),
-        'popular_levels': [{'name': level, 'purchases': purchases} for level, purchases in popular_levels]
+        'popular_levels': [{'name': level, 'purchases': purchases} for level, purchases in popular_levels()]
     }), 200
 
 
 @bp.route('/admin/users/<int:user_id>/statistics', methods=['GET'])
+@query_budget(5)
 @admin_required
+@replica_reads(60)
 def get_user_statistics(user_id):
-    user = User.query.get_or_404(user_id)
+    statistics = user_statistics([user_id]).get(user_id)
+    if statistics is None:
+        abort(404)
+
+    return jsonify(statistics), 200
 
-    purchased_levels = UserLevel.query.filter_by(user_id=user_id).count()
-    completed_levels = UserLevel.query.filter_by(
-        user_id=user_id, is_completed=True).count()
 
-    exam_results = ExamResult.query.filter_by(user_id=user_id).all()
+@bp.route('/admin/users/statistics', methods=['GET'])
+@query_budget(4)
+@admin_required
+@replica_reads(60)
+def get_users_statistics():
+    try:
+        user_ids = [int(user_id) for user_id in request.args.get('user_ids', '').split(',') if user_id]
+    except ValueError:
+        return jsonify({'message': 'user_ids must be a comma-separated list of ids'}), 400
+
+    if not user_ids:
+        return jsonify({'message': 'user_ids required'}), 400
+    if len(user_ids) > current_app.config['PAGE_SIZE_MAX']:
+        return jsonify({'message': f"At most {current_app.config['PAGE_SIZE_MAX']} user_ids per request"}), 400
 
-    initial_scores = [
-        exam.percentage for exam in exam_results if exam.type == 'initial']
-    final_scores = [
-        exam.percentage for exam in exam_results if exam.type == 'final']
+    return jsonify({'items': list(user_statistics(user_ids).values())}), 200
 
-    avg_initial_score = sum(initial_scores) / \
-        len(initial_scores) if initial_scores else 0
-    avg_final_score = sum(final_scores) / \
-        len(final_scores) if final_scores else 0
-    avg_improvement = avg_final_score - \
-        avg_initial_score if initial_scores and final_scores else 0
 
+@bp.route('/admin/levels/<int:level_id>/hardest_words', methods=['GET'])
+@query_budget(5)
+@admin_required
+@replica_reads(300)
+def get_level_hardest_words(level_id):
+    Level.query.get_or_404(level_id)
+    limit = request.args.get('limit', 10, type=int)
+    if limit < 1:
+        return jsonify({'message': 'Limit must be positive'}), 400
     return jsonify({
-        'user_id': user_id,
-        'user_name': user.name,
-        'purchased_levels': purchased_levels,
-        'completed_levels': completed_levels,
-        'completion_rate': round((completed_levels / purchased_levels * 100) if purchased_levels > 0 else 0, 2),
-        'average_initial_score': round(avg_initial_score, 2),
-        'average_final_score': round(avg_final_score, 2),
-        'average_improvement': round(avg_improvement, 2),
-        'total_exams_taken': len(exam_results)
+        'level_id': level_id,
+        'words': hardest_words(
+            LevelWordStatistics, level_id=level_id,
+            limit=min(limit, current_app.config['PAGE_SIZE_MAX']),
+            min_attempts=request.args.get('min_attempts', 1, type=int))
+    }), 200
+
+
+@bp.route('/admin/videos/<int:video_id>/hardest_words', methods=['GET'])
+@query_budget(5)
+@admin_required
+@replica_reads(300)
+def get_video_hardest_words(video_id):
+    Video.query.get_or_404(video_id)
+    limit = request.args.get('limit', 10, type=int)
+    if limit < 1:
+        return jsonify({'message': 'Limit must be positive'}), 400
+    return jsonify({
+        'video_id': video_id,
+        'words': hardest_words(
+            VideoWordStatistics, video_id=video_id,
+            limit=min(limit, current_app.config['PAGE_SIZE_MAX']),
+            min_attempts=request.args.get('min_attempts', 1, type=int))
     }), 200
@@ -0,0 +1,250 @@
+import json
+import random
+import time
+from datetime import datetime, timedelta
+import click
+from sqlalchemy import insert
+from app import db, bcrypt
+from app.models import User, Level, Video, UserLevel, UserVideoProgress, ExamResult
+from app.progress import pack
+from app.statistics import recompute_statistics
+from app.submissions import score_percentage
+from app.versions import bump_version, CATALOG_VERSION, ENROLLMENTS_VERSION
+from app.words import record_word_outcomes
+
+# Synthetic data at production scale. Rows are generated from one seeded
+# random.Random, so the same options always produce the same data. They are
+# inserted with table-level executemany in chunks of SEED_CHUNK rows, bypassing
+# the ORM unit of work, and every user shares one bcrypt hash computed up
+# front. Answer lists are drawn from a few precomputed variants per level and
+# video, which keeps generation cheap and lets the word statistics be tallied
+# per variant instead of re-reading millions of rows. The statistics rollup
+# is rebuilt at the end.
+
+SEED_CHUNK = 50000
+ANSWER_VARIANTS = 32
+LEVEL_WORDS = 40
+VIDEO_QUESTIONS = 5
+EXAM_QUESTIONS = 10
+STARTED = datetime(2024, 1, 1)
+
+FIRST_NAMES = ('Amina', 'Ben', 'Carla', 'Daniel', 'Elena', 'Farid', 'Grace', 'Hiro', 'Ines', 'Jonas',
+               'Karim', 'Lena', 'Mateo', 'Nadia', 'Omar', 'Priya', 'Rosa', 'Samir', 'Tara', 'Yusuf')
+LAST_NAMES = ('Ali', 'Becker', 'Chen', 'Diaz', 'Evans', 'Fischer', 'Garcia', 'Haddad', 'Ivanova', 'Khan',
+              'Lopez', 'Martin', 'Nguyen', 'Okafor', 'Petrov', 'Rossi', 'Silva', 'Tanaka', 'Weber', 'Yilmaz')
+VOCABULARY = (
+    'apple', 'bread', 'chair', 'door', 'egg', 'friend', 'garden', 'house', 'island', 'juice',
+    'kitchen', 'lamp', 'market', 'night', 'orange', 'pencil', 'queen', 'river', 'school', 'table',
+    'umbrella', 'village', 'window', 'yellow', 'zebra', 'answer', 'beach', 'cloud', 'dinner', 'engine',
+    'forest', 'guitar', 'holiday', 'invite', 'journey', 'kettle', 'letter', 'mountain', 'needle', 'ocean',
+    'pillow', 'question', 'rabbit', 'summer', 'ticket', 'uncle', 'valley', 'winter', 'yesterday', 'bottle',
+    'candle', 'doctor', 'evening', 'flower', 'glass', 'hospital', 'library', 'morning', 'number', 'office',
+    'picture', 'rain', 'shirt', 'train', 'water', 'weekend', 'airport', 'bridge', 'coffee', 'desk',
+    'family', 'hungry', 'jacket', 'key', 'lemon', 'money', 'notebook', 'plate', 'road', 'street',
+)
+
+
+def _insert(model, rows):
+    table, chunk, total = model.__table__, [], 0
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= SEED_CHUNK:
+            db.session.execute(insert(table), chunk)
+            total += len(chunk)
+            chunk = []
+    if chunk:
+        db.session.execute(insert(table), chunk)
+        total += len(chunk)
+    db.session.commit()
+    return total
+
+
+def _reset_sequences(*models):
+    # Rows are inserted with explicit ids, which PostgreSQL's id sequences do
+    # not see; move them past the largest id so later inserts do not collide.
+    # SQLite and MySQL pick up explicit ids on their own.
+    bind = db.session.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+    for model in models:
+        table = model.__table__
+        last_id = db.func.max(table.c.id)
+        db.session.execute(db.select(db.func.setval(
+            db.func.pg_get_serial_sequence(bind.dialect.identifier_preparer.format_table(table), 'id'),
+            db.func.coalesce(last_id, 1), last_id.is_not(None))))
+    db.session.commit()
+
+
+def _variant(words, wrong):
+    correct_words, wrong_words = words[wrong:], words[:wrong]
+    return {
+        'correct_words': len(correct_words),
+        'wrong_words': len(wrong_words),
+        'percentage': score_percentage(len(correct_words), len(wrong_words)),
+        'correct_words_list': json.dumps(correct_words),
+        'wrong_words_list': json.dumps(wrong_words),
+    }, correct_words, wrong_words
+
+
+def _answer_variants(rng, words, size):
+    # (row fields, correct words, wrong words); fewer mistakes are likelier
+    return [_variant(rng.sample(words, size), min(rng.randint(0, size), rng.randint(0, size)))
+            for _ in range(ANSWER_VARIANTS)]
+
+
+def _tally(outcomes, variant, times):
+    _, correct_words, wrong_words = variant
+    for word in correct_words:
+        outcomes.setdefault(word, [0, 0])[0] += times
+    for word in wrong_words:
+        outcomes.setdefault(word, [0, 0])[1] += times
+
+
+def seed_data(users=10000, admins=1, levels=100, videos_per_level=50, enrollments_per_user=10,
+              exams_per_enrollment=10, answers_per_enrollment=None, password='password', seed=42):
+    rng = random.Random(seed)
+    password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
+    counts = {}
+
+    def user_rows():
+        for user_id in range(1, admins + users + 1):
+            if user_id <= admins:
+                name, email, role = f'Admin {user_id}', f'admin{user_id}@example.com', 'admin'
+            else:
+                first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+                name, email, role = f'{first} {last}', f'{first}.{last}.{user_id}@example.com'.lower(), 'client'
+            yield {'id': user_id, 'name': name, 'email': email, 'password': password_hash, 'role': role,
+                   'picture': None, 'progress_version': 0}
+    counts['users'] = _insert(User, user_rows())
+
+    level_words = {level_id: rng.sample(VOCABULARY, LEVEL_WORDS) for level_id in range(1, levels + 1)}
+    counts['levels'] = _insert(Level, ({
+        'id': level_id, 'name': f'Level {level_id}', 'level_number': level_id,
+        'description': f'Vocabulary set {level_id}: {", ".join(level_words[level_id][:3])} and more',
+        'welcome_video_url': None, 'image_path': None, 'price': rng.choice((9.99, 14.99, 19.99, 29.99)),
+        'initial_exam_question': json.dumps(level_words[level_id][:EXAM_QUESTIONS]),
+        'final_exam_question': json.dumps(level_words[level_id][-EXAM_QUESTIONS:]),
+    } for level_id in range(1, levels + 1)))
+
+    # Video ids are consecutive per level, ordered by position
+    def video_id(level_id, position):
+        return (level_id - 1) * videos_per_level + position + 1
+
+    video_questions = {video_id(level_id, position): rng.sample(level_words[level_id], VIDEO_QUESTIONS)
+                       for level_id in range(1, levels + 1) for position in range(videos_per_level)}
+    counts['videos'] = _insert(Video, ({
+        'id': video_id(level_id, position), 'level_id': level_id, 'position': position,
+        'youtube_link': f'https://www.youtube.com/watch?v=seed{level_id:04d}{position:03d}',
+        'questions': json.dumps(video_questions[video_id(level_id, position)]),
+    } for level_id in range(1, levels + 1) for position in range(videos_per_level)))
+
+    exam_variants = {level_id: _answer_variants(rng, level_words[level_id], EXAM_QUESTIONS)
+                     for level_id in level_words}
+    video_variants = {video: _answer_variants(rng, questions, VIDEO_QUESTIONS)
+                      for video, questions in video_questions.items()}
+
+    # Enrollments with their progress, video answers and exam histories.
+    # Videos unlock in order, so a user has completed a prefix of the level and
+    # opened the next video; the final exam is only taken once all videos are
+    # complete.
+    counts.update(enrollments=0, video_answers=0, exam_results=0)
+    enrollments, answers, exams = [], [], []
+    exam_uses, answer_uses = {}, {}
+
+    def flush():
+        counts['enrollments'] += _insert(UserLevel, enrollments)
+        counts['video_answers'] += _insert(UserVideoProgress, answers)
+        counts['exam_results'] += _insert(ExamResult, exams)
+        for rows in (enrollments, answers, exams):
+            rows.clear()
+
+    for user_id in range(admins + 1, admins + users + 1):
+        enrolled = rng.sample(range(1, levels + 1), min(levels, rng.randint(0, 2 * enrollments_per_user)))
+        for level_id in sorted(enrolled):
+            user_level_id = counts['enrollments'] + len(enrollments) + 1
+            completed = rng.randint(0, videos_per_level)
+            opened = min(videos_per_level, completed + 1)
+            taken = rng.randint(1, 2 * exams_per_enrollment - 1) if exams_per_enrollment else 0
+            finished = completed == videos_per_level and taken > 1
+
+            for position in range(completed if answers_per_enrollment is None
+                                  else min(completed, answers_per_enrollment)):
+                video = video_id(level_id, position)
+                variant = rng.randrange(ANSWER_VARIANTS)
+                answers.append(dict(video_variants[video][variant][0],
+                                    user_level_id=user_level_id, video_id=video))
+                key = (level_id, video, variant)
+                answer_uses[key] = answer_uses.get(key, 0) + 1
+
+            timestamp = STARTED + timedelta(minutes=rng.randrange(365 * 24 * 60))
+            scores = {}
+            for i in range(taken):
+                exam_type = 'final' if finished and i == taken - 1 else 'initial'
+                variant = rng.randrange(ANSWER_VARIANTS)
+                row = exam_variants[level_id][variant][0]
+                timestamp += timedelta(minutes=rng.randint(10, 4320))
+                exams.append(dict(row, user_id=user_id, level_id=level_id, type=exam_type, timestamp=timestamp))
+                scores[exam_type] = row['percentage']
+                key = (level_id, variant)
+                exam_uses[key] = exam_uses.get(key, 0) + 1
+
+            enrollments.append({
+                'id': user_level_id, 'user_id': user_id, 'level_id': level_id,
+                'is_completed': finished, 'can_take_final_exam': completed == videos_per_level,
+                'initial_exam_score': scores.get('initial'), 'final_exam_score': scores.get('final'),
+                'score_difference': scores['final'] - scores['initial']
+                if 'final' in scores and 'initial' in scores else None,
+                'completed_videos_count': completed,
+                'opened_videos': pack((1 << opened) - 1), 'completed_videos': pack((1 << completed) - 1),
+            })
+        # Keep memory flat by writing every SEED_CHUNK or so generated rows
+        if len(answers) + len(exams) >= SEED_CHUNK:
+            flush()
+    flush()
+    _reset_sequences(User, Level, Video, UserLevel)
+
+    by_level, by_video = {}, {}
+    for (level_id, variant), times in exam_uses.items():
+        _tally(by_level.setdefault(level_id, {}), exam_variants[level_id][variant], times)
+    for (level_id, video, variant), times in answer_uses.items():
+        _tally(by_level.setdefault(level_id, {}), video_variants[video][variant], times)
+        _tally(by_video.setdefault(video, {}), video_variants[video][variant], times)
+    record_word_outcomes(by_level, by_video)
+    recompute_statistics()
+    bump_version(CATALOG_VERSION)
+    bump_version(ENROLLMENTS_VERSION)
+    db.session.commit()
+    return counts
+
+
+@click.command('seed-data')
+@click.option('--users', default=10000, show_default=True, help='client accounts')
+@click.option('--admins', default=1, show_default=True, help='admin accounts, admin1@example.com and up')
+@click.option('--levels', default=100, show_default=True)
+@click.option('--videos-per-level', default=50, show_default=True)
+@click.option('--enrollments-per-user', default=10, show_default=True, help='average per client')
+@click.option('--exams-per-enrollment', default=10, show_default=True, help='average exam history length')
+@click.option('--answers-per-enrollment', type=int, default=None,
+              help='cap on answered videos per enrollment, default every completed video')
+@click.option('--password', default='password', show_default=True, help='password of every account')
+@click.option('--seed', default=42, show_default=True, help='random seed; the same options give the same data')
+@click.option('--drop', is_flag=True, help='drop and recreate all tables first')
+def seed_data_command(drop, **options):
+    """Fill an empty database with synthetic users, levels, progress and exams."""
+    if drop:
+        click.confirm('Drop all tables and their data?', abort=True)
+        db.drop_all(bind_key=None)
+        db.create_all(bind_key=None)
+    elif db.session.query(User.id).first() is not None:
+        raise click.ClickException('The database already has users; use --drop to start from empty tables.')
+
+    started = time.perf_counter()
+    counts = seed_data(**options)
+    elapsed = time.perf_counter() - started
+    for table, rows in counts.items():
+        click.echo(f'{table:<15} {rows:>12,}')
+    click.echo(f'Seeded {sum(counts.values()):,} rows in {elapsed:.1f} s.')
+
+
+def init_app(app):
+    app.cli.add_command(seed_data_command)
@@ -0,0 +1,211 @@
+import click
+from sqlalchemy.dialects import postgresql, sqlite
+from app import db
+from app.database import reading_replica, use_primary
+from app.models import User, Level, UserLevel, ExamResult, StatisticsRollup, LevelStatistics
+
+# Admin dashboard totals are kept in a single-row rollup plus one row per
+# level. Every write that changes a total adjusts the rollup with relative
+# UPDATEs inside its own transaction; recompute_statistics() rebuilds both
+# tables from the source rows to repair drift. Until the rollup row exists
+# (new or freshly upgraded database) deltas are skipped and the first read
+# builds it from scratch.
+
+ROLLUP_ID = 1
+
+
+def _adjust(**deltas):
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    StatisticsRollup.query.filter_by(id=ROLLUP_ID).update(
+        {getattr(StatisticsRollup, name): getattr(StatisticsRollup, name) + delta
+         for name, delta in deltas.items()},
+        synchronize_session=False)
+
+
+def _add_purchases(purchases):
+    # {level_id: count} in one relative upsert
+    rows = [{'level_id': level_id, 'purchases': count} for level_id, count in purchases.items() if count]
+    if not rows:
+        return
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        insert = (sqlite if dialect == 'sqlite' else postgresql).insert(LevelStatistics)
+        db.session.execute(insert.on_conflict_do_update(
+            index_elements=['level_id'],
+            set_={'purchases': LevelStatistics.purchases + insert.excluded.purchases}), rows)
+        return
+
+    for row in rows:
+        updated = LevelStatistics.query.filter_by(level_id=row['level_id']).update(
+            {LevelStatistics.purchases: LevelStatistics.purchases + row['purchases']},
+            synchronize_session=False)
+        if not updated:
+            db.session.add(LevelStatistics(**row))
+
+
+def record_user_created(role):
+    _adjust(total_clients=1 if role == 'client' else 0)
+
+
+def record_role_change(old_role, new_role):
+    _adjust(total_clients=(new_role == 'client') - (old_role == 'client'))
+
+
+def record_user_deleted(user):
+    # Must run before the user's enrollments are deleted.
+    purchases, completed = db.session.query(
+        db.func.count(UserLevel.id),
+        db.func.coalesce(db.func.sum(db.case((UserLevel.is_completed, 1), else_=0)), 0)
+    ).filter(UserLevel.user_id == user.id).one()
+    if purchases:
+        LevelStatistics.query.filter(LevelStatistics.level_id.in_(
+            db.select(UserLevel.level_id).where(UserLevel.user_id == user.id))).update(
+            {LevelStatistics.purchases: LevelStatistics.purchases - 1},
+            synchronize_session=False)
+    _adjust(total_clients=-1 if user.role == 'client' else 0,
+            total_purchases=-purchases,
+            completed_levels=-completed)
+
+
+def record_level_created():
+    _adjust(total_levels=1)
+
+
+def record_level_deleted(level_id):
+    # Must run before the level's enrollments are deleted.
+    purchases, completed = db.session.query(
+        db.func.count(UserLevel.id),
+        db.func.coalesce(db.func.sum(db.case((UserLevel.is_completed, 1), else_=0)), 0)
+    ).filter(UserLevel.level_id == level_id).one()
+    LevelStatistics.query.filter_by(level_id=level_id).delete(synchronize_session=False)
+    _adjust(total_levels=-1, total_purchases=-purchases, completed_levels=-completed)
+
+
+def record_purchases(purchases):
+    # purchases maps level ids to the number of new enrollments
+    _add_purchases(purchases)
+    _adjust(total_purchases=sum(purchases.values()))
+
+
+def record_level_completed():
+    _adjust(completed_levels=1)
+
+
+def recompute_statistics():
+    # Count everything first, so the rollup is written with a single UPDATE
+    def total(model, *criteria):
+        return db.select(db.func.count()).select_from(model).where(*criteria).scalar_subquery()
+
+    totals = db.session.query(
+        total(User, User.role == 'client'),
+        total(Level),
+        total(UserLevel),
+        total(UserLevel, UserLevel.is_completed.is_(True))).one()
+    purchases = db.session.query(UserLevel.level_id, db.func.count(UserLevel.id)).group_by(
+        UserLevel.level_id).all()
+
+    rollup = db.session.get(StatisticsRollup, ROLLUP_ID)
+    if rollup is None:
+        rollup = StatisticsRollup(id=ROLLUP_ID)
+        db.session.add(rollup)
+    (rollup.total_clients, rollup.total_levels,
+     rollup.total_purchases, rollup.completed_levels) = totals
+
+    LevelStatistics.query.delete(synchronize_session=False)
+    db.session.add_all(LevelStatistics(level_id=level_id, purchases=count)
+                       for level_id, count in purchases)
+    db.session.flush()
+    return rollup
+
+
+def get_statistics():
+    rollup = db.session.get(StatisticsRollup, ROLLUP_ID)
+    if rollup is None and reading_replica():
+        # A lagging replica may not have the rollup yet; only the primary's
+        # counts may rebuild it
+        use_primary()
+        db.session.expire_all()
+        rollup = db.session.get(StatisticsRollup, ROLLUP_ID)
+    if rollup is None:
+        rollup = recompute_statistics()
+        db.session.commit()
+    return rollup
+
+
+def popular_levels(limit=5):
+    return db.session.query(Level.name, LevelStatistics.purchases).join(
+        Level, Level.id == LevelStatistics.level_id).filter(
+        LevelStatistics.purchases > 0).order_by(
+        LevelStatistics.purchases.desc()).limit(limit).all()
+
+
+# Per-user statistics: enrollment counts and exam averages per type are
+# aggregated in SQL for any number of users by a single query.
+
+
+def user_statistics(user_ids):
+    levels = db.select(
+        UserLevel.user_id,
+        db.func.count(UserLevel.id).label('purchased_levels'),
+        db.func.sum(db.case((UserLevel.is_completed, 1), else_=0)).label('completed_levels')
+    ).where(UserLevel.user_id.in_(user_ids)).group_by(UserLevel.user_id).subquery()
+
+    is_initial = ExamResult.type == 'initial'
+    is_final = ExamResult.type == 'final'
+    exams = db.select(
+        ExamResult.user_id,
+        db.func.avg(db.case((is_initial, ExamResult.percentage))).label('average_initial_score'),
+        db.func.count(db.case((is_initial, 1))).label('initial_exams'),
+        db.func.avg(db.case((is_final, ExamResult.percentage))).label('average_final_score'),
+        db.func.count(db.case((is_final, 1))).label('final_exams'),
+        db.func.count(ExamResult.id).label('total_exams_taken')
+    ).where(ExamResult.user_id.in_(user_ids)).group_by(ExamResult.user_id).subquery()
+
+    rows = db.session.query(
+        User.id, User.name,
+        levels.c.purchased_levels, levels.c.completed_levels,
+        exams.c.average_initial_score, exams.c.initial_exams,
+        exams.c.average_final_score, exams.c.final_exams,
+        exams.c.total_exams_taken
+    ).outerjoin(levels, levels.c.user_id == User.id).outerjoin(
+        exams, exams.c.user_id == User.id).filter(
+        User.id.in_(user_ids)).order_by(User.id)
+
+    result = {}
+    for row in rows:
+        purchased_levels = row.purchased_levels or 0
+        completed_levels = row.completed_levels or 0
+        avg_initial_score = row.average_initial_score if row.initial_exams else 0
+        avg_final_score = row.average_final_score if row.final_exams else 0
+        avg_improvement = avg_final_score - \
+            avg_initial_score if row.initial_exams and row.final_exams else 0
+
+        result[row.id] = {
+            'user_id': row.id,
+            'user_name': row.name,
+            'purchased_levels': purchased_levels,
+            'completed_levels': completed_levels,
+            'completion_rate': round((completed_levels / purchased_levels * 100) if purchased_levels > 0 else 0, 2),
+            'average_initial_score': round(avg_initial_score, 2),
+            'average_final_score': round(avg_final_score, 2),
+            'average_improvement': round(avg_improvement, 2),
+            'total_exams_taken': row.total_exams_taken or 0
+        }
+    return result
+
+
+@click.command('recompute-statistics')
+def recompute_statistics_command():
+    """Rebuild the admin statistics rollup from the source tables."""
+    rollup = recompute_statistics()
+    db.session.commit()
+    click.echo(f'Statistics recomputed: {rollup.total_clients} clients, '
+               f'{rollup.total_levels} levels, {rollup.total_purchases} purchases, '
+               f'{rollup.completed_levels} completed.')
+
+
+def init_app(app):
+    app.cli.add_command(recompute_statistics_command)
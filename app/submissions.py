@@ -0,0 +1,416 @@
+import json
+import logging
+import os
+import threading
+from collections import Counter, deque
+from datetime import datetime
+import click
+from flask import current_app
+from sqlalchemy.exc import OperationalError
+from app import db
+from app.database import use_primary
+from app.models import ContentVersion, UserLevel, Video, UserVideoProgress, ExamResult
+from app.statistics import record_level_completed
+from app.versions import bump_user_progress
+from app.words import add_exam_answers, add_video_answers, record_word_outcomes
+
+try:
+    import fcntl
+except ImportError:  # no advisory locks on this platform
+    fcntl = None
+
+# Exam and video-question submissions. By default a submission is written and
+# committed inside its request. With SUBMISSION_WRITE_BEHIND enabled the view
+# validates the request, appends the submission to a journal file, fsyncs it
+# and answers; a background writer then applies the journal in batches of up
+# to SUBMISSION_BATCH_SIZE, one transaction per batch. The sequence number of
+# the last applied entry is committed in the same transaction, so entries left
+# in the journal by a crash are applied exactly once when the writer starts
+# again. A user's own reads wait until that user's pending submissions are
+# committed, which keeps them read-your-writes consistent within the process;
+# the journal is locked to one process.
+
+logger = logging.getLogger(__name__)
+
+
+class SubmissionsPending(Exception):
+    pass
+
+
+def score_percentage(correct_words, wrong_words):
+    total_words = correct_words + wrong_words
+    return (correct_words / total_words * 100) if total_words > 0 else 0
+
+
+class _Batch:
+    # Rows the entries of one batch touch, loaded with one query per table,
+    # and the word outcomes and users to update once the entries are applied.
+
+    def __init__(self, entries):
+        pairs = {(entry['user_id'], entry['level_id']) for entry in entries}
+        self.user_levels = {(user_level.user_id, user_level.level_id): user_level
+                            for user_level in UserLevel.query.filter(
+                                UserLevel.user_id.in_({user_id for user_id, _ in pairs}),
+                                UserLevel.level_id.in_({level_id for _, level_id in pairs}))}
+
+        video_ids = {entry['video_id'] for entry in entries if entry['kind'] == 'video_answers'}
+        self.videos, self.video_progress = {}, {}
+        if video_ids:
+            self.videos = dict(db.session.query(Video.id, Video.level_id).filter(
+                Video.id.in_(video_ids)))
+            self.video_progress = {
+                (progress.user_level_id, progress.video_id): progress
+                for progress in UserVideoProgress.query.filter(
+                    UserVideoProgress.user_level_id.in_(
+                        [user_level.id for user_level in self.user_levels.values()]),
+                    UserVideoProgress.video_id.in_(video_ids))}
+
+        self.by_level, self.by_video = {}, {}
+        self.user_ids = set()
+
+
+def _apply_exam(batch, entry):
+    user_level = batch.user_levels.get((entry['user_id'], entry['level_id']))
+    if not user_level:
+        # Enrollment removed after the submission was accepted
+        return
+
+    score = score_percentage(entry['correct_words'], entry['wrong_words'])
+    db.session.add(ExamResult(
+        user_id=entry['user_id'],
+        level_id=entry['level_id'],
+        correct_words=entry['correct_words'],
+        wrong_words=entry['wrong_words'],
+        percentage=score,
+        type=entry['type'],
+        timestamp=datetime.fromisoformat(entry['timestamp']),
+        correct_words_list=json.dumps(entry['correct_words_list']),
+        wrong_words_list=json.dumps(entry['wrong_words_list'])
+    ))
+
+    if entry['type'] == 'initial':
+        user_level.initial_exam_score = score
+    else:
+        user_level.final_exam_score = score
+        if user_level.initial_exam_score is not None:
+            user_level.score_difference = score - user_level.initial_exam_score
+        if not user_level.is_completed:
+            record_level_completed()
+        user_level.is_completed = True
+
+    add_exam_answers(batch.by_level, entry['level_id'], entry['correct_words_list'],
+                     entry['wrong_words_list'])
+    batch.user_ids.add(entry['user_id'])
+
+
+def _apply_video_answers(batch, entry):
+    user_level = batch.user_levels.get((entry['user_id'], entry['level_id']))
+    if not user_level or batch.videos.get(entry['video_id']) != entry['level_id']:
+        return
+
+    # Score details are only stored for videos that have answers
+    video_progress = batch.video_progress.get((user_level.id, entry['video_id']))
+    if not video_progress:
+        video_progress = UserVideoProgress(
+            user_level_id=user_level.id, video_id=entry['video_id'])
+        db.session.add(video_progress)
+        batch.video_progress[(user_level.id, entry['video_id'])] = video_progress
+
+    add_video_answers(batch.by_level, batch.by_video, entry['level_id'], entry['video_id'],
+                      entry['correct_words_list'],
+                      entry['wrong_words_list'],
+                      video_progress.correct_words_list,
+                      video_progress.wrong_words_list)
+
+    video_progress.correct_words = entry['correct_words']
+    video_progress.wrong_words = entry['wrong_words']
+    video_progress.percentage = score_percentage(entry['correct_words'], entry['wrong_words'])
+    video_progress.correct_words_list = json.dumps(entry['correct_words_list'])
+    video_progress.wrong_words_list = json.dumps(entry['wrong_words_list'])
+    batch.user_ids.add(entry['user_id'])
+
+
+APPLY = {
+    'exam': _apply_exam,
+    'video_answers': _apply_video_answers,
+}
+
+
+def apply_submissions(entries):
+    # Applies entries in order in the current transaction; the caller commits.
+    if not entries:
+        return
+    batch = _Batch(entries)
+    for entry in entries:
+        APPLY[entry['kind']](batch, entry)
+    record_word_outcomes(batch.by_level, batch.by_video)
+    if batch.user_ids:
+        bump_user_progress(*batch.user_ids)
+
+
+def _set_checkpoint(name, seq):
+    updated = ContentVersion.query.filter_by(name=name).update(
+        {ContentVersion.version: seq}, synchronize_session=False)
+    if not updated:
+        db.session.add(ContentVersion(name=name, version=seq))
+
+
+class SubmissionQueue:
+    def __init__(self, app, path, batch_size, flush_interval):
+        self._app = app
+        self._path = path
+        self._checkpoint = 'submission_journal:' + os.path.basename(path)
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self._applied = threading.Condition(self._lock)
+        self._sync_lock = threading.Lock()
+        self._pending = deque()
+        self._pending_users = Counter()
+        self._waiters = 0
+        self._seq = self._synced = 0
+        self._journal = None
+        self._thread = None
+        self._stopping = False
+
+    def _read_journal(self):
+        # Returns the complete entries and the length they occupy; a torn
+        # last line was never acknowledged and is cut off.
+        entries, length = [], 0
+        with open(self._path, 'rb') as journal:
+            for line in journal:
+                if not line.endswith(b'\n'):
+                    break
+                entries.append(json.loads(line))
+                length += len(line)
+        return entries, length
+
+    def acquire(self):
+        # Opens and locks the journal. Only the process that runs the writer
+        # takes the lock, so flask commands and the reloader's parent process
+        # can build the app while a server holds it.
+        if self._journal is not None:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self._path)), exist_ok=True)
+        journal = open(self._path, 'ab')
+        if fcntl is not None:
+            try:
+                fcntl.flock(journal, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                journal.close()
+                raise RuntimeError(
+                    f'Submission journal {self._path} is locked by another process. Write-behind '
+                    'needs one process per journal: run a single worker, give each its own '
+                    'SUBMISSION_JOURNAL, or set SUBMISSION_WRITE_BEHIND=false for this process.')
+        self._journal = journal
+
+    def start(self):
+        # Replays what a previous run left in the journal and starts the
+        # writer. Needs an app context; runs once.
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            try:
+                self.acquire()
+            except RuntimeError:
+                logger.critical('Submission writer not started', exc_info=True)
+                raise
+            journal = self._journal
+
+            applied = db.session.query(ContentVersion.version).filter_by(
+                name=self._checkpoint).scalar() or 0
+            entries, length = self._read_journal()
+            journal.truncate(length)
+            pending = [entry for entry in entries if entry['seq'] > applied]
+            if not pending:
+                journal.truncate(0)
+
+            self._seq = self._synced = max([applied] + [entry['seq'] for entry in entries])
+            self._pending.extend(pending)
+            self._pending_users.update(entry['user_id'] for entry in pending)
+            if pending:
+                logger.info(f'Replaying {len(pending)} journaled submissions')
+
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name='submission-writer', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        # Applies everything pending, then stops the writer.
+        with self._lock:
+            thread, self._stopping = self._thread, True
+            self._ready.notify()
+        if thread is not None:
+            thread.join()
+        with self._lock:
+            self._thread = None
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+
+    def enqueue(self, entry):
+        with self._lock:
+            if self._thread is None:
+                raise RuntimeError('Submission writer is not running')
+            self._seq += 1
+            entry = dict(entry, seq=self._seq)
+            self._journal.write(json.dumps(entry).encode() + b'\n')
+            self._journal.flush()
+            self._pending.append(entry)
+            self._pending_users[entry['user_id']] += 1
+            self._ready.notify()
+
+        # Group fsync: one call covers every entry written before it
+        with self._sync_lock:
+            if self._synced < entry['seq']:
+                with self._lock:
+                    written = self._seq
+                    fd = self._journal.fileno()
+                os.fsync(fd)
+                self._synced = written
+        return entry['seq']
+
+    def pending_count(self, user_id=None):
+        with self._lock:
+            return len(self._pending) if user_id is None else self._pending_users[user_id]
+
+    def wait_for_user(self, user_id, timeout):
+        # True once none of the user's submissions are pending, False on timeout
+        with self._lock:
+            if not self._pending_users[user_id]:
+                return True
+            self._waiters += 1
+            self._ready.notify()
+            try:
+                return self._applied.wait_for(lambda: not self._pending_users[user_id], timeout)
+            finally:
+                self._waiters -= 1
+
+    def _next_batch(self):
+        with self._lock:
+            self._ready.wait_for(lambda: self._pending or self._stopping)
+            if not self._pending:
+                return None
+            # Let a batch fill up unless a reader is waiting for it
+            self._ready.wait_for(lambda: len(self._pending) >= self._batch_size
+                                 or self._waiters or self._stopping, self._flush_interval)
+            return [self._pending[i] for i in range(min(len(self._pending), self._batch_size))]
+
+    def _apply(self, entries, seq):
+        # One transaction: the entries and the checkpoint after them
+        with self._app.app_context():
+            try:
+                apply_submissions(entries)
+                _set_checkpoint(self._checkpoint, seq)
+                db.session.commit()
+            except BaseException:
+                db.session.rollback()
+                raise
+
+    def _write(self, batch):
+        # Returns how many entries of the batch are done.
+        try:
+            self._apply(batch, batch[-1]['seq'])
+            return len(batch)
+        except OperationalError:
+            logger.exception('Could not apply submissions, retrying')
+            return 0
+        except Exception:
+            pass
+
+        # Isolate the entries that cannot be applied
+        for done, entry in enumerate(batch):
+            try:
+                self._apply([entry], entry['seq'])
+            except OperationalError:
+                logger.exception('Could not apply submissions, retrying')
+                return done
+            except Exception:
+                logger.exception(f"Dropping submission {entry['seq']}")
+                try:
+                    self._apply([], entry['seq'])
+                except Exception:
+                    # The entries before it are committed; retry from this one
+                    logger.exception('Could not apply submissions, retrying')
+                    return done
+        return len(batch)
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            try:
+                done = self._write(batch)
+            except Exception:
+                logger.exception('Could not apply submissions, retrying')
+                done = 0
+
+            with self._lock:
+                for entry in batch[:done]:
+                    self._pending.popleft()
+                    self._pending_users[entry['user_id']] -= 1
+                    if not self._pending_users[entry['user_id']]:
+                        del self._pending_users[entry['user_id']]
+                if not self._pending:
+                    self._journal.truncate(0)
+                self._applied.notify_all()
+                if done < len(batch):
+                    # Database unavailable: back off, then retry the rest
+                    self._ready.wait(1.0)
+
+
+def _queue():
+    return current_app.extensions['submission_queue']
+
+
+def submit(kind, user_id, **payload):
+    entry = dict(payload, kind=kind, user_id=user_id,
+                 timestamp=datetime.utcnow().isoformat())
+    queue = _queue()
+    if queue is None:
+        apply_submissions([entry])
+        db.session.commit()
+    else:
+        queue.enqueue(entry)
+
+
+def await_submissions(user_id):
+    # Call before reading a user's own results.
+    queue = _queue()
+    if queue is None or not queue.pending_count(user_id):
+        return
+    if not queue.wait_for_user(user_id, current_app.config['SUBMISSION_READ_TIMEOUT']):
+        raise SubmissionsPending()
+    # Just committed on the primary; the replica may not have it yet
+    use_primary()
+    db.session.expire_all()
+
+
+@click.command('apply-submissions')
+def apply_submissions_command():
+    """Apply submissions left in the write-behind journal."""
+    queue = _queue()
+    if queue is None:
+        raise click.ClickException('SUBMISSION_WRITE_BEHIND is not enabled.')
+    try:
+        queue.start()
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    pending = queue.pending_count()
+    queue.stop()
+    click.echo(f'Submissions applied: {pending}.')
+
+
+def init_app(app):
+    queue = None
+    if app.config['SUBMISSION_WRITE_BEHIND']:
+        queue = SubmissionQueue(app, app.config['SUBMISSION_JOURNAL'],
+                                app.config['SUBMISSION_BATCH_SIZE'],
+                                app.config['SUBMISSION_FLUSH_INTERVAL'])
+        app.before_request(queue.start)
+    app.extensions['submission_queue'] = queue
+    app.cli.add_command(apply_submissions_command)
@@ -0,0 +1,33 @@
+from app import db
+from app.models import ContentVersion, User
+
+CATALOG_VERSION = 'catalog'
+WELCOME_VIDEO_VERSION = 'welcome_video'
+ENROLLMENTS_VERSION = 'enrollments'
+
+# Monotonic counters for content that is cached or validated by version. A
+# writer bumps the counter inside its own transaction, so readers in any
+# worker process see the new version exactly when the new data is visible.
+
+
+def get_version(name):
+    version = db.session.query(ContentVersion.version).filter_by(name=name).scalar()
+    return version or 0
+
+
+def bump_version(name):
+    updated = ContentVersion.query.filter_by(name=name).update(
+        {ContentVersion.version: ContentVersion.version + 1},
+        synchronize_session=False)
+    if not updated:
+        db.session.add(ContentVersion(name=name, version=1))
+
+
+# Per-user counter covering everything a user's level views and report show:
+# enrollments, video progress, exam results and profile fields.
+
+
+def bump_user_progress(*user_ids):
+    User.query.filter(User.id.in_(user_ids)).update(
+        {User.progress_version: User.progress_version + 1},
+        synchronize_session=False)
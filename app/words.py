@@ -0,0 +1,182 @@
+import json
+from collections import Counter
+import click
+from flask import current_app
+from sqlalchemy.dialects import postgresql, sqlite
+from app import db
+from app.models import Video, UserLevel, UserVideoProgress, ExamResult, LevelWordStatistics, VideoWordStatistics
+
+# Word difficulty index. Answer lists submitted with exams and videos are
+# tallied per level and video and adjust per-word correct/wrong counters with
+# one relative upsert per table, so the hardest words of a level or video are a
+# single indexed query. Replaced or deleted answers are subtracted again;
+# rebuild_word_statistics() recomputes both tables from the source rows.
+# Video answers only count while their enrollment exists.
+
+WORD_MAX_LENGTH = 100
+
+
+def _words(words):
+    # Anything but a list of strings counts as no answers
+    if not isinstance(words, list):
+        return []
+    return [word.strip().lower()[:WORD_MAX_LENGTH]
+            for word in words if isinstance(word, str) and word.strip()]
+
+
+def _stored(words):
+    # Answer lists as stored in the *_words_list columns
+    try:
+        return json.loads(words) if words else []
+    except ValueError:
+        return []
+
+
+def _outcomes(correct_words, wrong_words, sign=1):
+    # {word: [correct, wrong]} for one answer list pair
+    outcomes = {}
+    for word, times in Counter(_words(correct_words)).items():
+        outcomes.setdefault(word, [0, 0])[0] += sign * times
+    for word, times in Counter(_words(wrong_words)).items():
+        outcomes.setdefault(word, [0, 0])[1] += sign * times
+    return outcomes
+
+
+def _merge(totals, outcomes):
+    for word, (correct, wrong) in outcomes.items():
+        counts = totals.setdefault(word, [0, 0])
+        counts[0] += correct
+        counts[1] += wrong
+    return totals
+
+
+def _upsert(model, key, outcomes):
+    # outcomes maps values of the key column to {word: [correct, wrong]}
+    rows = [{key: value, 'word': word, 'correct_count': correct, 'wrong_count': wrong}
+            for value, words in outcomes.items()
+            for word, (correct, wrong) in words.items() if correct or wrong]
+    if not rows:
+        return
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        insert = (sqlite if dialect == 'sqlite' else postgresql).insert(model)
+        db.session.execute(insert.on_conflict_do_update(
+            index_elements=[key, 'word'],
+            set_={'correct_count': model.correct_count + insert.excluded.correct_count,
+                  'wrong_count': model.wrong_count + insert.excluded.wrong_count}), rows)
+        return
+
+    for row in rows:
+        updated = model.query.filter_by(**{key: row[key]}, word=row['word']).update({
+            model.correct_count: model.correct_count + row['correct_count'],
+            model.wrong_count: model.wrong_count + row['wrong_count']},
+            synchronize_session=False)
+        if not updated:
+            db.session.add(model(**row))
+
+
+def add_exam_answers(by_level, level_id, correct_words, wrong_words):
+    _merge(by_level.setdefault(level_id, {}), _outcomes(correct_words, wrong_words))
+
+
+def add_video_answers(by_level, by_video, level_id, video_id, correct_words, wrong_words,
+                      previous_correct_words=None, previous_wrong_words=None):
+    # Resubmitted answers replace the previous, stored ones, which are subtracted.
+    outcomes = _merge(_outcomes(correct_words, wrong_words),
+                      _outcomes(_stored(previous_correct_words), _stored(previous_wrong_words), sign=-1))
+    _merge(by_level.setdefault(level_id, {}), outcomes)
+    _merge(by_video.setdefault(video_id, {}), outcomes)
+
+
+def record_word_outcomes(by_level, by_video):
+    _upsert(LevelWordStatistics, 'level_id', by_level)
+    _upsert(VideoWordStatistics, 'video_id', by_video)
+
+
+def discard_user_answers(user_id):
+    # Must run before the user's exams and enrollments are deleted.
+    by_level = {}
+    for level_id, correct_words, wrong_words in db.session.query(
+            ExamResult.level_id, ExamResult.correct_words_list, ExamResult.wrong_words_list
+    ).filter(ExamResult.user_id == user_id):
+        _merge(by_level.setdefault(level_id, {}),
+               _outcomes(_stored(correct_words), _stored(wrong_words), sign=-1))
+
+    by_video = {}
+    for level_id, video_id, correct_words, wrong_words in db.session.query(
+            UserLevel.level_id, UserVideoProgress.video_id,
+            UserVideoProgress.correct_words_list, UserVideoProgress.wrong_words_list
+    ).join(UserLevel, UserLevel.id == UserVideoProgress.user_level_id).filter(
+            UserLevel.user_id == user_id):
+        outcomes = _outcomes(_stored(correct_words), _stored(wrong_words), sign=-1)
+        _merge(by_level.setdefault(level_id, {}), outcomes)
+        _merge(by_video.setdefault(video_id, {}), outcomes)
+
+    record_word_outcomes(by_level, by_video)
+
+
+def discard_video_answers(video):
+    # Must run before the video's progress rows are deleted.
+    outcomes = {}
+    for correct_words, wrong_words in db.session.query(
+            UserVideoProgress.correct_words_list, UserVideoProgress.wrong_words_list
+    ).join(UserLevel, UserLevel.id == UserVideoProgress.user_level_id).filter(
+            UserVideoProgress.video_id == video.id):
+        _merge(outcomes, _outcomes(_stored(correct_words), _stored(wrong_words), sign=-1))
+    _upsert(LevelWordStatistics, 'level_id', {video.level_id: outcomes})
+    VideoWordStatistics.query.filter_by(video_id=video.id).delete(synchronize_session=False)
+
+
+def discard_level_answers(level_id):
+    LevelWordStatistics.query.filter_by(level_id=level_id).delete(synchronize_session=False)
+    VideoWordStatistics.query.filter(VideoWordStatistics.video_id.in_(
+        db.select(Video.id).where(Video.level_id == level_id))).delete(synchronize_session=False)
+
+
+def hardest_words(model, limit=10, min_attempts=1, **key):
+    attempts = model.correct_count + model.wrong_count
+    miss_rate = model.wrong_count * 1.0 / attempts
+    rows = db.session.query(model.word, model.wrong_count, attempts.label('attempts')).filter_by(
+        **key).filter(attempts >= max(min_attempts, 1), model.wrong_count > 0).order_by(
+        miss_rate.desc(), model.wrong_count.desc(), model.word).limit(limit)
+    return [{
+        'word': row.word,
+        'misses': row.wrong_count,
+        'attempts': row.attempts,
+        'miss_rate': round(row.wrong_count / row.attempts * 100, 2)
+    } for row in rows]
+
+
+def rebuild_word_statistics():
+    batch_size = current_app.config['REPORT_BATCH_SIZE']
+    by_level, by_video = {}, {}
+    for level_id, correct_words, wrong_words in db.session.query(
+            ExamResult.level_id, ExamResult.correct_words_list, ExamResult.wrong_words_list
+    ).yield_per(batch_size):
+        _merge(by_level.setdefault(level_id, {}), _outcomes(_stored(correct_words), _stored(wrong_words)))
+    for level_id, video_id, correct_words, wrong_words in db.session.query(
+            Video.level_id, UserVideoProgress.video_id,
+            UserVideoProgress.correct_words_list, UserVideoProgress.wrong_words_list
+    ).join(Video, Video.id == UserVideoProgress.video_id).join(
+            UserLevel, UserLevel.id == UserVideoProgress.user_level_id).yield_per(batch_size):
+        outcomes = _outcomes(_stored(correct_words), _stored(wrong_words))
+        _merge(by_level.setdefault(level_id, {}), outcomes)
+        _merge(by_video.setdefault(video_id, {}), outcomes)
+
+    LevelWordStatistics.query.delete(synchronize_session=False)
+    VideoWordStatistics.query.delete(synchronize_session=False)
+    record_word_outcomes(by_level, by_video)
+    return len(by_level), len(by_video)
+
+
+@click.command('rebuild-word-statistics')
+def rebuild_word_statistics_command():
+    """Rebuild the word difficulty index from exam and video answers."""
+    levels, videos = rebuild_word_statistics()
+    db.session.commit()
+    click.echo(f'Word statistics rebuilt for {levels} levels and {videos} videos.')
+
+
+def init_app(app):
+    app.cli.add_command(rebuild_word_statistics_command)
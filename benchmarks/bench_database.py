@@ -0,0 +1,128 @@
+"""
+Database Engine Profile Benchmark for Educational App
+Runs reader threads requesting a user's levels and writer threads submitting
+video answers against one SQLite file for a fixed time, first with the plain
+rollback journal (SQLITE_PRAGMAS = {}) and then with the default WAL profile.
+Reports reads and writes per second, latencies and failed requests.
+
+    python benchmarks/bench_database.py --readers 8 --writers 4 --duration 5
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.auth import create_user_token  # noqa: E402
+from app.config import Config  # noqa: E402
+from app.database import sqlite_pragmas  # noqa: E402
+from app.models import User, Level, Video, UserLevel  # noqa: E402
+from app.progress import pack  # noqa: E402
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+LEVELS = 20
+VIDEOS_PER_LEVEL = 20
+WORDS = ['cat', 'dog', 'bird', 'fish', 'horse', 'cow', 'sheep', 'goat']
+
+
+def percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[max(0, int(len(samples) * fraction) - 1)] if samples else 0.0
+
+
+def run(profile, args, tmp):
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(tmp, f'{profile}.db')}"
+        SQLITE_PRAGMAS = Config.SQLITE_PRAGMAS if profile == 'wal' else {}
+
+    users = args.readers + args.writers
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.session.execute(insert(User), [
+            {'id': u, 'name': f'user{u}', 'email': f'user{u}@bench.test', 'password': 'x', 'role': 'client'}
+            for u in range(1, users + 1)])
+        db.session.execute(insert(Level), [
+            {'id': l, 'name': f'Level {l}', 'level_number': l, 'price': 10.0}
+            for l in range(1, LEVELS + 1)])
+        db.session.execute(insert(Video), [
+            {'id': (l - 1) * VIDEOS_PER_LEVEL + p + 1, 'level_id': l, 'position': p,
+             'youtube_link': 'https://youtube.com/x'}
+            for l in range(1, LEVELS + 1) for p in range(VIDEOS_PER_LEVEL)])
+        db.session.execute(insert(UserLevel), [
+            {'user_id': u, 'level_id': l, 'completed_videos_count': 0,
+             'opened_videos': pack(1), 'completed_videos': pack(0)}
+            for u in range(1, users + 1) for l in range(1, LEVELS + 1)])
+        db.session.commit()
+        tokens = {u: create_user_token(db.session.get(User, u)) for u in range(1, users + 1)}
+        pragmas = sqlite_pragmas(db.engine)
+        db.session.remove()
+
+    deadline = time.perf_counter() + args.duration
+    samples = {'read': [], 'write': []}
+    failures = {'read': 0, 'write': 0}
+    lock = threading.Lock()
+
+    def client_loop(u, kind):
+        client = app.test_client()
+        headers = {'Authorization': f'Bearer {tokens[u]}'}
+        body = {'correct_words': 6, 'wrong_words': 2,
+                'correct_words_list': WORDS[:6], 'wrong_words_list': WORDS[6:]}
+        i = 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            if kind == 'read':
+                status = client.get(f'/users/{u}/levels', headers=headers).status_code
+            else:
+                level = i % LEVELS + 1
+                video = (level - 1) * VIDEOS_PER_LEVEL + i % VIDEOS_PER_LEVEL + 1
+                status = client.post(f'/users/{u}/levels/{level}/videos/{video}/submit_questions',
+                                     headers=headers, json=body).status_code
+            elapsed = time.perf_counter() - start
+            with lock:
+                if status == 200:
+                    samples[kind].append(elapsed)
+                else:
+                    failures[kind] += 1
+            i += 1
+
+    threads = [threading.Thread(target=client_loop, args=(u, 'read')) for u in range(1, args.readers + 1)]
+    threads += [threading.Thread(target=client_loop, args=(u, 'write'))
+                for u in range(args.readers + 1, users + 1)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    logger.info(f"{profile:<8} journal_mode={pragmas['journal_mode']} synchronous={pragmas['synchronous']}")
+    for kind in ('read', 'write'):
+        logger.info(f"{profile:<8} {kind:<5}: {len(samples[kind]) / args.duration:7.1f}/s"
+                    f"   failed {failures[kind]:4}"
+                    f"   p50 {percentile(samples[kind], 0.5) * 1000:7.2f} ms"
+                    f"   p95 {percentile(samples[kind], 0.95) * 1000:7.2f} ms"
+                    f"   p99 {percentile(samples[kind], 0.99) * 1000:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=5.0, help='seconds per profile')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for profile in ('rollback', 'wal'):
+            run(profile, args, tmp)
+
+
+if __name__ == '__main__':
+    main()
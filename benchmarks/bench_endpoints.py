@@ -0,0 +1,256 @@
+"""
+Endpoint Benchmark for Educational App
+Seeds a synthetic dataset into a SQLite file with app/seed.py and drives the
+main read and write endpoints through the Flask test client, without a
+server. Reports p50/p95/p99 latency, throughput and SQL statements per
+request for every endpoint, and writes the results as JSON so runs can be
+compared across commits.
+
+    python benchmarks/bench_endpoints.py --users 10000 --levels 100 --videos-per-level 50 \\
+        --exams-per-enrollment 10 --output before.json
+    python benchmarks/bench_endpoints.py --database bench.db --baseline before.json --output after.json
+
+A --database file that already holds data is reused instead of seeded. The
+write endpoints add rows, so a reused database grows a little every run.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.auth import create_user_token  # noqa: E402
+from app.config import Config  # noqa: E402
+from app.models import User, Level, Video, UserLevel, UserVideoProgress, ExamResult  # noqa: E402
+from app.seed import seed_data  # noqa: E402
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+SAMPLE_USERS = 200
+
+
+def percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[max(0, int(len(samples) * fraction) - 1)] if samples else 0.0
+
+
+def dataset():
+    return {
+        'users': User.query.count(),
+        'levels': Level.query.count(),
+        'videos': Video.query.count(),
+        'enrollments': UserLevel.query.count(),
+        'video_answers': UserVideoProgress.query.count(),
+        'exam_results': ExamResult.query.count(),
+    }
+
+
+# Scenarios: (endpoint, method, role, path(user_id, level_id, video_id), body).
+# Client requests pick a random enrollment of a sample of users; admin
+# requests act as user 1.
+
+WORDS = ['word1', 'word2', 'word3', 'word4', 'word5']
+ANSWERS = {'correct_words': 3, 'wrong_words': 2,
+           'correct_words_list': WORDS[:3], 'wrong_words_list': WORDS[3:]}
+
+SCENARIOS = [
+    ('get_levels', 'GET', 'client', lambda u, l, v: '/levels', None),
+    ('get_level', 'GET', 'client', lambda u, l, v: f'/levels/{l}', None),
+    ('get_user', 'GET', 'client', lambda u, l, v: f'/users/{u}', None),
+    ('get_user_levels', 'GET', 'client', lambda u, l, v: f'/users/{u}/levels', None),
+    ('get_user_exam_results', 'GET', 'client', lambda u, l, v: f'/exams/{l}/user/{u}', None),
+    ('get_user_report', 'GET', 'client', lambda u, l, v: '/report?format=json', None),
+    ('submit_video_questions', 'POST', 'client',
+     lambda u, l, v: f'/users/{u}/levels/{l}/videos/{v}/submit_questions', ANSWERS),
+    ('submit_initial_exam', 'POST', 'client', lambda u, l, v: f'/exams/{l}/initial', ANSWERS),
+    ('admin_get_all_levels', 'GET', 'admin', lambda u, l, v: '/admin/levels', None),
+    ('get_all_users', 'GET', 'admin', lambda u, l, v: '/admin/users', None),
+    ('get_all_videos', 'GET', 'admin', lambda u, l, v: '/admin/videos', None),
+    ('get_all_exam_results', 'GET', 'admin', lambda u, l, v: '/admin/exams', None),
+    ('get_admin_statistics', 'GET', 'admin', lambda u, l, v: '/admin/statistics', None),
+    ('get_users_statistics', 'GET', 'admin',
+     lambda u, l, v: '/admin/users/statistics?user_ids=' + ','.join(str(u + i) for i in range(50)), None),
+    ('get_user_statistics', 'GET', 'admin', lambda u, l, v: f'/admin/users/{u}/statistics', None),
+    ('get_level_hardest_words', 'GET', 'admin', lambda u, l, v: f'/admin/levels/{l}/hardest_words', None),
+    ('get_video_hardest_words', 'GET', 'admin', lambda u, l, v: f'/admin/videos/{v}/hardest_words', None),
+    ('login', 'POST', None, lambda u, l, v: '/login', None),
+]
+
+
+class StatementCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+def run_scenario(app, scenario, enrollments, users, args):
+    endpoint, method, role, path, body = scenario
+    rng = random.Random(f'{args.seed}-{endpoint}')
+    client = app.test_client()
+    counter = StatementCounter()
+    # bcrypt makes logins slow by design, so they get fewer requests
+    requests = max(1, args.requests // 10) if endpoint == 'login' else args.requests
+
+    latencies, statements, statuses = [], [], {}
+    for engine in db.engines.values():
+        event.listen(engine, 'before_cursor_execute', counter)
+    for i in range(args.warmup + requests):
+        user_id, level_id, video_id = rng.choice(enrollments)
+        headers = {'Authorization': f'Bearer {users[1 if role == "admin" else user_id][1]}'} if role else {}
+        json_body = body
+        if endpoint == 'login':
+            json_body = {'email': users[user_id][0], 'password': 'password'}
+
+        before = counter.count
+        start = time.perf_counter()
+        response = client.open(path(user_id, level_id, video_id), method=method,
+                               headers=headers, json=json_body)
+        response.get_data()
+        elapsed = time.perf_counter() - start
+        if i < args.warmup:
+            continue
+        latencies.append(elapsed)
+        statements.append(counter.count - before)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+    for engine in db.engines.values():
+        event.remove(engine, 'before_cursor_execute', counter)
+
+    total = sum(latencies)
+    return {
+        'method': method,
+        'requests': len(latencies),
+        'errors': sum(n for status, n in statuses.items() if status >= 400),
+        'statuses': {str(status): n for status, n in sorted(statuses.items())},
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'mean_ms': round(total / len(latencies) * 1000, 3),
+        'throughput_rps': round(len(latencies) / total, 1) if total else 0.0,
+        'statements_mean': round(sum(statements) / len(statements), 2),
+        'statements_max': max(statements),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    logger.info(f"Compared with {baseline_path} (commit {baseline.get('commit')}):")
+    for endpoint, result in results['endpoints'].items():
+        before = baseline.get('endpoints', {}).get(endpoint)
+        if not before:
+            continue
+        change = (result['p95_ms'] / before['p95_ms'] - 1) * 100 if before['p95_ms'] else 0.0
+        logger.info(f"   {endpoint:<26} p95 {before['p95_ms']:9.2f} -> {result['p95_ms']:9.2f} ms ({change:+6.1f}%)"
+                    f"   statements {before['statements_max']:3} -> {result['statements_max']:3}")
+
+
+def run(args, path):
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+        UPLOAD_FOLDER = os.path.join(os.path.dirname(path), 'uploads')
+
+    reuse = os.path.exists(path)
+    app = create_app(BenchConfig)
+    with app.app_context():
+        seed_seconds = None
+        if reuse and User.query.count():
+            logger.info(f"Reusing the dataset in {path}")
+        else:
+            logger.info(f"Seeding {args.users} users, {args.levels} levels x {args.videos_per_level} videos...")
+            start = time.perf_counter()
+            seed_data(users=args.users, levels=args.levels, videos_per_level=args.videos_per_level,
+                      enrollments_per_user=args.enrollments_per_user,
+                      exams_per_enrollment=args.exams_per_enrollment,
+                      answers_per_enrollment=args.answers_per_enrollment, seed=args.seed)
+            seed_seconds = round(time.perf_counter() - start, 1)
+            logger.info(f"Seeded in {seed_seconds} s")
+
+        rng = random.Random(args.seed)
+        clients = [u for (u,) in db.session.query(User.id).filter_by(role='client').order_by(User.id)]
+        sample = rng.sample(clients, min(SAMPLE_USERS, len(clients)))
+        enrollments = db.session.query(UserLevel.user_id, UserLevel.level_id, db.func.min(Video.id)).join(
+            Video, Video.level_id == UserLevel.level_id).filter(UserLevel.user_id.in_(sample)).group_by(
+            UserLevel.id).order_by(UserLevel.id).all()
+        users = {user.id: (user.email, create_user_token(user))
+                 for user in User.query.filter(User.id.in_(sample + [1]))}
+        results = {
+            'commit': git_commit(),
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'seed': args.seed,
+            'seed_seconds': seed_seconds,
+            'dataset': dataset(),
+            'endpoints': {},
+        }
+        db.session.remove()
+
+        selected = set(args.endpoints.split(',')) if args.endpoints else None
+        for scenario in SCENARIOS:
+            if selected and scenario[0] not in selected:
+                continue
+            result = results['endpoints'][scenario[0]] = run_scenario(app, scenario, enrollments, users, args)
+            logger.info(f"{scenario[0]:<26} {result['throughput_rps']:8.1f}/s"
+                        f"   p50 {result['p50_ms']:8.2f} ms   p95 {result['p95_ms']:8.2f} ms"
+                        f"   p99 {result['p99_ms']:8.2f} ms   statements {result['statements_mean']:5.1f}"
+                        f" (max {result['statements_max']})   errors {result['errors']}")
+            db.session.remove()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--levels', type=int, default=100)
+    parser.add_argument('--videos-per-level', type=int, default=50)
+    parser.add_argument('--enrollments-per-user', type=int, default=10)
+    parser.add_argument('--exams-per-enrollment', type=int, default=10)
+    parser.add_argument('--answers-per-enrollment', type=int,
+                        help='cap on answered videos per enrollment, default every completed video')
+    parser.add_argument('--requests', type=int, default=200, help='timed requests per endpoint')
+    parser.add_argument('--warmup', type=int, default=10, help='untimed requests per endpoint')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--endpoints', help='comma-separated endpoint names, default all')
+    parser.add_argument('--database', help='SQLite file to seed or reuse, default a temporary file')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--baseline', help='results JSON of an earlier run to compare p95 latencies with')
+    args = parser.parse_args()
+
+    if args.database:
+        results = run(args, os.path.abspath(args.database))
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            results = run(args, os.path.join(tmp, 'bench.db'))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        logger.info(f"Results written to {args.output}")
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""
+Index Benchmark for Educational App
+Measures the hot progress and exam lookups on a large SQLite database with
+and without the composite indexes declared in app/models.py.
+
+    python benchmarks/bench_indexes.py --progress-rows 1000000
+"""
+
+import argparse
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert, text  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.config import Config  # noqa: E402
+from app.models import User, Level, Video, UserLevel, UserVideoProgress, ExamResult  # noqa: E402
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+LEVELS = 40
+VIDEOS_PER_LEVEL = 30
+CHUNK = 50000
+
+
+def seed(progress_rows):
+    users = max(1, progress_rows // (LEVELS * VIDEOS_PER_LEVEL))
+    logger.info(f"Seeding {users} users x {LEVELS} levels x {VIDEOS_PER_LEVEL} videos...")
+
+    db.session.execute(insert(User), [
+        {'id': u, 'name': f'user{u}', 'email': f'user{u}@bench.test', 'password': 'x', 'role': 'client'}
+        for u in range(1, users + 1)])
+    db.session.execute(insert(Level), [
+        {'id': l, 'name': f'Level {l}', 'level_number': l, 'price': 10.0}
+        for l in range(1, LEVELS + 1)])
+    db.session.execute(insert(Video), [
+        {'id': (l - 1) * VIDEOS_PER_LEVEL + v, 'level_id': l, 'position': v - 1,
+         'youtube_link': 'https://youtube.com/x'}
+        for l in range(1, LEVELS + 1) for v in range(1, VIDEOS_PER_LEVEL + 1)])
+
+    user_levels, progress, exams = [], [], []
+    user_level_id = 0
+    for u in range(1, users + 1):
+        for l in range(1, LEVELS + 1):
+            user_level_id += 1
+            user_levels.append({'id': user_level_id, 'user_id': u, 'level_id': l})
+            exams.append({'user_id': u, 'level_id': l, 'correct_words': 8, 'wrong_words': 2,
+                          'percentage': 80.0, 'type': 'initial'})
+            for v in range(1, VIDEOS_PER_LEVEL + 1):
+                progress.append({'user_level_id': user_level_id,
+                                 'video_id': (l - 1) * VIDEOS_PER_LEVEL + v,
+                                 'correct_words': 8, 'wrong_words': 2, 'percentage': 80.0})
+            if len(progress) >= CHUNK:
+                db.session.execute(insert(UserVideoProgress), progress)
+                progress = []
+    if progress:
+        db.session.execute(insert(UserVideoProgress), progress)
+    for start in range(0, len(user_levels), CHUNK):
+        db.session.execute(insert(UserLevel), user_levels[start:start + CHUNK])
+        db.session.execute(insert(ExamResult), exams[start:start + CHUNK])
+    db.session.commit()
+    return users, user_level_id
+
+
+def secondary_indexes():
+    return [index for model in (Video, UserLevel, UserVideoProgress, ExamResult)
+            for index in model.__table__.indexes]
+
+
+def time_lookups(users, user_levels, lookups):
+    rng = random.Random(42)
+    timings = {'UserLevel(user_id, level_id)': [],
+               'UserVideoProgress(user_level_id, video_id)': [],
+               'ExamResult(user_id, level_id)': []}
+    for _ in range(lookups):
+        user_id, level_id = rng.randint(1, users), rng.randint(1, LEVELS)
+        user_level_id = rng.randint(1, user_levels)
+        video_id = rng.randint(1, LEVELS * VIDEOS_PER_LEVEL)
+
+        start = time.perf_counter()
+        UserLevel.query.filter_by(user_id=user_id, level_id=level_id).first()
+        timings['UserLevel(user_id, level_id)'].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        UserVideoProgress.query.filter_by(user_level_id=user_level_id, video_id=video_id).first()
+        timings['UserVideoProgress(user_level_id, video_id)'].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        ExamResult.query.filter_by(user_id=user_id, level_id=level_id).all()
+        timings['ExamResult(user_id, level_id)'].append(time.perf_counter() - start)
+
+        db.session.expunge_all()
+    return timings
+
+
+def report(label, timings):
+    logger.info(f"{label}:")
+    for lookup, samples in timings.items():
+        samples = sorted(samples)
+        p95 = samples[int(len(samples) * 0.95) - 1]
+        logger.info(f"   {lookup:<45} mean {statistics.mean(samples) * 1000:8.3f} ms"
+                    f"   p95 {p95 * 1000:8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--progress-rows', type=int, default=1000000)
+    parser.add_argument('--lookups', type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        class BenchConfig(Config):
+            SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+
+        app = create_app(BenchConfig)
+        with app.app_context():
+            indexes = secondary_indexes()
+            for index in indexes:
+                index.drop(db.engine)
+
+            users, user_levels = seed(args.progress_rows)
+            rows = db.session.execute(text('SELECT COUNT(*) FROM user_video_progress')).scalar()
+            logger.info(f"{rows} progress rows, {user_levels} enrollments")
+
+            report('Without indexes', time_lookups(users, user_levels, args.lookups))
+
+            start = time.perf_counter()
+            for index in indexes:
+                index.create(db.engine)
+            logger.info(f"Built {len(indexes)} indexes in {time.perf_counter() - start:.1f} s")
+
+            report('With indexes', time_lookups(users, user_levels, args.lookups))
+            db.session.remove()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Login Throughput Benchmark for Educational App
+Runs concurrent logins against the app through the test client for a fixed
+time per bcrypt pool size, while a probe thread keeps requesting a cheap
+endpoint. Reports logins per second, fast-failed (503) logins and latencies.
+
+    python benchmarks/bench_login.py --threads 32 --pool-sizes 1,2,4 --rounds 10
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert  # noqa: E402
+
+from app import create_app, db, bcrypt  # noqa: E402
+from app.config import Config  # noqa: E402
+from app.models import User, WelcomeVideo  # noqa: E402
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+PASSWORD = 'bench-password'
+
+
+def percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[max(0, int(len(samples) * fraction) - 1)] if samples else 0.0
+
+
+def run(pool_size, args, tmp):
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(tmp, f'bench{pool_size}.db')}"
+        BCRYPT_LOG_ROUNDS = args.rounds
+        BCRYPT_POOL_SIZE = pool_size
+        BCRYPT_QUEUE_SIZE = args.queue_size
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        hashed = bcrypt.generate_password_hash(PASSWORD).decode('utf-8')
+        db.session.execute(insert(User), [
+            {'name': f'user{u}', 'email': f'user{u}@bench.test', 'password': hashed, 'role': 'client'}
+            for u in range(args.threads)])
+        db.session.add(WelcomeVideo(video_url='https://youtube.com/welcome'))
+        db.session.commit()
+        db.session.remove()
+
+    deadline = time.perf_counter() + args.duration
+    logins, busy, probes = [], [], []
+    lock = threading.Lock()
+
+    def log_in(u):
+        client = app.test_client()
+        body = {'email': f'user{u}@bench.test', 'password': PASSWORD}
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            status = client.post('/login', json=body).status_code
+            elapsed = time.perf_counter() - start
+            with lock:
+                (logins if status == 200 else busy).append(elapsed)
+            if status == 503:
+                time.sleep(0.01)
+
+    def probe():
+        client = app.test_client()
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            client.get('/welcome_video')
+            probes.append(time.perf_counter() - start)
+            time.sleep(0.005)
+
+    threads = [threading.Thread(target=log_in, args=(u,)) for u in range(args.threads)]
+    threads.append(threading.Thread(target=probe))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    logger.info(f"pool {pool_size:>3}: {len(logins) / args.duration:7.1f} logins/s"
+                f"   503s {len(busy):5}"
+                f"   login p50 {percentile(logins, 0.5) * 1000:7.1f} ms"
+                f"   p95 {percentile(logins, 0.95) * 1000:7.1f} ms"
+                f"   cheap endpoint mean {statistics.mean(probes) * 1000:6.1f} ms"
+                f"   p95 {percentile(probes, 0.95) * 1000:6.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=32, help='concurrent login clients')
+    parser.add_argument('--pool-sizes', default='1,2,4', help='comma-separated BCRYPT_POOL_SIZE values')
+    parser.add_argument('--queue-size', type=int, default=8)
+    parser.add_argument('--rounds', type=int, default=10, help='bcrypt cost factor')
+    parser.add_argument('--duration', type=float, default=5.0, help='seconds per pool size')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for pool_size in [int(size) for size in args.pool_sizes.split(',')]:
+            run(pool_size, args, tmp)
+
+
+if __name__ == '__main__':
+    main()
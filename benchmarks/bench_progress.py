@@ -0,0 +1,180 @@
+"""
+Progress Storage Benchmark for Educational App
+Compares the row-per-video progress layout with the opened/completed bitmaps
+on UserLevel: database size on disk and the time to read one user's progress
+across every enrolled level.
+
+    python benchmarks/bench_progress.py --users 2000 --answered 0.1
+"""
+
+import argparse
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert, text  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.config import Config  # noqa: E402
+from app.models import User, Level, Video, UserLevel, UserVideoProgress  # noqa: E402
+from app.progress import pack, has, opened_videos, completed_videos  # noqa: E402
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+LEVELS = 40
+VIDEOS_PER_LEVEL = 30
+CHUNK = 50000
+
+# The layout before bitmaps: one row per enrolled video carrying both flags
+LEGACY_TABLE = """
+CREATE TABLE legacy_video_progress (
+    id INTEGER PRIMARY KEY,
+    user_level_id INTEGER NOT NULL REFERENCES user_level (id),
+    video_id INTEGER NOT NULL REFERENCES video (id),
+    is_opened BOOLEAN, is_completed BOOLEAN,
+    correct_words INTEGER, wrong_words INTEGER, percentage FLOAT,
+    correct_words_list TEXT, wrong_words_list TEXT)
+"""
+LEGACY_INDEX = 'CREATE UNIQUE INDEX ix_legacy_video_progress ON legacy_video_progress (user_level_id, video_id)'
+
+
+def video_id(level, position):
+    return (level - 1) * VIDEOS_PER_LEVEL + position + 1
+
+
+def seed(layout, users, answered):
+    # Every user has every level with a random number of completed videos;
+    # `answered` is the share of videos that have submitted answers.
+    rng = random.Random(42)
+    db.session.execute(insert(User), [
+        {'id': u, 'name': f'user{u}', 'email': f'user{u}@bench.test', 'password': 'x', 'role': 'client'}
+        for u in range(1, users + 1)])
+    db.session.execute(insert(Level), [
+        {'id': l, 'name': f'Level {l}', 'level_number': l, 'price': 10.0}
+        for l in range(1, LEVELS + 1)])
+    db.session.execute(insert(Video), [
+        {'id': video_id(l, p), 'level_id': l, 'position': p, 'youtube_link': 'https://youtube.com/x'}
+        for l in range(1, LEVELS + 1) for p in range(VIDEOS_PER_LEVEL)])
+    if layout == 'rows':
+        db.session.execute(text(LEGACY_TABLE))
+        db.session.execute(text(LEGACY_INDEX))
+
+    user_levels, progress = [], []
+    user_level_id = 0
+    for u in range(1, users + 1):
+        for l in range(1, LEVELS + 1):
+            user_level_id += 1
+            done = rng.randint(0, VIDEOS_PER_LEVEL)
+            opened, completed = (1 << min(done + 1, VIDEOS_PER_LEVEL)) - 1, (1 << done) - 1
+            user_level = {'id': user_level_id, 'user_id': u, 'level_id': l,
+                          'completed_videos_count': done}
+            if layout == 'bitmaps':
+                user_level.update(opened_videos=pack(opened), completed_videos=pack(completed))
+            user_levels.append(user_level)
+
+            for p in range(VIDEOS_PER_LEVEL):
+                row = {'user_level_id': user_level_id, 'video_id': video_id(l, p)}
+                if rng.random() < answered:
+                    row.update(correct_words=8, wrong_words=2, percentage=80.0,
+                               correct_words_list='["cat"]', wrong_words_list='[]')
+                elif layout == 'bitmaps':
+                    continue
+                if layout == 'rows':
+                    row.update(is_opened=has(opened, p), is_completed=has(completed, p))
+                progress.append(row)
+
+            if len(progress) >= CHUNK:
+                flush_progress(layout, progress)
+                progress = []
+    flush_progress(layout, progress)
+    for start in range(0, len(user_levels), CHUNK):
+        db.session.execute(insert(UserLevel), user_levels[start:start + CHUNK])
+    db.session.commit()
+
+
+def flush_progress(layout, progress):
+    if not progress:
+        return
+    if layout == 'rows':
+        rows = [dict({'correct_words': None, 'wrong_words': None, 'percentage': None,
+                      'correct_words_list': None, 'wrong_words_list': None}, **row) for row in progress]
+        db.session.execute(text(
+            'INSERT INTO legacy_video_progress (user_level_id, video_id, is_opened, is_completed, '
+            'correct_words, wrong_words, percentage, correct_words_list, wrong_words_list) '
+            'VALUES (:user_level_id, :video_id, :is_opened, :is_completed, :correct_words, '
+            ':wrong_words, :percentage, :correct_words_list, :wrong_words_list)'), rows)
+    else:
+        db.session.execute(insert(UserVideoProgress), progress)
+
+
+def read_rows(user_id):
+    rows = db.session.execute(text(
+        'SELECT p.video_id, p.is_opened, p.is_completed FROM legacy_video_progress p '
+        'JOIN user_level ul ON ul.id = p.user_level_id WHERE ul.user_id = :user_id'),
+        {'user_id': user_id}).all()
+    return sum(bool(row.is_completed) for row in rows)
+
+
+def read_bitmaps(user_id):
+    completed = 0
+    for user_level in UserLevel.query.filter_by(user_id=user_id):
+        opened_videos(user_level)
+        completed += completed_videos(user_level).bit_count()
+    return completed
+
+
+def run(layout, users, answered, reads):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+
+        class BenchConfig(Config):
+            SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+
+        app = create_app(BenchConfig)
+        with app.app_context():
+            start = time.perf_counter()
+            seed(layout, users, answered)
+            logger.info(f"{layout}: seeded {users} users x {LEVELS} levels in {time.perf_counter() - start:.1f} s")
+            db.session.execute(text('VACUUM'))
+
+            read = read_rows if layout == 'rows' else read_bitmaps
+            rng = random.Random(7)
+            samples, completed = [], []
+            for _ in range(reads):
+                user_id = rng.randint(1, users)
+                start = time.perf_counter()
+                completed.append(read(user_id))
+                samples.append(time.perf_counter() - start)
+                db.session.expunge_all()
+            db.session.remove()
+        return os.path.getsize(path), sorted(samples), completed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--answered', type=float, default=0.1,
+                        help='share of videos with submitted answers')
+    parser.add_argument('--reads', type=int, default=200)
+    args = parser.parse_args()
+
+    results = {layout: run(layout, args.users, args.answered, args.reads)
+               for layout in ('rows', 'bitmaps')}
+    assert results['rows'][2] == results['bitmaps'][2], 'layouts disagree on completed videos'
+
+    for layout, (size, samples, _) in results.items():
+        p95 = samples[int(len(samples) * 0.95) - 1]
+        logger.info(f"{layout:<8} database {size / 1024 / 1024:8.1f} MiB"
+                    f"   read user progress mean {statistics.mean(samples) * 1000:7.3f} ms"
+                    f"   p95 {p95 * 1000:7.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
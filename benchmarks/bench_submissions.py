@@ -0,0 +1,130 @@
+"""
+Submission Throughput Benchmark for Educational App
+Posts initial exams and video answers from concurrent clients through the
+test client for a fixed time, first committing every submission in its
+request, then with SUBMISSION_WRITE_BEHIND batching. Reports submissions per
+second and acknowledgement latencies, and checks every acknowledged
+submission reached the database.
+
+    python benchmarks/bench_submissions.py --threads 16 --duration 5
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.auth import create_user_token  # noqa: E402
+from app.config import Config  # noqa: E402
+from app.models import User, Level, Video, UserLevel, ExamResult  # noqa: E402
+from app.progress import pack  # noqa: E402
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+VIDEOS = 10
+WORDS = ['cat', 'dog', 'bird', 'fish', 'horse', 'cow', 'sheep', 'goat']
+
+
+def percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[max(0, int(len(samples) * fraction) - 1)] if samples else 0.0
+
+
+def run(write_behind, args, tmp):
+    name = 'batched' if write_behind else 'direct'
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(tmp, f'{name}.db')}"
+        SUBMISSION_WRITE_BEHIND = write_behind
+        SUBMISSION_JOURNAL = os.path.join(tmp, f'{name}.journal')
+        SUBMISSION_BATCH_SIZE = args.batch_size
+        SUBMISSION_FLUSH_INTERVAL = args.flush_interval
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.session.execute(insert(User), [
+            {'id': u, 'name': f'user{u}', 'email': f'user{u}@bench.test', 'password': 'x', 'role': 'client'}
+            for u in range(1, args.threads + 1)])
+        db.session.execute(insert(Level), [{'id': 1, 'name': 'Level 1', 'level_number': 1, 'price': 10.0}])
+        db.session.execute(insert(Video), [
+            {'id': p + 1, 'level_id': 1, 'position': p, 'youtube_link': 'https://youtube.com/x'}
+            for p in range(VIDEOS)])
+        db.session.execute(insert(UserLevel), [
+            {'user_id': u, 'level_id': 1, 'completed_videos_count': 0,
+             'opened_videos': pack(1), 'completed_videos': pack(0)}
+            for u in range(1, args.threads + 1)])
+        db.session.commit()
+        tokens = {u: create_user_token(db.session.get(User, u)) for u in range(1, args.threads + 1)}
+        db.session.remove()
+
+    deadline = time.perf_counter() + args.duration
+    latencies, failures, exams = [], [], []
+    lock = threading.Lock()
+
+    def submit(u):
+        client = app.test_client()
+        headers = {'Authorization': f'Bearer {tokens[u]}'}
+        body = {'correct_words': 6, 'wrong_words': 2,
+                'correct_words_list': WORDS[:6], 'wrong_words_list': WORDS[6:]}
+        i = 0
+        while time.perf_counter() < deadline:
+            if i % 2:
+                url = f'/users/{u}/levels/1/videos/{i // 2 % VIDEOS + 1}/submit_questions'
+            else:
+                url = '/exams/1/initial'
+            start = time.perf_counter()
+            status = client.post(url, headers=headers, json=body).status_code
+            elapsed = time.perf_counter() - start
+            with lock:
+                (latencies if status in (200, 201) else failures).append(elapsed)
+                if status == 201:
+                    exams.append(u)
+            i += 1
+
+    threads = [threading.Thread(target=submit, args=(u,)) for u in range(1, args.threads + 1)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    start = time.perf_counter()
+    with app.app_context():
+        queue = app.extensions['submission_queue']
+        if queue is not None:
+            queue.stop()
+        drain = time.perf_counter() - start
+        stored = ExamResult.query.count()
+    assert stored == len(exams), f'{len(exams)} exams acknowledged, {stored} stored'
+
+    logger.info(f"{name:<8}: {len(latencies) / args.duration:8.1f} submissions/s"
+                f"   failed {len(failures):5}"
+                f"   ack p50 {percentile(latencies, 0.5) * 1000:6.2f} ms"
+                f"   p95 {percentile(latencies, 0.95) * 1000:6.2f} ms"
+                f"   p99 {percentile(latencies, 0.99) * 1000:6.2f} ms"
+                f"   drain {drain * 1000:6.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=16, help='concurrent clients, one user each')
+    parser.add_argument('--duration', type=float, default=5.0, help='seconds per mode')
+    parser.add_argument('--batch-size', type=int, default=200)
+    parser.add_argument('--flush-interval', type=float, default=0.05)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for write_behind in (False, True):
+            run(write_behind, args, tmp)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""Composite indexes and uniqueness on progress and exam tables
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 09:00:00.000000
+
+Databases created before this revision were built by ``db.create_all()``
+without any secondary indexes. Run ``flask db upgrade`` once to add them;
+on a fresh database the indexes already exist and the upgrade is a no-op.
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_video_level_id', 'video', ['level_id'], False),
+    ('ix_user_level_user_id_level_id', 'user_level', ['user_id', 'level_id'], True),
+    ('ix_user_level_level_id', 'user_level', ['level_id'], False),
+    ('ix_user_video_progress_user_level_id_video_id', 'user_video_progress', ['user_level_id', 'video_id'], True),
+    ('ix_user_video_progress_video_id', 'user_video_progress', ['video_id'], False),
+    ('ix_exam_result_user_id_level_id', 'exam_result', ['user_id', 'level_id'], False),
+    ('ix_exam_result_level_id', 'exam_result', ['level_id'], False),
+]
+
+
+def upgrade():
+    # The unique indexes cannot be built while duplicates exist. Duplicate
+    # enrollments could only come from concurrent purchases; keep the oldest
+    # row of each pair and drop the progress rows of the others.
+    op.execute("""
+        DELETE FROM user_video_progress WHERE user_level_id IN (
+            SELECT id FROM user_level WHERE id NOT IN (
+                SELECT MIN(id) FROM user_level GROUP BY user_id, level_id))
+    """)
+    op.execute("""
+        DELETE FROM user_level WHERE id NOT IN (
+            SELECT MIN(id) FROM user_level GROUP BY user_id, level_id)
+    """)
+    op.execute("""
+        DELETE FROM user_video_progress WHERE id NOT IN (
+            SELECT MIN(id) FROM user_video_progress GROUP BY user_level_id, video_id)
+    """)
+
+    for name, table, columns, unique in INDEXES:
+        op.create_index(name, table, columns, unique=unique, if_not_exists=True)
+
+
+def downgrade():
+    for name, table, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
@@ -0,0 +1,30 @@
+"""Per-user progress version used for ETags
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Fresh databases get the column from db.create_all() on startup.
+    columns = [column['name'] for column in sa.inspect(op.get_bind()).get_columns('user')]
+    if 'progress_version' in columns:
+        return
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.add_column(sa.Column('progress_version', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.drop_column('progress_version')
@@ -0,0 +1,55 @@
+"""Video position within a level and completed video counter
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def _columns(table):
+    return [column['name'] for column in sa.inspect(op.get_bind()).get_columns(table)]
+
+
+def upgrade():
+    # Fresh databases get the columns from db.create_all() on startup.
+    if 'position' not in _columns('video'):
+        with op.batch_alter_table('video') as batch_op:
+            batch_op.add_column(sa.Column('position', sa.Integer(), nullable=False, server_default='0'))
+
+        # Number the existing videos of each level in id order, which is the
+        # order they were unlocked in until now.
+        video = sa.table('video', sa.column('id'), sa.column('level_id'), sa.column('position'))
+        earlier = video.alias('earlier')
+        op.execute(video.update().values(position=sa.select(sa.func.count()).where(
+            earlier.c.level_id == video.c.level_id, earlier.c.id < video.c.id).scalar_subquery()))
+
+    if 'completed_videos_count' not in _columns('user_level'):
+        with op.batch_alter_table('user_level') as batch_op:
+            batch_op.add_column(sa.Column('completed_videos_count', sa.Integer(), nullable=False, server_default='0'))
+
+        user_level = sa.table('user_level', sa.column('id'), sa.column('completed_videos_count'))
+        progress = sa.table('user_video_progress', sa.column('user_level_id'), sa.column('is_completed'))
+        op.execute(user_level.update().values(completed_videos_count=sa.select(sa.func.count()).where(
+            progress.c.user_level_id == user_level.c.id, progress.c.is_completed == sa.true()).scalar_subquery()))
+
+    op.drop_index('ix_video_level_id', table_name='video', if_exists=True)
+    op.create_index('ix_video_level_id_position', 'video', ['level_id', 'position'], if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_video_level_id_position', table_name='video', if_exists=True)
+    op.create_index('ix_video_level_id', 'video', ['level_id'], if_not_exists=True)
+    with op.batch_alter_table('user_level') as batch_op:
+        batch_op.drop_column('completed_videos_count')
+    with op.batch_alter_table('video') as batch_op:
+        batch_op.drop_column('position')
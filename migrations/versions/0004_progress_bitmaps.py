@@ -0,0 +1,102 @@
+"""Opened/completed video bitmaps on user_level
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+user_level = sa.table('user_level', sa.column('id'), sa.column('level_id'),
+                      sa.column('opened_videos'), sa.column('completed_videos'))
+progress = sa.table('user_video_progress', sa.column('id'), sa.column('user_level_id'),
+                    sa.column('video_id'), sa.column('is_opened'), sa.column('is_completed'),
+                    sa.column('correct_words'), sa.column('wrong_words'), sa.column('percentage'))
+video = sa.table('video', sa.column('id'), sa.column('level_id'), sa.column('position'))
+
+
+def _columns(table):
+    return [column['name'] for column in sa.inspect(op.get_bind()).get_columns(table)]
+
+
+def _pack(bits):
+    return bits.to_bytes((bits.bit_length() + 7) // 8, 'little') if bits else None
+
+
+def _unpack(value):
+    return int.from_bytes(value, 'little') if value else 0
+
+
+def upgrade():
+    # Fresh databases get the new layout from db.create_all() on startup.
+    if 'is_opened' not in _columns('user_video_progress'):
+        return
+
+    if 'opened_videos' not in _columns('user_level'):
+        with op.batch_alter_table('user_level') as batch_op:
+            batch_op.add_column(sa.Column('opened_videos', sa.LargeBinary(), nullable=True))
+            batch_op.add_column(sa.Column('completed_videos', sa.LargeBinary(), nullable=True))
+
+    # Fold the per-video flags into one pair of bitmaps per enrollment.
+    bind = op.get_bind()
+    bitmaps = {}
+    rows = bind.execute(sa.select(
+        progress.c.user_level_id, video.c.position, progress.c.is_opened, progress.c.is_completed
+    ).select_from(progress.join(video, video.c.id == progress.c.video_id)))
+    for user_level_id, position, is_opened, is_completed in rows:
+        opened, completed = bitmaps.get(user_level_id, (0, 0))
+        if is_opened:
+            opened |= 1 << position
+        if is_completed:
+            completed |= 1 << position
+        bitmaps[user_level_id] = (opened, completed)
+
+    for user_level_id, (opened, completed) in bitmaps.items():
+        bind.execute(user_level.update().where(user_level.c.id == user_level_id).values(
+            opened_videos=_pack(opened), completed_videos=_pack(completed)))
+
+    # Rows without answers carried nothing but the flags.
+    op.execute(progress.delete().where(
+        progress.c.correct_words.is_(None), progress.c.wrong_words.is_(None),
+        progress.c.percentage.is_(None)))
+
+    with op.batch_alter_table('user_video_progress') as batch_op:
+        batch_op.drop_column('is_opened')
+        batch_op.drop_column('is_completed')
+
+
+def downgrade():
+    with op.batch_alter_table('user_video_progress') as batch_op:
+        batch_op.add_column(sa.Column('is_opened', sa.Boolean(), nullable=True))
+        batch_op.add_column(sa.Column('is_completed', sa.Boolean(), nullable=True))
+
+    # Recreate one row per enrolled video and unpack the flags into it.
+    bind = op.get_bind()
+    existing = set(bind.execute(sa.select(progress.c.user_level_id, progress.c.video_id)))
+    rows = bind.execute(sa.select(
+        user_level.c.id, user_level.c.opened_videos, user_level.c.completed_videos,
+        video.c.id, video.c.position
+    ).select_from(user_level.join(video, video.c.level_id == user_level.c.level_id))).all()
+    for user_level_id, opened, completed, video_id, position in rows:
+        values = {'is_opened': bool(_unpack(opened) >> position & 1),
+                  'is_completed': bool(_unpack(completed) >> position & 1)}
+        if (user_level_id, video_id) in existing:
+            bind.execute(progress.update().where(
+                progress.c.user_level_id == user_level_id,
+                progress.c.video_id == video_id).values(**values))
+        else:
+            bind.execute(progress.insert().values(
+                user_level_id=user_level_id, video_id=video_id, **values))
+
+    with op.batch_alter_table('user_level') as batch_op:
+        batch_op.drop_column('completed_videos')
+        batch_op.drop_column('opened_videos')
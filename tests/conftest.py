@@ -0,0 +1,70 @@
+import pytest
+from sqlalchemy import event
+
+from app import create_app, db
+from app.auth import create_user_token
+from app.config import Config
+from app.models import User
+
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    BCRYPT_LOG_ROUNDS = 4
+
+
+@pytest.fixture
+def app(tmp_path):
+    class _Config(TestConfig):
+        UPLOAD_FOLDER = str(tmp_path / 'uploads')
+
+    app = create_app(_Config)
+    with app.app_context():
+        yield app
+        app.extensions['image_variants'].wait()
+        db.session.remove()
+        db.drop_all(bind_key=None)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_user(app):
+    def _make_user(name='user', role='client'):
+        user = User(name=name, email=f'{name}@example.com',
+                    password='x', role=role)
+        db.session.add(user)
+        db.session.commit()
+        return user
+    return _make_user
+
+
+@pytest.fixture
+def auth_headers(app):
+    def _auth_headers(user):
+        return {'Authorization': f'Bearer {create_user_token(user)}'}
+    return _auth_headers
+
+
+class QueryCounter:
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+
+@pytest.fixture
+def count_queries(app):
+    def _count_queries():
+        counter = QueryCounter()
+        event.listen(db.engine, 'before_cursor_execute', counter)
+        return counter
+    return _count_queries
@@ -0,0 +1,87 @@
+from app import db
+from app.models import Level, Video, ExamResult
+from app.pagination import encode_cursor
+
+
+def collect_pages(client, url, headers, limit):
+    items, cursor, pages = [], None, 0
+    while True:
+        query = f'?limit={limit}' + (f'&cursor={cursor}' if cursor else '')
+        response = client.get(url + query, headers=headers)
+        assert response.status_code == 200, response.get_json()
+        page = response.get_json()
+        assert len(page['items']) <= limit
+        items.extend(page['items'])
+        pages += 1
+        cursor = page['next_cursor']
+        if not cursor:
+            return items, pages
+
+
+def test_admin_users_pages_through_every_user(client, make_user, auth_headers):
+    admin = make_user('admin', role='admin')
+    for i in range(11):
+        make_user(f'user{i}')
+
+    items, pages = collect_pages(client, '/admin/users', auth_headers(admin), 5)
+
+    assert pages == 3
+    assert [item['id'] for item in items] == list(range(1, 13))
+
+
+def test_admin_levels_keyset_on_level_number(client, make_user, auth_headers):
+    admin = make_user('admin', role='admin')
+    for number in (3, 1, 2, 2, 1):
+        db.session.add(Level(name=f'L{number}', level_number=number, price=1.0))
+    db.session.commit()
+
+    items, _ = collect_pages(client, '/admin/levels', auth_headers(admin), 2)
+
+    assert [item['level_number'] for item in items] == [1, 1, 2, 2, 3]
+    assert len({item['id'] for item in items}) == 5
+
+
+def test_admin_videos_and_exams_include_related_names(client, make_user, auth_headers):
+    admin = make_user('admin', role='admin')
+    student = make_user('student')
+    level = Level(name='Basics', level_number=1, price=1.0)
+    level.videos = [Video(youtube_link='https://youtube.com/a')]
+    db.session.add(level)
+    db.session.flush()
+    db.session.add(ExamResult(user_id=student.id, level_id=level.id, correct_words=1,
+                              wrong_words=1, percentage=50.0, type='initial'))
+    db.session.commit()
+    headers = auth_headers(admin)
+
+    videos = client.get('/admin/videos', headers=headers).get_json()
+    exams = client.get('/admin/exams', headers=headers).get_json()
+
+    assert videos['items'][0]['level_name'] == 'Basics'
+    assert videos['items'][0]['user_progress_count'] == 0
+    assert exams['items'][0]['user_name'] == 'student'
+    assert exams['items'][0]['level_name'] == 'Basics'
+    assert exams['next_cursor'] is None
+
+
+def test_invalid_cursor_is_rejected(client, make_user, auth_headers):
+    admin = make_user('admin', role='admin')
+
+    response = client.get('/admin/users?cursor=not-a-cursor',
+                          headers=auth_headers(admin))
+
+    assert response.status_code == 400
+
+
+def test_cursor_values_must_match_the_key_types(client, make_user, auth_headers):
+    headers = auth_headers(make_user('admin', role='admin'))
+    cases = [
+        ('/admin/levels', ['a', 'b']), ('/admin/levels', [None, 1]), ('/admin/levels', [True, 1]),
+        ('/admin/users', [{'a': 1}]), ('/admin/users', ['1']), ('/admin/exams', [[1]]),
+        ('/admin/videos', [1.5]),
+    ]
+    for url, values in cases:
+        response = client.get(f'{url}?cursor={encode_cursor(values)}', headers=headers)
+        assert response.status_code == 400, (url, values)
+        assert response.get_json() == {'message': 'Invalid cursor'}
+
+    assert client.get(f'/admin/levels?cursor={encode_cursor([1, 1])}', headers=headers).status_code == 200
@@ -0,0 +1,85 @@
+import re
+import threading
+
+from app import db
+from app.hashing import PasswordHasher
+
+USER_SELECT = re.compile(r'FROM "?user"?(\s|$)')
+
+
+def user_selects(counter):
+    return [s for s in counter.statements if USER_SELECT.search(s)]
+
+
+def test_current_user_is_loaded_once_per_request(client, make_user, auth_headers, count_queries):
+    user = make_user()
+    headers = auth_headers(user)
+    db.session.expire_all()
+
+    counter = count_queries()
+    response = client.get(f'/users/{user.id}/levels', headers=headers)
+
+    assert response.status_code == 200
+    assert len(user_selects(counter)) == 1, counter.statements
+
+
+def test_role_claim_skips_user_lookup(app, client, make_user, auth_headers, count_queries):
+    app.config['JWT_ROLE_CLAIM'] = True
+    admin = make_user('admin', role='admin')
+    headers = auth_headers(admin)
+
+    counter = count_queries()
+    response = client.get('/admin/videos', headers=headers)
+
+    assert response.status_code == 200
+    assert user_selects(counter) == [], counter.statements
+
+
+def test_role_claim_still_enforces_admin(app, client, make_user, auth_headers):
+    app.config['JWT_ROLE_CLAIM'] = True
+    student = make_user('student')
+
+    response = client.get('/admin/videos', headers=auth_headers(student))
+
+    assert response.status_code == 403
+
+
+def test_deleted_user_token_is_rejected_without_role_claim(client, make_user, auth_headers):
+    admin = make_user('admin', role='admin')
+    student = make_user('student')
+    headers = auth_headers(student)
+    client.delete(f'/admin/users/{student.id}', headers=auth_headers(admin))
+
+    response = client.get(f'/users/{student.id}/levels', headers=headers)
+
+    assert response.status_code == 401
+
+
+def test_register_and_login_hash_on_the_pool(client):
+    client.post('/register', json={'name': 'ann', 'email': 'ann@example.com', 'password': 'secret'})
+
+    assert client.post('/login', json={'email': 'ann@example.com', 'password': 'secret'}).status_code == 200
+    assert client.post('/login', json={'email': 'ann@example.com', 'password': 'wrong'}).status_code == 401
+
+
+def test_login_fails_fast_when_hashing_pool_is_saturated(app, client):
+    client.post('/register', json={'name': 'ann', 'email': 'ann@example.com', 'password': 'secret'})
+    hasher = app.extensions['password_hasher'] = PasswordHasher(pool_size=1, queue_size=0)
+    started, release = threading.Event(), threading.Event()
+
+    def block():
+        started.set()
+        release.wait()
+
+    blocker = threading.Thread(target=hasher.run, args=(block,))
+    blocker.start()
+    started.wait()
+    try:
+        response = client.post('/login', json={'email': 'ann@example.com', 'password': 'secret'})
+    finally:
+        release.set()
+        blocker.join()
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+    assert client.post('/login', json={'email': 'ann@example.com', 'password': 'secret'}).status_code == 200
@@ -0,0 +1,55 @@
+import pytest
+from flask import Response, stream_with_context
+from sqlalchemy import text
+
+from app import db
+from app.budgets import query_budget, QueryBudgetExceeded
+
+
+def run_selects(n):
+    for i in range(n):
+        db.session.execute(text(f'SELECT {i}'))
+
+
+@pytest.fixture
+def budgeted(app):
+    @query_budget(2)
+    def plain(n):
+        run_selects(n)
+        return {'ran': n}
+
+    @query_budget(2)
+    def streamed(n):
+        def body():
+            yield 'start\n'
+            run_selects(n)
+            yield 'end\n'
+        return Response(stream_with_context(body()))
+
+    app.add_url_rule('/budgeted/<int:n>', view_func=plain)
+    app.add_url_rule('/budgeted/<int:n>/stream', view_func=streamed)
+    return app
+
+
+def test_budget_raises_in_tests(budgeted, client):
+    assert client.get('/budgeted/2').get_json() == {'ran': 2}
+    with pytest.raises(QueryBudgetExceeded, match='plain ran 3 SQL statements, budget is 2'):
+        client.get('/budgeted/3')
+
+
+def test_budget_counts_streamed_bodies(budgeted, client):
+    assert client.get('/budgeted/2/stream').get_data(as_text=True) == 'start\nend\n'
+    with pytest.raises(QueryBudgetExceeded):
+        client.get('/budgeted/3/stream').get_data()
+
+
+def test_budget_logs_statements(budgeted, client, caplog):
+    budgeted.config['QUERY_BUDGET_MODE'] = 'log'
+    assert client.get('/budgeted/3').status_code == 200
+    assert 'budget is 2' in caplog.text
+    assert 'SELECT 2' in caplog.text
+
+    caplog.clear()
+    budgeted.config['QUERY_BUDGET_MODE'] = ''
+    assert client.get('/budgeted/5').status_code == 200
+    assert not caplog.text
@@ -0,0 +1,50 @@
+from flask import Flask
+
+from app import create_app, db
+from app.config import Config
+from app.database import configure, engine_options, sqlite_pragmas
+
+from tests.conftest import TestConfig
+
+
+def test_sqlite_file_gets_wal_profile(tmp_path):
+    class _Config(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'app.db'}"
+        DATABASE_POOL_SIZE = 3
+
+    app = create_app(_Config)
+    with app.app_context():
+        assert sqlite_pragmas(db.engine) == {
+            'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 5000,
+            'cache_size': -64000, 'mmap_size': 268435456}
+        assert db.engine.pool.size() == 3
+        db.session.remove()
+
+
+def test_pragmas_can_be_disabled(tmp_path):
+    class _Config(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'app.db'}"
+        SQLITE_PRAGMAS = {}
+
+    app = create_app(_Config)
+    with app.app_context():
+        assert sqlite_pragmas(db.engine)['journal_mode'] == 'delete'
+        db.session.remove()
+
+
+def test_server_pool_options_and_explicit_override():
+    config = {key: getattr(Config, key) for key in dir(Config) if key.isupper()}
+    assert engine_options(config, 'postgresql://app@db/app') == {
+        'pool_size': 10, 'max_overflow': 20, 'pool_timeout': 30,
+        'pool_recycle': 1800, 'pool_pre_ping': True}
+    assert engine_options(config, 'sqlite://') == {}
+
+    class _Config(TestConfig):
+        SQLALCHEMY_DATABASE_URI = 'postgresql://app@db/app'
+        SQLALCHEMY_ENGINE_OPTIONS = {'pool_size': 1}
+
+    app = Flask(__name__)
+    app.config.from_object(_Config)
+    configure(app)
+    assert app.config['SQLALCHEMY_ENGINE_OPTIONS']['pool_size'] == 1
+    assert app.config['SQLALCHEMY_ENGINE_OPTIONS']['pool_recycle'] == 1800
@@ -0,0 +1,66 @@
+from app import db
+from app.models import User, UserLevel, LevelStatistics
+from app.statistics import get_statistics
+
+from tests.test_levels import seed_catalog, enroll
+
+
+def test_bulk_enroll_inserts_pairs_and_skips_existing(client, make_user, auth_headers, count_queries):
+    admin = make_user('admin', role='admin')
+    students = [make_user(f'student{i}') for i in range(20)]
+    levels = seed_catalog(levels=3, videos=5)
+    enroll(students[0], levels[0])
+    user_ids = [student.id for student in students]
+    level_ids = [level.id for level in levels]
+    headers = auth_headers(admin)
+    db.session.expire_all()
+
+    counter = count_queries()
+    response = client.post('/admin/enrollments', headers=headers,
+                           json={'user_ids': user_ids + [9999], 'level_ids': level_ids})
+    data = response.get_json()
+
+    assert response.status_code == 200
+    assert counter.count <= 20, counter.statements
+    assert data['enrolled'] == 59 and data['skipped'] == 4
+    statuses = {(r['user_id'], r['level_id']): r['status'] for r in data['results']}
+    assert statuses[(user_ids[0], level_ids[0])] == 'already_enrolled'
+    assert statuses[(user_ids[0], level_ids[1])] == 'enrolled'
+    assert statuses[(9999, level_ids[0])] == 'user_not_found'
+
+    assert UserLevel.query.count() == 60
+    assert get_statistics().total_purchases == 60
+    assert db.session.get(User, user_ids[1]).progress_version == 1
+
+    videos = client.get(f'/levels/{level_ids[1]}', headers=auth_headers(students[1])).get_json()['videos']
+    assert [video['is_opened'] for video in videos] == [True, False, False, False, False]
+
+
+def test_bulk_enroll_statements_do_not_grow_with_levels(client, make_user, auth_headers):
+    admin = make_user('admin', role='admin')
+    students = [make_user(f'student{i}') for i in range(3)]
+    levels = seed_catalog(levels=40, videos=2)
+    enroll(students[0], levels[0])
+    get_statistics()
+    headers = auth_headers(admin)
+
+    # Within the budget of 20 statements, with the rollup and some level rows
+    # already there
+    response = client.post('/admin/enrollments', headers=headers, json={
+        'user_ids': [student.id for student in students], 'level_ids': [level.id for level in levels]})
+    assert response.status_code == 200
+    assert response.get_json()['enrolled'] == 119
+
+    db.session.expire_all()
+    assert get_statistics().total_purchases == 120
+    purchases = dict(db.session.query(LevelStatistics.level_id, LevelStatistics.purchases))
+    assert purchases == {level.id: 3 for level in levels}
+
+
+def test_bulk_enroll_validates_input(client, make_user, auth_headers):
+    headers = auth_headers(make_user('admin', role='admin'))
+
+    assert client.post('/admin/enrollments', headers=headers,
+                       json={'user_ids': [1]}).status_code == 400
+    assert client.post('/admin/enrollments', headers=headers,
+                       json={'user_ids': ['1'], 'level_ids': [1]}).status_code == 400
@@ -0,0 +1,74 @@
+from app import db
+from tests.test_levels import seed_catalog, enroll
+
+
+def test_welcome_video_revalidation(client, make_user, auth_headers):
+    admin = make_user('admin', role='admin')
+    client.post('/welcome_video', headers=auth_headers(admin),
+                json={'video_url': 'https://youtube.com/a'})
+
+    first = client.get('/welcome_video')
+    cached = client.get('/welcome_video', headers={'If-None-Match': first.headers['ETag']})
+    client.post('/welcome_video', headers=auth_headers(admin),
+                json={'video_url': 'https://youtube.com/b'})
+    changed = client.get('/welcome_video', headers={'If-None-Match': first.headers['ETag']})
+
+    assert first.status_code == 200
+    assert cached.status_code == 304
+    assert changed.status_code == 200
+    assert changed.get_json()['video_url'] == 'https://youtube.com/b'
+
+
+def test_levels_304_skips_catalog_and_progress_queries(client, make_user, auth_headers, count_queries):
+    user = make_user()
+    level = seed_catalog(levels=3, videos=3)[0]
+    enroll(user, level)
+    headers = auth_headers(user)
+    etag = client.get('/levels', headers=headers).headers['ETag']
+    db.session.expire_all()
+
+    counter = count_queries()
+    response = client.get('/levels', headers=dict(headers, **{'If-None-Match': etag}))
+
+    assert response.status_code == 304
+    assert response.headers['ETag'].strip('"') == etag.strip('"')
+    assert not [s for s in counter.statements if 'level' in s.split('FROM')[-1]]
+
+
+def test_progress_change_invalidates_level_and_report_etags(client, make_user, auth_headers):
+    user = make_user()
+    level = seed_catalog(levels=1, videos=2)[0]
+    enroll(user, level)
+    headers = auth_headers(user)
+    urls = [f'/levels/{level.id}', '/levels', '/report', '/report?format=json']
+    video_id = level.videos[0].id
+    etags = {}
+    for url in urls:
+        response = client.get(url, headers=headers)
+        response.get_data()  # let the streamed reports finish
+        etags[url] = response.headers['ETag']
+
+    client.patch(f'/users/{user.id}/levels/{level.id}/videos/{video_id}/complete',
+                 headers=headers)
+
+    for url in urls:
+        response = client.get(url, headers=dict(headers, **{'If-None-Match': etags[url]}))
+        response.get_data()
+        assert response.status_code == 200, url
+        assert response.headers['ETag'] != etags[url]
+
+
+def test_markdown_report_etag_is_weak(client, make_user, auth_headers):
+    user = make_user()
+    enroll(user, seed_catalog(levels=1, videos=1)[0])
+    headers = auth_headers(user)
+
+    for url, weak in (('/report', True), ('/report?format=json', False)):
+        response = client.get(url, headers=headers)
+        response.get_data()
+        assert response.status_code == 200
+        assert response.headers['ETag'].startswith('W/') == weak
+
+        revalidated = client.get(url, headers=dict(headers, **{'If-None-Match': response.headers['ETag']}))
+        assert revalidated.status_code == 304
+        assert revalidated.headers['ETag'] == response.headers['ETag']
@@ -0,0 +1,53 @@
+import csv
+import io
+import json
+
+from app import db
+from tests.test_levels import seed_catalog
+from tests.test_report import seed_history
+
+
+def test_ndjson_export_streams_every_user_with_fixed_queries(client, make_user, auth_headers, count_queries):
+    admin = make_user('admin', role='admin')
+    levels = seed_catalog(levels=4, videos=5)
+    students = [make_user(f'student{i}') for i in range(12)]
+    for i, student in enumerate(students):
+        seed_history(student, levels[:i % 4], exams_per_level=2)
+    headers = auth_headers(admin)
+    db.session.expire_all()
+
+    counter = count_queries()
+    response = client.get('/admin/reports/export?role=client', headers=headers)
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    assert response.mimetype == 'application/x-ndjson'
+    assert counter.count <= 6, counter.statements
+    assert [line['user']['name'] for line in lines] == [f'student{i}' for i in range(12)]
+    assert [len(line['levels']) for line in lines] == [i % 4 for i in range(12)]
+    assert all(len(level['videos']) == 5 and len(level['exams']) == 2
+               for line in lines for level in line['levels'])
+
+
+def test_csv_export_filters_users(client, make_user, auth_headers):
+    admin = make_user('admin', role='admin')
+    levels = seed_catalog(levels=2, videos=3)
+    enrolled = make_user('enrolled')
+    idle = make_user('idle')
+    make_user('skipped')
+    seed_history(enrolled, levels, exams_per_level=2)
+
+    response = client.get(f'/admin/reports/export?format=csv&user_ids={enrolled.id},{idle.id}',
+                          headers=auth_headers(admin))
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+
+    assert [row['user_name'] for row in rows] == ['enrolled', 'enrolled', 'idle']
+    assert rows[0]['videos_total'] == '3' and rows[0]['videos_opened'] == '1'
+    assert rows[0]['exams_taken'] == '2' and rows[0]['average_exam_percentage'] == '75.0'
+    assert rows[2]['level_id'] == ''
+
+
+def test_export_rejects_bad_arguments(client, make_user, auth_headers):
+    headers = auth_headers(make_user('admin', role='admin'))
+
+    assert client.get('/admin/reports/export?format=xml', headers=headers).status_code == 400
+    assert client.get('/admin/reports/export?user_ids=a,b', headers=headers).status_code == 400
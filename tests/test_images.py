@@ -0,0 +1,158 @@
+import hashlib
+import io
+import os
+
+import pytest
+
+from app import create_app, images
+from app.images import collect_images
+from app.models import Level
+
+from tests.conftest import TestConfig
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'cat' * 1000
+
+
+def upload(client, headers, data=PNG, filename='cat.png', level_id=None, **fields):
+    form = {'file': (io.BytesIO(data), filename), **fields}
+    if level_id is None:
+        form.update(name='Level', level_number='1', price='10')
+        return client.post('/levels', headers=headers, data=form)
+    return client.put(f'/levels/{level_id}', headers=headers, data=form)
+
+
+def stored_files(app):
+    return sorted(os.listdir(app.config['UPLOAD_FOLDER']))
+
+
+def test_identical_uploads_are_stored_once(app, client, make_user, auth_headers):
+    headers = auth_headers(make_user('admin', role='admin'))
+
+    first = upload(client, headers).get_json()
+    second = upload(client, headers, filename='CAT.PNG').get_json()
+
+    digest = hashlib.sha256(PNG).hexdigest()
+    assert first['image_path'] == second['image_path'] == f'/Uploads/levels/{digest}.png'
+    assert stored_files(app) == [f'{digest}.png']
+    assert client.get(first['image_path']).data == PNG
+
+
+def test_unreferenced_images_are_released(app, client, make_user, auth_headers):
+    app.config['IMAGE_GC_GRACE_SECONDS'] = 0
+    headers = auth_headers(make_user('admin', role='admin'))
+    shared = upload(client, headers).get_json()
+    other = upload(client, headers).get_json()
+
+    # Still referenced by the other level
+    upload(client, headers, data=b'dog', filename='dog.png', level_id=shared['id'])
+    assert len(stored_files(app)) == 2
+
+    client.delete(f"/levels/{other['id']}", headers=headers)
+    assert stored_files(app) == [hashlib.sha256(b'dog').hexdigest() + '.png']
+
+
+def test_collect_images_renames_legacy_uploads(app, client, make_user, auth_headers):
+    headers = auth_headers(make_user('admin', role='admin'))
+    level_id = upload(client, headers).get_json()['id']
+    folder = app.config['UPLOAD_FOLDER']
+    for name in ('1111_cat.png', '2222_cat.png'):
+        with open(os.path.join(folder, name), 'wb') as f:
+            f.write(PNG)
+    level = Level.query.get(level_id)
+    os.remove(os.path.join(folder, level.image_path.rsplit('/', 1)[1]))
+    level.image_path = '/Uploads/levels/1111_cat.png'
+
+    assert collect_images(grace=0) == (1, 2)
+    assert stored_files(app) == [hashlib.sha256(PNG).hexdigest() + '.png']
+    assert Level.query.get(level_id).image_path.endswith(stored_files(app)[0])
+
+
+def test_content_named_images_are_cached_and_support_ranges(app, client, make_user, auth_headers):
+    headers = auth_headers(make_user('admin', role='admin'))
+    image_path = upload(client, headers).get_json()['image_path']
+
+    response = client.get(image_path)
+    assert response.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+
+    partial = client.get(image_path, headers={'Range': 'bytes=0-7'})
+    assert partial.status_code == 206 and partial.data == PNG[:8]
+
+    revalidated = client.get(image_path, headers={'If-Modified-Since': response.headers['Last-Modified']})
+    assert revalidated.status_code == 304
+
+
+def test_legacy_images_are_revalidated(app, client):
+    os.makedirs(app.config['UPLOAD_FOLDER'])
+    with open(os.path.join(app.config['UPLOAD_FOLDER'], '1111_cat.png'), 'wb') as f:
+        f.write(PNG)
+
+    response = client.get('/Uploads/levels/1111_cat.png')
+
+    assert response.headers['Cache-Control'] == 'public, no-cache'
+
+
+def test_sendfile_modes_leave_the_bytes_to_the_web_server(app, client, make_user, auth_headers):
+    headers = auth_headers(make_user('admin', role='admin'))
+    image_path = upload(client, headers).get_json()['image_path']
+    filename = image_path.rsplit('/', 1)[1]
+
+    app.config['UPLOAD_SENDFILE'] = 'x-accel-redirect'
+    response = client.get(image_path)
+    assert response.data == b''
+    assert response.headers['X-Accel-Redirect'] == f'/protected/uploads/levels/{filename}'
+    assert response.mimetype == 'image/png'
+    assert client.get('/Uploads/levels/missing.png').status_code == 404
+
+    app.config['UPLOAD_SENDFILE'] = 'x-sendfile'
+    response = client.get(image_path)
+    assert response.headers['X-Sendfile'] == os.path.join(app.config['UPLOAD_FOLDER'], filename)
+
+
+def photo(width=1200, height=800):
+    Image = pytest.importorskip('PIL.Image')
+    output = io.BytesIO()
+    Image.new('RGB', (width, height), (200, 120, 40)).save(output, format='PNG')
+    return output.getvalue()
+
+
+def test_variants_are_generated_in_background(app, client, make_user, auth_headers):
+    data = photo()
+    from PIL import Image
+    headers = auth_headers(make_user('admin', role='admin'))
+    level = upload(client, headers, data=data).get_json()
+    app.extensions['image_variants'].wait()
+
+    variants = client.get(f"/levels/{level['id']}", headers=headers).get_json()['image_variants']
+    assert set(variants) == {'thumb', 'medium'}
+    assert set(variants['thumb']) == {'webp', 'png'}
+    thumb = Image.open(io.BytesIO(client.get(variants['thumb']['webp']).data))
+    assert thumb.format == 'WEBP' and max(thumb.size) == 160
+
+    levels = client.get('/levels?image_size=thumb', headers=headers).get_json()
+    assert levels[0]['image_path'] == variants['thumb']['webp']
+    assert client.get('/levels?image_size=huge', headers=headers).status_code == 400
+
+    app.config['IMAGE_GC_GRACE_SECONDS'] = 0
+    client.delete(f"/levels/{level['id']}", headers=headers)
+    assert stored_files(app) == []
+
+
+def test_sized_image_falls_back_to_original_until_generated(app, client, make_user, auth_headers):
+    photo()
+    headers = auth_headers(make_user('admin', role='admin'))
+    level = upload(client, headers).get_json()
+    app.extensions['image_variants'].wait()
+
+    data = client.get(f"/levels/{level['id']}?image_size=medium", headers=headers).get_json()
+    assert data['image_variants'] == {}
+    assert data['image_path'] == level['image_path']
+
+
+def test_missing_pillow_is_logged_at_startup(tmp_path, monkeypatch, caplog):
+    class _Config(TestConfig):
+        UPLOAD_FOLDER = str(tmp_path / 'uploads')
+
+    monkeypatch.setattr(images, 'Image', None)
+    app = create_app(_Config)
+    assert 'Pillow is not installed' in caplog.text
+    app.extensions['image_variants'].wait()
@@ -0,0 +1,48 @@
+from app import create_app, db
+
+from tests.conftest import TestConfig
+from tests.test_levels import seed_catalog, enroll
+
+
+def scrape(client, headers=None):
+    response = client.get('/metrics', headers=headers)
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain; version=0.0.4')
+    return {line.rsplit(' ', 1)[0]: float(line.rsplit(' ', 1)[1])
+            for line in response.get_data(as_text=True).splitlines() if not line.startswith('#')}
+
+
+def test_metrics_cover_latency_status_size_and_sql(client, make_user, auth_headers):
+    user = make_user()
+    level = seed_catalog(levels=3, videos=2)[0]
+    enroll(user, level)
+    headers = auth_headers(user)
+    for _ in range(2):
+        assert client.get('/levels', headers=headers).status_code == 200
+    assert client.get('/levels/999', headers=headers).status_code == 404
+
+    samples = scrape(client)
+    route = 'endpoint="main.get_levels",method="GET"'
+    assert samples[f'http_requests_total{{{route},status="200"}}'] == 2
+    assert samples['http_requests_total{endpoint="main.get_level",method="GET",status="404"}'] == 1
+    assert samples[f'http_request_duration_seconds_count{{{route}}}'] == 2
+    assert samples[f'http_request_duration_seconds_bucket{{{route},le="+Inf"}}'] == 2
+    assert samples[f'http_response_size_bytes_sum{{{route}}}'] > 0
+    statements = samples[f'db_statements_per_request_sum{{{route}}}']
+    assert 2 <= statements <= 20
+    assert samples[f'db_statements_per_request_bucket{{{route},le="0"}}'] == 0
+    # Only blueprint views are instrumented, not the scrape itself
+    assert not any('endpoint="metrics"' in name for name in samples)
+
+
+def test_metrics_token(tmp_path):
+    class _Config(TestConfig):
+        METRICS_TOKEN = 'scrape-secret'
+        UPLOAD_FOLDER = str(tmp_path / 'uploads')
+
+    app = create_app(_Config)
+    with app.app_context():
+        client = app.test_client()
+        assert client.get('/metrics').status_code == 401
+        scrape(client, {'Authorization': 'Bearer scrape-secret'})
+        db.session.remove()
@@ -0,0 +1,115 @@
+import sqlite3
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.exc import OperationalError
+
+from app import create_app, db
+from app.database import REPLICA_BIND
+from app.models import Level, StatisticsRollup
+from app.statistics import get_statistics
+from app.versions import bump_version, CATALOG_VERSION
+
+from tests.conftest import TestConfig, QueryCounter
+from tests.test_levels import seed_catalog, enroll
+
+
+@pytest.fixture
+def app(tmp_path):
+    class _Config(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'primary.db'}"
+        DATABASE_REPLICA_URL = f"sqlite:///{tmp_path / 'replica.db'}"
+        UPLOAD_FOLDER = str(tmp_path / 'uploads')
+
+    app = create_app(_Config)
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.drop_all(bind_key=None)
+
+
+@pytest.fixture
+def replicate(app, tmp_path):
+    # Copy the primary onto the replica, standing in for replication
+    def _replicate():
+        db.session.commit()
+        db.engines[REPLICA_BIND].dispose()
+        with sqlite3.connect(tmp_path / 'primary.db') as primary, \
+                sqlite3.connect(tmp_path / 'replica.db') as replica:
+            primary.backup(replica)
+    return _replicate
+
+
+def count_replica_queries():
+    counter = QueryCounter()
+    event.listen(db.engines[REPLICA_BIND], 'before_cursor_execute', counter)
+    return counter
+
+
+def test_tolerant_views_read_the_replica(app, client, make_user, auth_headers, replicate):
+    headers = auth_headers(make_user('admin', role='admin'))
+    seed_catalog(levels=2, videos=1)
+    replicate()
+
+    db.session.add(Level(name='Level 3', level_number=3, price=10.0))
+    bump_version(CATALOG_VERSION)
+    db.session.commit()
+
+    # /admin/levels accepts 30 seconds of staleness, above the 10 second tolerance
+    counter = count_replica_queries()
+    items = client.get('/admin/levels', headers=headers).get_json()['items']
+    assert [item['name'] for item in items] == ['Level 1', 'Level 2']
+    assert counter.count
+
+    app.config['REPLICA_STALE_TOLERANCE'] = 60
+    items = client.get('/admin/levels', headers=headers).get_json()['items']
+    assert [item['name'] for item in items] == ['Level 1', 'Level 2', 'Level 3']
+
+
+def test_own_writes_are_read_from_the_primary(app, client, make_user, auth_headers, replicate):
+    user = make_user()
+    level = seed_catalog(levels=1, videos=2)[0]
+    enroll(user, level)
+    headers = auth_headers(user)
+    replicate()
+
+    response = client.patch(f'/users/{user.id}/levels/{level.id}/videos/{level.videos[0].id}/complete',
+                            headers=headers)
+    assert response.status_code == 200
+
+    counter = count_replica_queries()
+    levels = client.get(f'/users/{user.id}/levels', headers=headers).get_json()
+    assert levels[0]['completed_videos_count'] == 1
+    # Only the progress_version check touched the replica
+    assert counter.count == 1
+
+    replicate()
+    counter = count_replica_queries()
+    levels = client.get(f'/users/{user.id}/levels', headers=headers).get_json()
+    assert levels[0]['completed_videos_count'] == 1
+    assert counter.count > 1
+
+
+def test_statistics_rollup_is_only_rebuilt_from_the_primary(app, client, make_user, auth_headers, replicate):
+    admin = make_user('admin', role='admin')
+    levels = seed_catalog(levels=2, videos=1)
+    enroll(make_user('student'), levels[0])
+    replicate()
+
+    # The primary builds its rollup and moves on; the replica has none yet
+    get_statistics()
+    enroll(make_user('other'), levels[1])
+    db.session.commit()
+    db.session.expire_all()
+
+    response = client.get('/admin/statistics', headers=auth_headers(admin))
+    assert response.status_code == 200
+    assert (response.get_json()['total_users'], response.get_json()['total_purchases']) == (1, 1)
+    assert StatisticsRollup.query.count() == 1
+
+
+def test_replica_connections_are_read_only(app, replicate):
+    replicate()
+    with db.engines[REPLICA_BIND].connect() as connection:
+        with pytest.raises(OperationalError):
+            connection.execute(text("UPDATE level SET name = 'x'"))
@@ -0,0 +1,60 @@
+import json
+
+from app import db
+from app.models import ExamResult
+from tests.test_levels import seed_catalog, enroll
+
+
+def seed_history(user, levels, exams_per_level):
+    for level in levels:
+        enroll(user, level)
+        for i in range(exams_per_level):
+            db.session.add(ExamResult(
+                user_id=user.id, level_id=level.id, correct_words=3, wrong_words=1,
+                percentage=75.0, type='initial' if i % 2 == 0 else 'final',
+                correct_words_list=json.dumps(['cat', 'dog']), wrong_words_list='[]'))
+    db.session.commit()
+
+
+def test_report_query_count_is_independent_of_history(client, make_user, auth_headers, count_queries):
+    user = make_user()
+    other = make_user('other')
+    levels = seed_catalog(levels=10, videos=20)
+    seed_history(user, levels, exams_per_level=15)
+    seed_history(other, levels[:3], exams_per_level=2)
+    headers = auth_headers(user)
+    db.session.expire_all()
+
+    counter = count_queries()
+    response = client.get('/report?format=json', headers=headers)
+    report = json.loads(response.get_data(as_text=True))
+
+    assert counter.count <= 6, counter.statements
+    assert report['user']['name'] == 'user'
+    assert len(report['levels']) == 10
+    assert all(len(level['videos']) == 20 for level in report['levels'])
+    assert all(len(level['exams']) == 15 for level in report['levels'])
+    assert report['levels'][0]['exams'][0]['correct_words_list'] == ['cat', 'dog']
+
+
+def test_markdown_report_streams_tables(client, make_user, auth_headers):
+    user = make_user()
+    seed_history(user, seed_catalog(levels=2, videos=2), exams_per_level=1)
+
+    response = client.get('/report', headers=auth_headers(user))
+    body = response.get_data(as_text=True)
+
+    assert response.mimetype == 'text/markdown'
+    assert body.count('### Level:') == 2
+    assert '| Initial |' in body
+    assert '**No levels enrolled.**' not in body
+
+
+def test_report_without_levels(client, make_user, auth_headers):
+    user = make_user()
+
+    markdown = client.get('/report', headers=auth_headers(user)).get_data(as_text=True)
+    report = client.get('/report?format=json', headers=auth_headers(user)).get_json()
+
+    assert '**No levels enrolled.**' in markdown
+    assert report['levels'] == []
@@ -0,0 +1,63 @@
+from app import create_app, db
+from app.models import User, UserLevel, ExamResult, LevelWordStatistics, VideoWordStatistics
+from app.progress import count, completed_videos
+from app.seed import seed_data
+from app.statistics import get_statistics
+from app.words import rebuild_word_statistics
+
+from tests.conftest import TestConfig
+
+SMALL = dict(users=30, levels=4, videos_per_level=6, enrollments_per_user=2, exams_per_enrollment=3)
+
+
+def word_statistics():
+    return (sorted((row.level_id, row.word, row.correct_count, row.wrong_count)
+                   for row in LevelWordStatistics.query),
+            sorted((row.video_id, row.word, row.correct_count, row.wrong_count)
+                   for row in VideoWordStatistics.query))
+
+
+def test_seed_data_command(app, client):
+    result = app.test_cli_runner().invoke(args=[
+        'seed-data', '--users', '30', '--levels', '4', '--videos-per-level', '6',
+        '--enrollments-per-user', '2', '--exams-per-enrollment', '3'])
+    assert result.exit_code == 0, result.output
+    assert 'Seeded' in result.output
+
+    assert User.query.count() == 31
+    assert ExamResult.query.count() >= UserLevel.query.count() > 0
+    for user_level in UserLevel.query:
+        assert count(completed_videos(user_level)) == user_level.completed_videos_count
+        assert user_level.is_completed <= user_level.can_take_final_exam
+    assert get_statistics().total_purchases == UserLevel.query.count()
+
+    # The tallied word statistics match a rebuild from the inserted rows
+    seeded = word_statistics()
+    rebuild_word_statistics()
+    assert word_statistics() == seeded
+
+    user = User.query.filter_by(role='client').first()
+    response = client.post('/login', json={'email': user.email, 'password': 'password'})
+    assert response.status_code == 200
+
+    # Only into an empty database
+    result = app.test_cli_runner().invoke(args=['seed-data', '--users', '1'])
+    assert result.exit_code != 0
+    assert 'already has users' in result.output
+
+
+def test_seed_data_is_deterministic(app, tmp_path):
+    seed_data(**SMALL, seed=7)
+    first = [(row.user_id, row.level_id, row.type, row.percentage, row.timestamp, row.wrong_words_list)
+             for row in ExamResult.query.order_by(ExamResult.id)]
+
+    class _Config(TestConfig):
+        UPLOAD_FOLDER = str(tmp_path / 'uploads')
+
+    other = create_app(_Config)
+    with other.app_context():
+        seed_data(**SMALL, seed=7)
+        second = [(row.user_id, row.level_id, row.type, row.percentage, row.timestamp, row.wrong_words_list)
+                  for row in ExamResult.query.order_by(ExamResult.id)]
+        db.session.remove()
+    assert first == second
@@ -0,0 +1,150 @@
+from app import db
+from app.models import StatisticsRollup, UserVideoProgress
+from app.statistics import recompute_statistics
+from tests.test_levels import seed_catalog
+
+
+def statistics(client, headers):
+    response = client.get('/admin/statistics', headers=headers)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_rollup_tracks_writes_and_matches_recompute(app, client, make_user, auth_headers, count_queries):
+    admin = make_user('admin', role='admin')
+    headers = auth_headers(admin)
+    levels = seed_catalog(levels=3, videos=1)
+    statistics(client, headers)
+
+    students = []
+    for i in range(3):
+        response = client.post('/register', json={
+            'name': f's{i}', 'email': f's{i}@example.com', 'password': 'pw'})
+        students.append(response.get_json())
+    for student in students:
+        client.post(f"/users/{student['id']}/levels/{levels[0].id}/purchase",
+                    headers={'Authorization': f"Bearer {student['token']}"})
+    client.post(f"/admin/users/{students[0]['id']}/assign_level/{levels[1].id}", headers=headers)
+    student_headers = {'Authorization': f"Bearer {students[1]['token']}"}
+    client.patch(f"/users/{students[1]['id']}/levels/{levels[0].id}/videos/{levels[0].videos[0].id}/complete",
+                 headers=student_headers)
+    for _ in range(2):
+        client.post(f'/exams/{levels[0].id}/final', headers=student_headers,
+                    json={'correct_words': 1, 'wrong_words': 0})
+    client.delete(f"/admin/users/{students[2]['id']}", headers=headers)
+    client.delete(f'/levels/{levels[2].id}', headers=headers)
+
+    db.session.expire_all()
+    counter = count_queries()
+    incremental = statistics(client, headers)
+    assert counter.count <= 3, counter.statements
+
+    recompute_statistics()
+    db.session.commit()
+    assert statistics(client, headers) == incremental
+    assert incremental['total_users'] == 2
+    assert incremental['total_levels'] == 2
+    assert incremental['total_purchases'] == 3
+    assert incremental['completed_levels'] == 1
+    assert incremental['popular_levels'][0] == {'name': 'Level 1', 'purchases': 2}
+
+
+def test_recompute_command_repairs_drift(app, make_user):
+    make_user('a')
+    make_user('b')
+    db.session.add(StatisticsRollup(id=1, total_clients=99))
+    db.session.commit()
+
+    result = app.test_cli_runner().invoke(args=['recompute-statistics'])
+
+    assert result.exit_code == 0, result.output
+    assert db.session.get(StatisticsRollup, 1).total_clients == 2
+
+
+def add_exam(user, level, kind, percentage):
+    from app.models import ExamResult
+    db.session.add(ExamResult(user_id=user.id, level_id=level.id, correct_words=1,
+                              wrong_words=1, percentage=percentage, type=kind))
+
+
+def test_user_statistics_single_and_batch(client, make_user, auth_headers, count_queries):
+    from tests.test_levels import enroll
+    admin = make_user('admin', role='admin')
+    busy, idle = make_user('busy'), make_user('idle')
+    levels = seed_catalog(levels=3, videos=1)
+    for level in levels:
+        enroll(busy, level)
+    busy.levels[0].is_completed = True
+    add_exam(busy, levels[0], 'initial', 40.0)
+    add_exam(busy, levels[1], 'initial', 60.0)
+    add_exam(busy, levels[0], 'final', 90.0)
+    db.session.commit()
+    headers = auth_headers(admin)
+    busy_id, idle_id = busy.id, idle.id
+    db.session.expire_all()
+
+    counter = count_queries()
+    single = client.get(f'/admin/users/{busy_id}/statistics', headers=headers).get_json()
+    assert counter.count <= 2, counter.statements
+
+    assert single == {
+        'user_id': busy_id, 'user_name': 'busy', 'purchased_levels': 3,
+        'completed_levels': 1, 'completion_rate': 33.33,
+        'average_initial_score': 50.0, 'average_final_score': 90.0,
+        'average_improvement': 40.0, 'total_exams_taken': 3}
+
+    batch = client.get(f'/admin/users/statistics?user_ids={busy_id},{idle_id},999',
+                       headers=headers).get_json()['items']
+    assert batch[0] == single
+    assert batch[1]['user_name'] == 'idle'
+    assert batch[1]['purchased_levels'] == 0 and batch[1]['average_improvement'] == 0
+    assert len(batch) == 2
+
+    assert client.get('/admin/users/999/statistics', headers=headers).status_code == 404
+    assert client.get('/admin/users/statistics', headers=headers).status_code == 400
+
+
+def test_first_read_builds_the_rollup_within_budget(client, make_user, auth_headers, count_queries):
+    from tests.test_levels import enroll
+    headers = auth_headers(make_user('admin', role='admin'))
+    levels = seed_catalog(levels=8, videos=1)
+    for i in range(5):
+        user = make_user(f'student{i}')
+        for level in levels[:i + 2]:
+            enroll(user, level)
+    StatisticsRollup.query.delete()
+    db.session.commit()
+    db.session.expire_all()
+
+    counter = count_queries()
+    result = statistics(client, headers)
+    assert counter.count <= 10, counter.statements
+    assert (result['total_users'], result['total_levels'], result['total_purchases']) == (5, 8, 20)
+
+
+def test_delete_user_statements_do_not_grow_with_enrollments(client, make_user, auth_headers):
+    from tests.test_levels import enroll
+    headers = auth_headers(make_user('admin', role='admin'))
+    levels = seed_catalog(levels=40, videos=1)
+    leaving, staying = make_user('leaving'), make_user('staying')
+    for level in levels:
+        user_level = enroll(leaving, level)
+        db.session.add(UserVideoProgress(user_level_id=user_level.id, video_id=level.videos[0].id))
+        client.post(f'/exams/{level.id}/initial', headers=auth_headers(leaving), json={
+            'correct_words': 1, 'wrong_words': 1,
+            'correct_words_list': ['cat'], 'wrong_words_list': ['dog']})
+    enroll(staying, levels[0])
+    db.session.commit()
+    statistics(client, headers)
+
+    # Within the budget of 20 statements
+    assert client.delete(f'/admin/users/{leaving.id}', headers=headers).status_code == 200
+
+    db.session.expire_all()
+    incremental = statistics(client, headers)
+    recompute_statistics()
+    db.session.commit()
+    assert statistics(client, headers) == incremental
+    assert incremental['total_purchases'] == 1
+    assert incremental['popular_levels'] == [{'name': 'Level 1', 'purchases': 1}]
+    assert not UserVideoProgress.query.count()
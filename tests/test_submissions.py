@@ -0,0 +1,142 @@
+import json
+
+import pytest
+
+from app import create_app, db
+from app.models import ContentVersion, ExamResult, UserVideoProgress
+from app.submissions import SubmissionQueue
+
+from tests.conftest import TestConfig
+from tests.test_levels import seed_catalog, enroll
+
+
+@pytest.fixture
+def app(tmp_path):
+    # The writer thread needs its own connection, so use a database file
+    class _Config(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'app.db'}"
+        UPLOAD_FOLDER = str(tmp_path / 'uploads')
+        SUBMISSION_WRITE_BEHIND = True
+        SUBMISSION_JOURNAL = str(tmp_path / 'submissions.journal')
+        SUBMISSION_FLUSH_INTERVAL = 2
+
+    app = create_app(_Config)
+    with app.app_context():
+        yield app
+        app.extensions['submission_queue'].stop()
+        db.session.remove()
+        db.drop_all(bind_key=None)
+
+
+def exam(level_id, user_id, seq, correct=3, wrong=1):
+    return {'seq': seq, 'kind': 'exam', 'user_id': user_id, 'level_id': level_id,
+            'type': 'initial', 'correct_words': correct, 'wrong_words': wrong,
+            'correct_words_list': ['cat'], 'wrong_words_list': ['dog'],
+            'timestamp': '2026-01-01T00:00:00'}
+
+
+def test_own_reads_see_write_behind_submissions(app, client, make_user, auth_headers):
+    user = make_user()
+    level = seed_catalog(levels=1, videos=1)[0]
+    enroll(user, level)
+    headers = auth_headers(user)
+    queue = app.extensions['submission_queue']
+
+    response = client.post(f'/exams/{level.id}/initial', headers=headers, json={
+        'correct_words': 3, 'wrong_words': 1,
+        'correct_words_list': ['a', 'b', 'c'], 'wrong_words_list': ['d']})
+    assert response.status_code == 201
+    assert response.get_json()['percentage'] == 75.0
+    response = client.post(f'/users/{user.id}/levels/{level.id}/videos/{level.videos[0].id}/submit_questions',
+                           headers=headers, json={'correct_words': 1, 'wrong_words': 1})
+    assert response.status_code == 200
+    # Acknowledged once journaled; the writer is still filling its batch
+    assert queue.pending_count(user.id) == 2
+
+    results = client.get(f'/exams/{level.id}/user/{user.id}', headers=headers).get_json()
+    assert [(r['type'], r['percentage']) for r in results] == [('initial', 75.0)]
+    assert queue.pending_count() == 0
+    levels = client.get(f'/users/{user.id}/levels', headers=headers).get_json()
+    assert levels[0]['initial_exam_score'] == 75.0
+    assert UserVideoProgress.query.one().percentage == 50.0
+
+
+def test_batches_commit_checkpoint_and_truncate_journal(app, make_user):
+    users = [make_user(f'student{i}') for i in range(3)]
+    level = seed_catalog(levels=1, videos=1)[0]
+    for user in users:
+        enroll(user, level)
+    queue = app.extensions['submission_queue']
+    queue.start()
+
+    for i in range(30):
+        queue.enqueue(exam(level.id, users[i % 3].id, seq=None))
+    queue.stop()
+
+    assert ExamResult.query.count() == 30
+    checkpoint = ContentVersion.query.filter_by(name='submission_journal:submissions.journal').one()
+    assert checkpoint.version == 30
+    assert open(app.config['SUBMISSION_JOURNAL'], 'rb').read() == b''
+
+
+def test_journal_is_replayed_exactly_once(app, make_user):
+    user = make_user()
+    level = seed_catalog(levels=1, videos=1)[0]
+    enroll(user, level)
+    db.session.add(ContentVersion(name='submission_journal:submissions.journal', version=1))
+    db.session.commit()
+
+    # Entry 1 was committed before the crash, entry 3 was torn while writing
+    with open(app.config['SUBMISSION_JOURNAL'], 'w') as journal:
+        for seq in (1, 2):
+            journal.write(json.dumps(exam(level.id, user.id, seq, correct=seq)) + '\n')
+        journal.write(json.dumps(exam(level.id, user.id, 3))[:20])
+
+    queue = app.extensions['submission_queue']
+    queue.start()
+    assert queue.enqueue(exam(level.id, user.id, seq=None, correct=4)) == 3
+    queue.stop()
+
+    assert sorted(r.correct_words for r in ExamResult.query) == [2, 4]
+
+
+def test_journal_is_locked_to_one_process(app):
+    app.extensions['submission_queue'].start()
+    other = SubmissionQueue(app, app.config['SUBMISSION_JOURNAL'], 10, 0.01)
+    with pytest.raises(RuntimeError):
+        other.start()
+
+    # A second app on the same journal still runs commands, but refuses to
+    # serve requests
+    second = create_app(type('_Config', (TestConfig,), {k: app.config[k] for k in (
+        'SQLALCHEMY_DATABASE_URI', 'UPLOAD_FOLDER', 'SUBMISSION_WRITE_BEHIND', 'SUBMISSION_JOURNAL')}))
+    result = second.test_cli_runner().invoke(args=['recompute-statistics'])
+    assert result.exit_code == 0, result.output
+    with pytest.raises(RuntimeError, match='locked by another process'):
+        second.test_client().get('/levels')
+
+
+def test_failed_drop_does_not_reapply_committed_entries(app, make_user):
+    user = make_user()
+    level = seed_catalog(levels=1, videos=1)[0]
+    enroll(user, level)
+    queue = app.extensions['submission_queue']
+    queue.start()
+
+    apply, failures = queue._apply, []
+
+    def flaky_apply(entries, seq):
+        # The checkpoint that drops the bad entry fails once
+        if not entries and not failures:
+            failures.append(seq)
+            raise RuntimeError('checkpoint failed')
+        apply(entries, seq)
+    queue._apply = flaky_apply
+
+    queue.enqueue(exam(level.id, user.id, seq=None, correct=1))
+    queue.enqueue(dict(exam(level.id, user.id, seq=None), kind='unknown'))
+    queue.enqueue(exam(level.id, user.id, seq=None, correct=3))
+    queue.stop()
+
+    assert failures == [2]
+    assert sorted(r.correct_words for r in ExamResult.query) == [1, 3]
@@ -0,0 +1,145 @@
+from app import db
+from app.models import Level, Video, UserLevel, UserVideoProgress
+from app.progress import remove, reorder
+
+
+def create_level(client, headers, videos):
+    level = Level(name='Level', level_number=1, price=1.0)
+    db.session.add(level)
+    db.session.commit()
+    video_ids = []
+    for i in range(videos):
+        response = client.post(f'/levels/{level.id}/videos', headers=headers,
+                               json={'youtube_link': f'https://youtube.com/{i}'})
+        video_ids.append(response.get_json()['id'])
+    return level.id, video_ids
+
+
+def opened(client, headers, level_id):
+    videos = client.get(f'/levels/{level_id}', headers=headers).get_json()['videos']
+    return [video['is_opened'] for video in videos]
+
+
+def complete(client, headers, user_id, level_id, video_id):
+    return client.patch(f'/users/{user_id}/levels/{level_id}/videos/{video_id}/complete',
+                        headers=headers)
+
+
+def test_complete_video_uses_a_fixed_number_of_statements(client, make_user, auth_headers, count_queries):
+    admin, student = make_user('admin', role='admin'), make_user('student')
+    admin_headers, headers = auth_headers(admin), auth_headers(student)
+    student_id = student.id
+    counts = []
+    for videos in (3, 40):
+        level_id, video_ids = create_level(client, admin_headers, videos)
+        client.post(f'/users/{student_id}/levels/{level_id}/purchase', headers=headers)
+        db.session.expire_all()
+
+        counter = count_queries()
+        assert complete(client, headers, student_id, level_id, video_ids[1]).status_code == 200
+        counts.append(counter.count)
+
+    assert counts[0] == counts[1] <= 10
+
+
+def test_completion_opens_next_and_unlocks_final_exam(client, make_user, auth_headers):
+    admin, student = make_user('admin', role='admin'), make_user('student')
+    headers = auth_headers(student)
+    level_id, video_ids = create_level(client, auth_headers(admin), 3)
+    client.post(f'/users/{student.id}/levels/{level_id}/purchase', headers=headers)
+
+    assert opened(client, headers, level_id) == [True, False, False]
+    complete(client, headers, student.id, level_id, video_ids[0])
+    complete(client, headers, student.id, level_id, video_ids[0])
+    assert opened(client, headers, level_id) == [True, True, False]
+    assert UserLevel.query.one().completed_videos_count == 1
+
+    complete(client, headers, student.id, level_id, video_ids[1])
+    complete(client, headers, student.id, level_id, video_ids[2])
+    user_level = UserLevel.query.one()
+    assert user_level.completed_videos_count == 3
+    assert user_level.can_take_final_exam
+
+
+def test_reorder_changes_unlock_order(client, make_user, auth_headers):
+    admin, student = make_user('admin', role='admin'), make_user('student')
+    admin_headers, headers = auth_headers(admin), auth_headers(student)
+    level_id, (first, second, third) = create_level(client, admin_headers, 3)
+
+    response = client.put(f'/levels/{level_id}/videos/order', headers=admin_headers,
+                          json={'video_ids': [third, first, second]})
+    assert response.status_code == 200
+    client.post(f'/users/{student.id}/levels/{level_id}/purchase', headers=headers)
+    complete(client, headers, student.id, level_id, third)
+
+    videos = client.get(f'/levels/{level_id}', headers=headers).get_json()['videos']
+    assert [video['id'] for video in videos] == [third, first, second]
+    assert [video['is_opened'] for video in videos] == [True, True, False]
+
+    bad = client.put(f'/levels/{level_id}/videos/order', headers=admin_headers,
+                     json={'video_ids': [first, second]})
+    assert bad.status_code == 400
+
+
+def test_delete_video_keeps_positions_and_counters_consistent(client, make_user, auth_headers):
+    admin, student = make_user('admin', role='admin'), make_user('student')
+    admin_headers, headers = auth_headers(admin), auth_headers(student)
+    level_id, video_ids = create_level(client, admin_headers, 3)
+    client.post(f'/users/{student.id}/levels/{level_id}/purchase', headers=headers)
+    complete(client, headers, student.id, level_id, video_ids[0])
+
+    client.delete(f'/videos/{video_ids[0]}', headers=admin_headers)
+
+    assert [v.position for v in Video.query.order_by(Video.position)] == [0, 1]
+    assert UserLevel.query.one().completed_videos_count == 0
+
+
+def test_bitmap_helpers():
+    assert remove(0b1011, 1) == 0b101
+    assert remove(0b1011, 0) == 0b101
+    assert reorder(0b011, [2, 0, 1]) == 0b110
+
+
+def test_progress_follows_videos_when_reordered(client, make_user, auth_headers):
+    admin, student = make_user('admin', role='admin'), make_user('student')
+    admin_headers, headers = auth_headers(admin), auth_headers(student)
+    level_id, (first, second, third) = create_level(client, admin_headers, 3)
+    client.post(f'/users/{student.id}/levels/{level_id}/purchase', headers=headers)
+    complete(client, headers, student.id, level_id, first)
+
+    client.put(f'/levels/{level_id}/videos/order', headers=admin_headers,
+               json={'video_ids': [second, third, first]})
+
+    progress = client.get(f'/users/{student.id}/levels', headers=headers).get_json()[0]
+    assert progress['videos_progress'] == [
+        {'video_id': second, 'is_opened': True, 'is_completed': False},
+        {'video_id': third, 'is_opened': False, 'is_completed': False},
+        {'video_id': first, 'is_opened': True, 'is_completed': True}]
+    assert progress['completed_videos_count'] == 1
+
+
+def test_progress_rows_are_only_stored_for_answers(client, make_user, auth_headers):
+    admin, student = make_user('admin', role='admin'), make_user('student')
+    headers = auth_headers(student)
+    level_id, video_ids = create_level(client, auth_headers(admin), 3)
+    client.post(f'/users/{student.id}/levels/{level_id}/purchase', headers=headers)
+    complete(client, headers, student.id, level_id, video_ids[0])
+    assert UserVideoProgress.query.count() == 0
+
+    client.post(f'/users/{student.id}/levels/{level_id}/videos/{video_ids[0]}/submit_questions',
+                headers=headers, json={'correct_words': 3, 'wrong_words': 1})
+    assert UserVideoProgress.query.count() == 1
+
+    videos = client.get('/report?format=json', headers=headers).get_json()['levels'][0]['videos']
+    assert [(v['is_opened'], v['is_completed'], v['correct_words']) for v in videos] == [
+        (True, True, 3), (True, False, None), (False, False, None)]
+
+
+def test_reorder_rejects_ids_that_are_not_ints(client, make_user, auth_headers):
+    headers = auth_headers(make_user('admin', role='admin'))
+    level_id, (first, second) = create_level(client, headers, 2)
+
+    for video_ids in (['a', first], [True, second], [str(first), str(second)]):
+        response = client.put(f'/levels/{level_id}/videos/order', headers=headers,
+                              json={'video_ids': video_ids})
+        assert response.status_code == 400
@@ -0,0 +1,105 @@
+from app import db
+from app.models import LevelWordStatistics, VideoWordStatistics
+from app.words import rebuild_word_statistics
+
+from tests.test_levels import seed_catalog, enroll
+
+
+def snapshot(model):
+    return sorted((tuple(row) for row in db.session.query(
+        *[column for column in model.__table__.columns])))
+
+
+def submit_exam(client, headers, level_id, correct, wrong):
+    return client.post(f'/exams/{level_id}/initial', headers=headers, json={
+        'correct_words': len(correct), 'wrong_words': len(wrong),
+        'correct_words_list': correct, 'wrong_words_list': wrong})
+
+
+def submit_video(client, user, headers, level_id, video_id, correct, wrong):
+    return client.post(f'/users/{user.id}/levels/{level_id}/videos/{video_id}/submit_questions',
+                       headers=headers, json={
+                           'correct_words': len(correct), 'wrong_words': len(wrong),
+                           'correct_words_list': correct, 'wrong_words_list': wrong})
+
+
+def test_hardest_words_per_level_and_video(client, make_user, auth_headers, count_queries):
+    admin_headers = auth_headers(make_user('admin', role='admin'))
+    level = seed_catalog(levels=1, videos=2)[0]
+    video_id = level.videos[0].id
+    for i in range(4):
+        user = make_user(f'student{i}')
+        enroll(user, level)
+        headers = auth_headers(user)
+        submit_exam(client, headers, level.id, ['cat', 'dog'] if i else ['cat'], ['Bird'] if i < 3 else [])
+        submit_video(client, user, headers, level.id, video_id, ['cat'], ['dog'])
+        if i == 0:
+            # Resubmitted answers replace the previous ones
+            submit_video(client, user, headers, level.id, video_id, ['dog'], ['cat'])
+
+    counter = count_queries()
+    words = client.get(f'/admin/levels/{level.id}/hardest_words', headers=admin_headers).get_json()['words']
+    assert counter.count <= 4, counter.statements
+    assert words == [
+        {'word': 'bird', 'misses': 3, 'attempts': 3, 'miss_rate': 100.0},
+        {'word': 'dog', 'misses': 3, 'attempts': 7, 'miss_rate': 42.86},
+        {'word': 'cat', 'misses': 1, 'attempts': 8, 'miss_rate': 12.5}]
+
+    video_words = client.get(f'/admin/videos/{video_id}/hardest_words?limit=1',
+                             headers=admin_headers).get_json()['words']
+    assert video_words == [{'word': 'dog', 'misses': 3, 'attempts': 4, 'miss_rate': 75.0}]
+
+    filtered = client.get(f'/admin/levels/{level.id}/hardest_words?min_attempts=5',
+                          headers=admin_headers).get_json()['words']
+    assert [word['word'] for word in filtered] == ['dog', 'cat']
+
+
+def test_incremental_index_matches_rebuild_after_deletes(client, make_user, auth_headers):
+    admin_headers = auth_headers(make_user('admin', role='admin'))
+    level = seed_catalog(levels=1, videos=2)[0]
+    video_ids = [video.id for video in level.videos]
+    users = [make_user(f'student{i}') for i in range(3)]
+    for i, user in enumerate(users):
+        enroll(user, level)
+        headers = auth_headers(user)
+        submit_exam(client, headers, level.id, ['cat'], ['owl', 'fox'][:i])
+        for video_id in video_ids:
+            submit_video(client, user, headers, level.id, video_id, ['sun'], ['moon'] * i)
+
+    client.delete(f'/admin/users/{users[1].id}', headers=admin_headers)
+    client.delete(f'/videos/{video_ids[0]}', headers=admin_headers)
+
+    incremental = snapshot(LevelWordStatistics), snapshot(VideoWordStatistics)
+    rebuild_word_statistics()
+
+    def nonzero(rows):
+        return [row for row in rows if row[-1] or row[-2]]
+    assert (nonzero(incremental[0]), nonzero(incremental[1])) == (
+        snapshot(LevelWordStatistics), snapshot(VideoWordStatistics))
+
+
+def test_answer_lists_that_are_not_lists_count_as_no_answers(client, make_user, auth_headers):
+    user = make_user()
+    level = seed_catalog(levels=1, videos=1)[0]
+    enroll(user, level)
+    headers = auth_headers(user)
+
+    assert submit_exam(client, headers, level.id, 'apple', {'a': 1}).status_code == 201
+    assert submit_video(client, user, headers, level.id, level.videos[0].id, 'apple', ['pear']).status_code == 200
+    # Resubmitting subtracts the previous answers as they were stored
+    assert submit_video(client, user, headers, level.id, level.videos[0].id, ['plum'], '[1]').status_code == 200
+
+    video_id = level.videos[0].id
+    assert snapshot(VideoWordStatistics) == [(video_id, 'pear', 0, 0), (video_id, 'plum', 1, 0)]
+    incremental = snapshot(LevelWordStatistics)
+    rebuild_word_statistics()
+    assert snapshot(LevelWordStatistics) == [row for row in incremental if row[2] or row[3]]
+
+
+def test_hardest_words_limit_must_be_positive(client, make_user, auth_headers):
+    headers = auth_headers(make_user('admin', role='admin'))
+    level = seed_catalog(levels=1, videos=1)[0]
+    for url in (f'/admin/levels/{level.id}/hardest_words', f'/admin/videos/{level.videos[0].id}/hardest_words'):
+        assert client.get(f'{url}?limit=-1', headers=headers).status_code == 400
+        assert client.get(f'{url}?limit=0', headers=headers).status_code == 400
+        assert client.get(f'{url}?limit=1', headers=headers).status_code == 200